@@ -1,30 +1,158 @@
-from fastapi import Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordBearer
+import time
+
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from jose import JWTError, jwt
-from sqlalchemy.orm import Session
+from sqlalchemy import event, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, make_transient_to_detached, object_session
 
+from app.infrastructure.balance_cache import PENDING_BALANCES_KEY, BalanceCache
+from app.infrastructure.cache import BULK_UPDATE_KEY, UPDATED_USERS_KEY, TTLCache
 from app.infrastructure.config import settings
-from app.infrastructure.database.connection import get_db
-from app.use_cases.auth_use_case import AuthUseCase
+from app.infrastructure.metrics import registry, stage
+from app.infrastructure.money import to_cents
+from app.infrastructure.rate_limit import LoginLimits, TransferVelocity, rate_limit_storage
+from app.infrastructure.database.connection import get_async_db, get_db
+from app.use_cases.auth_use_case import AsyncAuthUseCase, AuthUseCase
+from app.domain.entities.user import User
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    credentials_exception = HTTPException(
+# token -> claims já verificadas; email -> colunas do usuário
+token_cache = TTLCache(maxsize=settings.TOKEN_CACHE_SIZE, ttl=settings.TOKEN_CACHE_TTL_SECONDS)
+user_cache = TTLCache(maxsize=settings.USER_CACHE_SIZE, ttl=settings.USER_CACHE_TTL_SECONDS)
+# email -> id da conta (não muda) e id -> saldo, para ler o saldo sem carregar o usuário
+account_ids = TTLCache(maxsize=settings.USER_CACHE_SIZE, ttl=settings.TOKEN_CACHE_TTL_SECONDS)
+balance_cache = BalanceCache(maxsize=settings.BALANCE_CACHE_SIZE, ttl=settings.BALANCE_CACHE_TTL_SECONDS)
+registry.register_cache("token", token_cache)
+registry.register_cache("user", user_cache)
+registry.register_cache("balance", balance_cache)
+
+rate_limits = rate_limit_storage(settings.RATE_LIMIT_DB)
+login_limits = LoginLimits(
+    rate_limits,
+    per_ip=settings.LOGIN_LIMIT_PER_IP,
+    per_email=settings.LOGIN_LIMIT_PER_EMAIL,
+    window_seconds=settings.LOGIN_LIMIT_WINDOW_SECONDS
+)
+transfer_velocity = TransferVelocity(
+    rate_limits,
+    per_account=settings.TRANSFER_LIMIT_PER_ACCOUNT,
+    window_seconds=settings.TRANSFER_LIMIT_WINDOW_SECONDS,
+    volume_cents=to_cents(settings.TRANSFER_VOLUME_LIMIT),
+    volume_window_seconds=settings.TRANSFER_VOLUME_WINDOW_SECONDS
+)
+
+def decode_token(token: str) -> dict:
+    payload = token_cache.get(token)
+    if payload is None:
+        with stage("jwt_decode"):
+            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        # A entrada nunca sobrevive ao exp do token
+        exp = payload.get("exp")
+        token_cache.set(token, payload, exp - time.time() if exp is not None else None)
+    return payload
+
+def _user_snapshot(user: User) -> dict:
+    return {attr.key: getattr(user, attr.key) for attr in inspect(User).column_attrs}
+
+def _detached_user(snapshot: dict) -> User:
+    user = User(**snapshot)
+    make_transient_to_detached(user)
+    return user
+
+@event.listens_for(User, "after_update")
+def _user_updated(mapper, connection, target):
+    user_cache.invalidate(target.email)
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(UPDATED_USERS_KEY, set()).add(target.email)
+        # O saldo só vai para o cache depois do commit
+        session.info.setdefault(PENDING_BALANCES_KEY, {})[target.id] = target.balance
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_updated_users(session):
+    # Invalida de novo após o commit para não guardar um valor lido antes dele
+    for email in session.info.pop(UPDATED_USERS_KEY, ()):
+        user_cache.invalidate(email)
+    # Quem altera saldo faz commit dentro do lock das contas, então as escritas
+    # chegam aqui na ordem dos commits
+    for account_id, balance in session.info.pop(PENDING_BALANCES_KEY, {}).items():
+        balance_cache.write(account_id, balance)
+    # Importação em massa: contas demais para invalidar uma a uma
+    if session.info.pop(BULK_UPDATE_KEY, False):
+        user_cache.clear()
+        balance_cache.clear()
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_pending_balances(session, previous_transaction):
+    # Saldos de uma transação desfeita não podem chegar ao cache; invalidar é sempre seguro
+    for account_id in session.info.pop(PENDING_BALANCES_KEY, {}):
+        balance_cache.invalidate(account_id)
+    session.info.pop(BULK_UPDATE_KEY, None)
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+def _email_from_token(token: str) -> str:
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
+        payload = decode_token(token)
     except JWTError:
-        raise credentials_exception
-        
+        raise _credentials_exception()
+    email: str = payload.get("sub")
+    if email is None:
+        raise _credentials_exception()
+    return email
+
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    email = _email_from_token(token)
+
+    snapshot = user_cache.get(email)
+    if snapshot is not None:
+        return db.merge(_detached_user(snapshot), load=False)
+
+    generation = user_cache.generation
     auth_service = AuthUseCase(db)
     user = auth_service.get_user_by_email(email)
     if user is None:
-        raise credentials_exception
-    return user 
\ No newline at end of file
+        raise _credentials_exception()
+    user_cache.set(email, _user_snapshot(user), generation=generation)
+    return user
+
+async def get_current_user_id_async(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)) -> int:
+    email = _email_from_token(token)
+    account_id = account_ids.get(email)
+    if account_id is None:
+        snapshot = user_cache.get(email)
+        if snapshot is not None:
+            account_id = snapshot["id"]
+        else:
+            account_id = (await db.execute(select(User.id).where(User.email == email))).scalar_one_or_none()
+            if account_id is None:
+                raise _credentials_exception()
+        account_ids.set(email, account_id)
+    return account_id
+
+async def get_current_user_async(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
+    email = _email_from_token(token)
+
+    snapshot = user_cache.get(email)
+    if snapshot is not None:
+        return await db.merge(_detached_user(snapshot), load=False)
+
+    generation = user_cache.generation
+    auth_service = AsyncAuthUseCase(db)
+    user = await auth_service.get_user_by_email(email)
+    if user is None:
+        raise _credentials_exception()
+    user_cache.set(email, _user_snapshot(user), generation=generation)
+    return user
+
+def limit_login(request: Request, form_data: OAuth2PasswordRequestForm = Depends()) -> None:
+    # Roda antes da rota: tentativas em excesso param aqui, sem consulta nem bcrypt
+    login_limits.check(request.client.host if request.client else None, form_data.username)
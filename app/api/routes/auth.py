@@ -1,19 +1,20 @@
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.infrastructure.database.connection import get_db
+from app.api.dependencies import limit_login
+from app.infrastructure.database.connection import get_async_db
 from app.schemas.user_schema import UserCreate, UserResponse, Token
-from app.use_cases.auth_use_case import AuthUseCase
+from app.use_cases.auth_use_case import AsyncAuthUseCase
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 @router.post("/register", response_model=UserResponse)
-def register(user: UserCreate, db: Session = Depends(get_db)):
-    auth_service = AuthUseCase(db)
-    return auth_service.register_user(user)
+async def register(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    auth_service = AsyncAuthUseCase(db)
+    return await auth_service.register_user(user)
 
-@router.post("/login", response_model=Token)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    auth_service = AuthUseCase(db)
-    return auth_service.authenticate_user(form_data.username, form_data.password) 
\ No newline at end of file
+@router.post("/login", response_model=Token, dependencies=[Depends(limit_login)])
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
+    auth_service = AsyncAuthUseCase(db)
+    return await auth_service.authenticate_user(form_data.username, form_data.password) 
\ No newline at end of file
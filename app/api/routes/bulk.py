@@ -0,0 +1,76 @@
+import hmac
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+
+from app.infrastructure.bulk_io import DATASETS, MEDIA_TYPES, BulkFormatError, resolve_format, spool
+from app.infrastructure.config import settings
+from app.infrastructure.database.connection import ReadSessionLocal, SessionLocal
+from app.use_cases.bulk_use_case import BulkUseCase
+
+router = APIRouter(prefix="/bulk", tags=["bulk"])
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    if not settings.BULK_ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token, settings.BULK_ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+def _check_dataset(dataset: str) -> None:
+    if dataset not in DATASETS:
+        raise HTTPException(status_code=404, detail="Unknown dataset")
+
+@router.post("/{dataset}/import", dependencies=[Depends(require_admin)])
+async def import_dataset(
+    dataset: str,
+    request: Request,
+    format: Optional[str] = Query(None),
+    with_balances: bool = Query(True)
+):
+    _check_dataset(dataset)
+    try:
+        format = resolve_format(format, content_type=request.headers.get("content-type"))
+    except BulkFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    body = await spool(request.stream())
+
+    def run() -> dict:
+        # Sessão própria: a importação roda numa thread e faz um único commit no fim
+        with SessionLocal() as db:
+            bulk = BulkUseCase(db, settings.BULK_CHUNK_SIZE)
+            if dataset == "users":
+                return bulk.import_users(body, format, with_balances)
+            return bulk.import_transactions(body, format)
+
+    try:
+        return await run_in_threadpool(run)
+    except BulkFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        body.close()
+
+@router.get("/{dataset}/export", dependencies=[Depends(require_admin)])
+def export_dataset(
+    dataset: str,
+    format: str = Query("ndjson"),
+    user_id: Optional[int] = Query(None)
+):
+    _check_dataset(dataset)
+    try:
+        format = resolve_format(format)
+    except BulkFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    def stream():
+        # A sessão vive enquanto a resposta é enviada, não só durante o handler
+        with ReadSessionLocal() as db:
+            yield from BulkUseCase(db, settings.BULK_CHUNK_SIZE).export(dataset, format, user_id)
+
+    return StreamingResponse(
+        stream(),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{dataset}.{format}"'}
+    )
@@ -1,27 +1,129 @@
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import datetime
+from typing import Optional, Tuple
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.infrastructure.database.connection import get_db
-from app.schemas.transaction_schema import TransactionCreate, TransactionResponse
-from app.use_cases.wallet_use_case import WalletUseCase
-from app.api.dependencies import get_current_user
+from app.infrastructure.config import settings
+from app.infrastructure.database.connection import get_async_db, get_db
+from app.infrastructure.database.group_commit import group_committer
+from app.infrastructure.money import from_cents, to_cents
+from app.infrastructure.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, NEXT_CURSOR_HEADER, decode_cursor, encode_cursor
+from app.infrastructure.serialization import FastJSONResponse
+from app.schemas.schemas import BatchRequest, BatchResponse
+from app.schemas.transaction_schema import TransactionResponse, TransferCreate
+from app.use_cases.wallet_use_case import AsyncWalletUseCase, WalletUseCase
+from app.api.dependencies import balance_cache, transfer_velocity, get_current_user, get_current_user_async, get_current_user_id_async
 from app.domain.entities.user import User
 
 router = APIRouter(prefix="/wallet", tags=["wallet"])
 
 @router.get("/balance")
-def get_balance(current_user: User = Depends(get_current_user)):
-    return {"balance": current_user.balance}
+async def get_balance(
+    current_user_id: int = Depends(get_current_user_id_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    # Só o id vem do token; o saldo sai do cache e, na falta dele, de um SELECT da coluna
+    wallet_service = AsyncWalletUseCase(db, balance_cache)
+    return {"balance": from_cents(await wallet_service.get_balance(current_user_id))}
+
+def get_after_key(cursor: Optional[str] = None) -> Optional[Tuple[datetime, int]]:
+    if cursor is None:
+        return None
+    try:
+        timestamp, transaction_id = decode_cursor(cursor)
+        return datetime.fromisoformat(timestamp), int(transaction_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def to_transaction_row(t) -> dict:
+    # Valor decimal na resposta; a coluna guarda centavos
+    return {
+        "id": t.id,
+        "amount": from_cents(t.amount),
+        "type": t.type,
+        "description": t.description,
+        "user_id": t.user_id,
+        "sender_id": t.sender_id,
+        "receiver_id": t.receiver_id,
+        "timestamp": t.timestamp,
+    }
+
+@router.get("/transactions")
+async def list_transactions(
+    start_date: datetime = None,
+    end_date: datetime = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[Tuple[datetime, int]] = Depends(get_after_key),
+    current_user_id: int = Depends(get_current_user_id_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    # Paginação por keyset sobre (timestamp, id), a mesma ordem do índice
+    wallet_service = AsyncWalletUseCase(db)
+    transactions = await wallet_service.list_transactions(current_user_id, start_date, end_date, after, limit + 1)
+    headers = {}
+    if len(transactions) > limit:
+        transactions = transactions[:limit]
+        last = transactions[-1]
+        headers[NEXT_CURSOR_HEADER] = encode_cursor([last.timestamp.isoformat(), last.id])
+    return FastJSONResponse([to_transaction_row(t) for t in transactions], headers=headers)
 
 @router.post("/transfer", response_model=TransactionResponse)
-def transfer_money(
-    transaction: TransactionCreate,
+async def transfer_money(
+    transaction: TransferCreate,
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    try:
+        amount = to_cents(transaction.amount)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if settings.GROUP_COMMIT_ENABLED:
+        # O group commit usa a sessão síncrona numa thread própria; o limite é conferido antes de entrar na fila
+        transfer_velocity.check(current_user.id, amount)
+        transfer = await run_in_threadpool(
+            group_committer.submit,
+            lambda session: WalletUseCase(db=session).apply_transfer(
+                current_user.id, transaction.receiver_id, amount
+            ),
+            (current_user.id, transaction.receiver_id)
+        )
+    else:
+        wallet_service = AsyncWalletUseCase(db, velocity=transfer_velocity)
+        transfer = await wallet_service.transfer_money(
+            sender_id=current_user.id,
+            receiver_id=transaction.receiver_id,
+            amount=amount
+        )
+    return to_transaction_row(transfer)
+
+@router.post("/transactions/batch", response_model=BatchResponse)
+def submit_batch(
+    batch: BatchRequest,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    wallet_service = WalletUseCase(db)
-    return wallet_service.transfer_money(
-        sender_id=current_user.id,
-        receiver_id=transaction.receiver_id,
-        amount=transaction.amount
-    ) 
\ No newline at end of file
+    if not batch.operations:
+        raise HTTPException(status_code=400, detail="Batch is empty")
+    if len(batch.operations) > settings.BATCH_MAX_OPERATIONS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch exceeds {settings.BATCH_MAX_OPERATIONS} operations"
+        )
+
+    transfers = [op.amount for op in batch.operations if op.type == "transfer" and op.amount > 0]
+    if transfers:
+        # O lote inteiro conta no limite de transferências da conta
+        transfer_velocity.check(current_user.id, sum(transfers), len(transfers))
+
+    wallet_service = WalletUseCase(db=db)
+    results = wallet_service.apply_batch(current_user.id, batch.operations, batch.atomic)
+    applied = sum(1 for result in results if result["status"] == "applied")
+    response = BatchResponse(applied=applied, failed=len(results) - applied, results=results)
+    if batch.atomic and response.failed:
+        # Nada foi gravado: o lote atômico falha como um todo, com o resultado de cada operação
+        raise HTTPException(status_code=422, detail=response.model_dump())
+    return response
@@ -1,4 +1,5 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from app.schemas.user_schema import UserCreate, UserResponse, TokenResponse
 from app.schemas.transaction_schema import TransferCreate, DepositCreate, TransactionResponse, TransactionCreate
@@ -6,8 +7,21 @@ from app.use_cases.auth_use_case import AuthUseCase
 from app.use_cases.wallet_use_case import WalletUseCase
 from app.repositories.user_repository import UserRepository
 from app.repositories.transaction_repository import TransactionRepository
-from datetime import datetime
+from app.infrastructure.balance_cache import BalanceCache
+from app.infrastructure.cache import TTLCache
+from app.infrastructure.config import settings
+from app.infrastructure.idempotency import MAX_KEY_LENGTH, IdempotencyConflict, idempotency_store
+from app.infrastructure.locks import account_locks
+from app.infrastructure.metrics import registry, stage
+from app.infrastructure.money import from_cents, to_cents
+from app.infrastructure.serialization import FastJSONResponse, dumps
+from app.infrastructure.pagination import MAX_PAGE_SIZE, NEXT_CURSOR_HEADER, STREAM_CHUNK_SIZE, encode_cursor, decode_cursor
+from app.schemas.schemas import DailyVolume, PeriodSummary
+from datetime import date, datetime
+from itertools import islice
+from typing import Optional, Tuple
 import jwt
+import time
 from sqlalchemy.orm import Session
 from app.infrastructure.database.connection import get_db
 
@@ -18,19 +32,73 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 user_repository = UserRepository()
 transaction_repository = TransactionRepository()
 
+# token -> claims já verificadas, válidas até o exp do token
+claims_cache = TTLCache(maxsize=settings.TOKEN_CACHE_SIZE, ttl=settings.TOKEN_CACHE_TTL_SECONDS)
+registry.register_cache("claims", claims_cache)
+
+# Saldos das contas em memória (ids do user_repository acima)
+balances = BalanceCache(maxsize=settings.BALANCE_CACHE_SIZE, ttl=settings.BALANCE_CACHE_TTL_SECONDS)
+registry.register_cache("memory_balance", balances)
+
 def get_auth_use_case():
     return AuthUseCase(user_repository)
 
 def get_wallet_use_case():
-    return WalletUseCase(user_repository, transaction_repository)
+    return WalletUseCase(user_repository, transaction_repository, balance_cache=balances)
 
 async def get_current_user_id(token: str = Depends(oauth2_scheme)) -> int:
     try:
-        payload = jwt.decode(token, AuthUseCase.SECRET_KEY, algorithms=["HS256"])
+        payload = claims_cache.get(token)
+        if payload is None:
+            with stage("jwt_decode"):
+                payload = jwt.decode(token, AuthUseCase.SECRET_KEY, algorithms=["HS256"])
+            exp = payload.get("exp")
+            claims_cache.set(token, payload, exp - time.time() if exp is not None else None)
         return int(payload["sub"])
     except:
         raise HTTPException(status_code=401, detail="Invalid token")
 
+def get_after_key(cursor: Optional[str] = None) -> Optional[Tuple[float, int]]:
+    if cursor is None:
+        return None
+    try:
+        created_ts, transaction_id = decode_cursor(cursor)
+        return float(created_ts), int(transaction_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+async def run_idempotent(key: Optional[str], scope: tuple, payload, fn):
+    # Sem Idempotency-Key executa normalmente; com ela, repetições devolvem o resultado guardado
+    if key is None:
+        return fn()
+    if len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail="Idempotency-Key is too long")
+    try:
+        return await idempotency_store.run_async((*scope, key), payload.model_dump_json(), fn)
+    except IdempotencyConflict as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+def to_transaction_row(t) -> dict:
+    # Mesmo formato de TransactionResponse, montado direto do registro
+    return {
+        "id": t.id,
+        "amount": from_cents(t.amount),
+        "sender_id": t.sender_id,
+        "receiver_id": t.receiver_id,
+        "transaction_type": t.transaction_type,
+        "created_at": t.created_at,
+    }
+
+def to_transaction_response(t) -> TransactionResponse:
+    return TransactionResponse(
+        id=t.id,
+        amount=from_cents(t.amount),
+        sender_id=t.sender_id,
+        receiver_id=t.receiver_id,
+        transaction_type=t.transaction_type,
+        created_at=t.created_at
+    )
+
 # Rotas de autenticação
 @router.post("/register", response_model=UserResponse)
 async def register(user_data: UserCreate, use_case: AuthUseCase = Depends(get_auth_use_case)):
@@ -63,7 +131,7 @@ async def get_balance(
     use_case: WalletUseCase = Depends(get_wallet_use_case)
 ):
     try:
-        return use_case.get_balance(current_user_id)
+        return from_cents(use_case.get_balance(current_user_id))
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
 
@@ -71,17 +139,15 @@ async def get_balance(
 async def deposit(
     deposit_data: DepositCreate,
     current_user_id: int = Depends(get_current_user_id),
-    use_case: WalletUseCase = Depends(get_wallet_use_case)
+    use_case: WalletUseCase = Depends(get_wallet_use_case),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
 ):
     try:
-        transaction = use_case.deposit(current_user_id, deposit_data.amount)
-        return TransactionResponse(
-            id=transaction.id,
-            amount=transaction.amount,
-            sender_id=transaction.sender_id,
-            receiver_id=transaction.receiver_id,
-            transaction_type=transaction.transaction_type,
-            created_at=transaction.created_at
+        return await run_idempotent(
+            idempotency_key,
+            (current_user_id, "deposit"),
+            deposit_data,
+            lambda: to_transaction_response(use_case.deposit(current_user_id, to_cents(deposit_data.amount)))
         )
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -90,21 +156,19 @@ async def deposit(
 async def transfer(
     transfer_data: TransferCreate,
     current_user_id: int = Depends(get_current_user_id),
-    use_case: WalletUseCase = Depends(get_wallet_use_case)
+    use_case: WalletUseCase = Depends(get_wallet_use_case),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
 ):
     try:
-        transaction = use_case.transfer(
-            current_user_id,
-            transfer_data.receiver_id,
-            transfer_data.amount
-        )
-        return TransactionResponse(
-            id=transaction.id,
-            amount=transaction.amount,
-            sender_id=transaction.sender_id,
-            receiver_id=transaction.receiver_id,
-            transaction_type=transaction.transaction_type,
-            created_at=transaction.created_at
+        return await run_idempotent(
+            idempotency_key,
+            (current_user_id, "transfer"),
+            transfer_data,
+            lambda: to_transaction_response(use_case.transfer(
+                current_user_id,
+                transfer_data.receiver_id,
+                to_cents(transfer_data.amount)
+            ))
         )
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -113,24 +177,71 @@ async def transfer(
 async def list_transactions(
     start_date: datetime = None,
     end_date: datetime = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[Tuple[float, int]] = Depends(get_after_key),
     current_user_id: int = Depends(get_current_user_id),
     use_case: WalletUseCase = Depends(get_wallet_use_case)
 ):
+    headers = {}
     try:
-        transactions = use_case.list_transactions(current_user_id, start_date, end_date)
-        return [
-            TransactionResponse(
-                id=t.id,
-                amount=t.amount,
-                sender_id=t.sender_id,
-                receiver_id=t.receiver_id,
-                transaction_type=t.transaction_type,
-                created_at=t.created_at
-            )
-            for t in transactions
-        ]
+        if limit is None and after is None:
+            transactions = use_case.list_transactions(current_user_id, start_date, end_date)
+        else:
+            # Paginação por keyset sobre (created_ts, id)
+            rows = use_case.iter_transactions(current_user_id, start_date, end_date, after)
+            transactions = list(islice(rows, limit + 1 if limit else None))
+            if limit and len(transactions) > limit:
+                transactions = transactions[:limit]
+                last = transactions[-1]
+                headers[NEXT_CURSOR_HEADER] = encode_cursor([last.created_ts, last.id])
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
+    # Resposta já serializada: evita criar e revalidar um TransactionResponse por linha
+    return FastJSONResponse([to_transaction_row(t) for t in transactions], headers=headers)
+
+@router.get("/transactions/stream")
+async def stream_transactions(
+    start_date: datetime = None,
+    end_date: datetime = None,
+    after: Optional[Tuple[float, int]] = Depends(get_after_key),
+    current_user_id: int = Depends(get_current_user_id),
+    use_case: WalletUseCase = Depends(get_wallet_use_case)
+):
+    try:
+        rows = use_case.iter_transactions(current_user_id, start_date, end_date, after)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    def ndjson():
+        while True:
+            chunk = list(islice(rows, STREAM_CHUNK_SIZE))
+            if not chunk:
+                break
+            yield b"".join(dumps(to_transaction_row(t)) + b"\n" for t in chunk)
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+@router.get("/transactions/summary", response_model=list[PeriodSummary])
+async def transactions_summary(
+    granularity: str = Query("day", pattern="^(day|week|month)$"),
+    start_date: date = None,
+    end_date: date = None,
+    current_user_id: int = Depends(get_current_user_id),
+    use_case: WalletUseCase = Depends(get_wallet_use_case)
+):
+    try:
+        return use_case.summarize(current_user_id, granularity, start_date, end_date)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@router.get("/reports/daily", response_model=list[DailyVolume])
+async def daily_report(
+    start_date: date = None,
+    end_date: date = None,
+    current_user_id: int = Depends(get_current_user_id),
+    use_case: WalletUseCase = Depends(get_wallet_use_case)
+):
+    return use_case.daily_report(start_date, end_date)
 
 @router.post("/transactions/", response_model=TransactionResponse)
 def create_transaction(
@@ -138,21 +249,25 @@ def create_transaction(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    if transaction.type == 'withdrawal' and current_user.balance < transaction.amount:
-        raise HTTPException(
-            status_code=400,
-            detail="Insufficient funds"
-        )
-    
-    transaction_repo = TransactionRepository()
-    new_transaction = transaction_repo.create_transaction(db, transaction, current_user.id)
-    
-    # Atualizar o saldo do usuário
-    if transaction.type == 'deposit':
-        current_user.balance += transaction.amount
-    else:
-        current_user.balance -= transaction.amount
-    
-    db.commit()
+    with account_locks.lock(current_user.id):
+        # Relê o saldo dentro do lock; o usuário foi carregado antes dele
+        db.refresh(current_user)
+        amount = to_cents(transaction.amount)
+        if transaction.type == 'withdrawal' and current_user.balance < amount:
+            raise HTTPException(
+                status_code=400,
+                detail="Insufficient funds"
+            )
+        
+        transaction_repo = TransactionRepository()
+        new_transaction = transaction_repo.create_transaction(db, transaction, current_user.id)
+        
+        # Atualizar o saldo do usuário
+        if transaction.type == 'deposit':
+            current_user.balance += amount
+        else:
+            current_user.balance -= amount
+        
+        db.commit()
     
     return new_transaction 
\ No newline at end of file
@@ -0,0 +1,69 @@
+from datetime import datetime
+from typing import Callable, Set
+
+from sqlalchemy import Column, DateTime, Index, Integer, String, Text, event
+from sqlalchemy.orm import Session, object_session
+
+from app.infrastructure.config import settings
+from app.infrastructure.database.connection import Base
+from app.infrastructure.outbox_dispatcher import transaction_events
+
+# Session.info: linhas do outbox geradas no flush corrente e marca de que a transação gravou eventos
+PENDING_EVENTS_KEY = "outbox_pending_events"
+EVENTS_WRITTEN_KEY = "outbox_events_written"
+
+# Chamados a cada commit com eventos (OutboxDispatcher.wake dos dispatchers deste processo)
+commit_wakers: Set[Callable[[], None]] = set()
+
+class OutboxEvent(Base):
+    __tablename__ = "outbox_events"
+    # O dispatcher lê os pendentes em ordem de id; entregues e descartados saem do índice de busca.
+    # O segundo índice responde se a conta tem um evento anterior não entregue que a bloqueia
+    __table_args__ = (
+        Index("ix_outbox_events_pending", "delivered_at", "failed_at", "id"),
+        Index("ix_outbox_events_account_pending", "account_id", "delivered_at", "id"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    # Chave de ordenação: eventos de uma conta são entregues na ordem em que foram gravados
+    account_id = Column(Integer, nullable=False)
+    event_type = Column(String, nullable=False)
+    transaction_id = Column(Integer, nullable=False)
+    # JSON já serializado, como vai para os destinos; horários em UTC
+    payload = Column(Text, nullable=False)
+    created_at = Column(DateTime, nullable=False)
+    attempts = Column(Integer, nullable=False, default=0)
+    available_at = Column(DateTime, nullable=True)
+    delivered_at = Column(DateTime, nullable=True)
+    failed_at = Column(DateTime, nullable=True)
+    last_error = Column(String, nullable=True)
+
+# Registrado em Transaction (app.domain.entities.transaction), então vale para qualquer
+# código que grave transações pelo ORM, sem depender de quem importou o outbox
+def queue_transaction_events(mapper, connection, target):
+    # O id já existe aqui; os eventos são gravados no after_flush, num único INSERT
+    session = object_session(target)
+    if session is not None and settings.OUTBOX_ENABLED:
+        session.info.setdefault(PENDING_EVENTS_KEY, []).extend(transaction_events(target, datetime.utcnow()))
+
+@event.listens_for(Session, "after_flush")
+def _write_pending_events(session, flush_context):
+    # Mesma conexão e transação do flush: sem commit não há evento, e vice-versa
+    rows = session.info.pop(PENDING_EVENTS_KEY, None)
+    if rows:
+        session.connection().execute(OutboxEvent.__table__.insert(), rows)
+        session.info[EVENTS_WRITTEN_KEY] = True
+
+@event.listens_for(Session, "after_commit")
+def _wake_dispatchers(session):
+    if session.info.pop(EVENTS_WRITTEN_KEY, False):
+        for waker in list(commit_wakers):
+            waker()
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_pending_events(session, previous_transaction):
+    session.info.pop(PENDING_EVENTS_KEY, None)
+    # Um SAVEPOINT desfeito (group commit) leva só os próprios eventos; os gravados
+    # antes dele continuam na transação externa
+    if not previous_transaction.nested:
+        session.info.pop(EVENTS_WRITTEN_KEY, None)
@@ -1,13 +1,36 @@
-from sqlalchemy import Column, Integer, Float, String, DateTime, ForeignKey
-from sqlalchemy.sql import func
+from datetime import datetime, timezone
+
+from sqlalchemy import BigInteger, Column, Integer, String, DateTime, ForeignKey, Index, event
+from app.domain.entities.outbox_event import queue_transaction_events
 from app.infrastructure.database.connection import Base
 
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
 class Transaction(Base):
     __tablename__ = "transactions"
+    # Histórico e extratos filtram por conta e ordenam por data; no SQLite o id (rowid)
+    # já vem no fim de cada índice, então ORDER BY timestamp, id sai direto do índice.
+    # Bancos existentes recebem os índices em app.infrastructure.database.migrations
+    __table_args__ = (
+        Index("ix_transactions_user_id_timestamp", "user_id", "timestamp"),
+        Index("ix_transactions_sender_id_timestamp", "sender_id", "timestamp"),
+        Index("ix_transactions_receiver_id_timestamp", "receiver_id", "timestamp"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    amount = Column(Float, nullable=False)
+    # Em centavos; a API expõe o valor decimal
+    amount = Column(BigInteger, nullable=False)
     type = Column(String, nullable=False)
     description = Column(String, nullable=True)
     user_id = Column(Integer, ForeignKey("users.id"))
-    timestamp = Column(DateTime(timezone=True), server_default=func.now()) 
\ No newline at end of file
+    # Gerado no Python, e não com DEFAULT CURRENT_TIMESTAMP: no SQLite o banco gravaria
+    # 'AAAA-MM-DD HH:MM:SS' e o cursor do histórico, ligado com microssegundos, ordenaria
+    # depois de todas as linhas do mesmo segundo
+    timestamp = Column(DateTime(timezone=True), default=_utcnow)
+    # Só nas transferências: as duas pontas (user_id continua sendo quem originou)
+    sender_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    receiver_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+
+# Cada transação gravada gera seus eventos no outbox, no mesmo commit
+event.listen(Transaction, "after_insert", queue_transaction_events)
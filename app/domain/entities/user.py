@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float
+from sqlalchemy import BigInteger, Column, Integer, String
 from app.infrastructure.database.connection import Base
 
 class User(Base):
@@ -8,4 +8,5 @@ class User(Base):
     email = Column(String, unique=True, index=True)
     hashed_password = Column(String)
     full_name = Column(String)
-    balance = Column(Float, default=0.0) 
\ No newline at end of file
+    # Em centavos; a API expõe o valor decimal
+    balance = Column(BigInteger, default=0) 
\ No newline at end of file
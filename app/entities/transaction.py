@@ -1,18 +1,27 @@
+import time
 from datetime import datetime
+from typing import Optional
 
 class Transaction:
+    # amount em centavos; created_ts: segundos desde a época; created_at é calculado só quando lido
+    __slots__ = ("id", "amount", "sender_id", "receiver_id", "transaction_type", "created_ts")
+
     def __init__(
         self,
         id: int,
-        amount: float,
+        amount: int,
         sender_id: int,
         receiver_id: int,
         transaction_type: str,
-        created_at: datetime = datetime.now()
+        created_at: Optional[datetime] = None
     ):
         self.id = id
         self.amount = amount
         self.sender_id = sender_id
         self.receiver_id = receiver_id
         self.transaction_type = transaction_type
-        self.created_at = created_at 
\ No newline at end of file
+        self.created_ts = created_at.timestamp() if created_at else time.time()
+
+    @property
+    def created_at(self) -> datetime:
+        return datetime.fromtimestamp(self.created_ts)
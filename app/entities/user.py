@@ -2,19 +2,22 @@ from datetime import datetime
 from typing import Optional
 
 class User:
+    __slots__ = ("id", "name", "email", "password_hash", "balance")
+
     def __init__(
         self, 
         id: int,
         name: str,
         email: str,
         password_hash: str,
-        balance: float = 0.0
+        balance: int = 0
     ):
         self.id = id
         self.name = name
         self.email = email
         self.password_hash = password_hash
+        # Centavos
         self.balance = balance
 
-    def update_balance(self, amount: float) -> None:
+    def update_balance(self, amount: int) -> None:
         self.balance += amount 
\ No newline at end of file
@@ -0,0 +1,95 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable, Optional
+
+# Chave em Session.info com os saldos alterados na transação corrente
+# (conta -> novo saldo, ou None quando só dá para invalidar)
+PENDING_BALANCES_KEY = "pending_balances"
+
+# Saldo por conta (centavos), com read-through e write-through.
+#
+# Cada escrita leva um carimbo de um relógio monotônico. Uma leitura na fonte
+# pega o relógio antes de ler (begin_read) e só é guardada (fill) se nenhuma
+# escrita na conta aconteceu depois disso, então um valor lido antes de um
+# commit nunca sobrescreve o que o commit gravou e as leituras não voltam no
+# tempo. Para isso os escritores chamam write() na ordem dos commits, ainda
+# dentro do lock da conta.
+class BalanceCache:
+    def __init__(self, maxsize: int = 100_000, ttl: float = 30.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._clock = 0
+        # Maior carimbo já descartado por LRU: leituras anteriores a ele são recusadas
+        self._floor = 0
+        # conta -> (carimbo, saldo ou None se invalidado, expira em)
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, account_id: Hashable) -> Optional[int]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(account_id)
+            if entry is None or entry[1] is None or entry[2] <= now:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(account_id)
+            self.hits += 1
+            return entry[1]
+
+    def begin_read(self) -> int:
+        with self._lock:
+            return self._clock
+
+    def fill(self, account_id: Hashable, balance: int, token: int) -> bool:
+        with self._lock:
+            if token < self._floor:
+                return False
+            entry = self._entries.get(account_id)
+            if entry is not None and entry[0] > token:
+                return False
+            self._store(account_id, entry[0] if entry is not None else token, balance)
+            return True
+
+    def read_through(self, account_id: Hashable, load: Callable[[], int]) -> int:
+        balance = self.get(account_id)
+        if balance is None:
+            token = self.begin_read()
+            balance = load()
+            self.fill(account_id, balance, token)
+        return balance
+
+    def write(self, account_id: Hashable, balance: Optional[int]) -> None:
+        with self._lock:
+            self._clock += 1
+            self._store(account_id, self._clock, balance)
+
+    def invalidate(self, account_id: Hashable) -> None:
+        self.write(account_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._clock += 1
+            self._floor = self._clock
+            self._entries.clear()
+
+    def _store(self, account_id: Hashable, stamp: int, balance: Optional[int]) -> None:
+        self._entries[account_id] = (stamp, balance, time.monotonic() + self.ttl)
+        self._entries.move_to_end(account_id)
+        while len(self._entries) > self.maxsize:
+            _, (evicted_stamp, _, _) = self._entries.popitem(last=False)
+            self._floor = max(self._floor, evicted_stamp)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "size": len(self._entries),
+        }
@@ -0,0 +1,257 @@
+import csv
+import io
+import os
+import tempfile
+from datetime import datetime
+from itertools import islice
+from typing import IO, AsyncIterator, Dict, Iterable, Iterator, List, Optional, Tuple, Type
+
+from pydantic import BaseModel, TypeAdapter, ValidationError
+
+from app.infrastructure.serialization import dumps, loads
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:  # pyarrow é opcional: só Parquet e Arrow dependem dele
+    pyarrow = None
+
+DATASETS = ("users", "transactions")
+FORMATS = ("csv", "ndjson", "parquet", "arrow")
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+EXTENSIONS = {
+    ".csv": "csv",
+    ".ndjson": "ndjson",
+    ".jsonl": "ndjson",
+    ".parquet": "parquet",
+    ".arrow": "arrow",
+    ".arrows": "arrow",
+}
+DEFAULT_CHUNK_SIZE = 10_000
+MAX_REPORTED_ERRORS = 100
+# Corpo das importações via HTTP: em memória até este tamanho, depois em arquivo temporário
+SPOOL_MAX_MEMORY = 64 * 1024 * 1024
+
+# Colunas exportadas e o tipo de cada uma no Parquet/Arrow
+USER_FIELDS = (("id", "int"), ("name", "str"), ("email", "str"), ("balance", "float"))
+TRANSACTION_FIELDS = (
+    ("id", "int"),
+    ("amount", "float"),
+    ("type", "str"),
+    ("description", "str"),
+    ("user_id", "int"),
+    ("timestamp", "timestamp"),
+)
+
+class BulkFormatError(ValueError):
+    pass
+
+def resolve_format(format: Optional[str] = None, filename: Optional[str] = None, content_type: Optional[str] = None) -> str:
+    # Formato explícito, senão pela extensão do arquivo, senão pelo Content-Type
+    if format is None and filename:
+        format = EXTENSIONS.get(os.path.splitext(filename)[1].lower())
+    if format is None and content_type:
+        media_type = content_type.split(";")[0].strip().lower()
+        format = next((name for name, media in MEDIA_TYPES.items() if media == media_type), None)
+    if format is None:
+        raise BulkFormatError(f"Could not detect the file format; use one of {', '.join(FORMATS)}")
+    if format not in FORMATS:
+        raise BulkFormatError(f"Unsupported format {format!r}; use one of {', '.join(FORMATS)}")
+    if format in ("parquet", "arrow") and pyarrow is None:
+        raise BulkFormatError(f"The {format} format requires pyarrow (pip install pyarrow)")
+    return format
+
+def read_chunks(source: IO[bytes], format: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[List[dict]]:
+    # Blocos de até chunk_size linhas como dicts; o arquivo nunca é lido inteiro para a memória
+    if format == "parquet":
+        try:
+            for batch in pyarrow.parquet.ParquetFile(source).iter_batches(batch_size=chunk_size):
+                yield batch.to_pylist()
+        except pyarrow.ArrowException as e:
+            raise BulkFormatError(f"Invalid parquet file: {e}")
+        return
+    if format == "arrow":
+        try:
+            for batch in pyarrow.ipc.open_stream(source):
+                for offset in range(0, batch.num_rows, chunk_size):
+                    yield batch.slice(offset, chunk_size).to_pylist()
+        except pyarrow.ArrowException as e:
+            raise BulkFormatError(f"Invalid arrow stream: {e}")
+        return
+
+    rows = _csv_rows(source) if format == "csv" else _ndjson_rows(source)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+def _csv_rows(source: IO[bytes]) -> Iterator[dict]:
+    text = io.TextIOWrapper(source, encoding="utf-8-sig", newline="")
+    try:
+        for row in csv.DictReader(text):
+            # Célula vazia é ausência de valor: vale o padrão do campo
+            yield {key: value for key, value in row.items() if value != ""}
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise BulkFormatError(f"Invalid CSV file: {e}")
+    finally:
+        # Devolve o arquivo sem fechá-lo junto com o wrapper
+        text.detach()
+
+def _ndjson_rows(source: IO[bytes]) -> Iterator[dict]:
+    for line in source:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield loads(line)
+        except ValueError:
+            # Segue como texto: a validação rejeita a linha e ela entra no relatório
+            yield line.decode(errors="replace")
+
+_adapters: Dict[type, TypeAdapter] = {}
+
+def validate_chunk(model: Type[BaseModel], rows: List[dict], first_row: int) -> Tuple[List[Tuple[int, BaseModel]], List[dict]]:
+    # Valida o bloco de uma vez; só quando algo falha refaz linha a linha para separar os erros
+    adapter = _adapters.get(model)
+    if adapter is None:
+        adapter = _adapters[model] = TypeAdapter(List[model])
+    try:
+        return list(enumerate(adapter.validate_python(rows), first_row)), []
+    except ValidationError:
+        pass
+
+    valid, errors = [], []
+    for number, row in enumerate(rows, first_row):
+        try:
+            valid.append((number, model.model_validate(row)))
+        except ValidationError as e:
+            error = e.errors()[0]
+            location = ".".join(str(part) for part in error["loc"])
+            errors.append({"row": number, "error": f"{location}: {error['msg']}" if location else error["msg"]})
+    return valid, errors
+
+class ImportReport:
+    def __init__(self, dataset: str):
+        self.dataset = dataset
+        self.read = 0
+        self.imported = 0
+        self.skipped = 0
+        self.accounts_updated = 0
+        self.errors: List[dict] = []
+
+    def reject(self, row: int, error: str) -> None:
+        self.skipped += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row, "error": error})
+
+    def as_dict(self) -> dict:
+        return {
+            "dataset": self.dataset,
+            "read": self.read,
+            "imported": self.imported,
+            "skipped": self.skipped,
+            "accounts_updated": self.accounts_updated,
+            "errors": sorted(self.errors, key=lambda error: error["row"]),
+        }
+
+def validated_chunks(
+    model: Type[BaseModel],
+    source: IO[bytes],
+    format: str,
+    report: ImportReport,
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Iterator[List[Tuple[int, BaseModel]]]:
+    # Linhas válidas de cada bloco com o número da linha (1 = primeira linha de dados)
+    for rows in read_chunks(source, format, chunk_size):
+        valid, errors = validate_chunk(model, rows, report.read + 1)
+        report.read += len(rows)
+        for error in errors:
+            report.reject(error["row"], error["error"])
+        yield valid
+
+def write_chunks(chunks: Iterable[List[dict]], format: str, fields: Tuple[Tuple[str, str], ...]) -> Iterator[bytes]:
+    # Serializa os blocos conforme chegam; serve tanto para StreamingResponse quanto para arquivo
+    names = [name for name, _ in fields]
+    if format in ("parquet", "arrow"):
+        yield from _write_arrow(chunks, format, fields)
+        return
+    if format == "ndjson":
+        for chunk in chunks:
+            if chunk:
+                yield b"".join(dumps(row) + b"\n" for row in chunk)
+        return
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(names)
+    yield buffer.getvalue().encode()
+    for chunk in chunks:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([_csv_value(row.get(name)) for name in names] for row in chunk)
+        yield buffer.getvalue().encode()
+
+def _csv_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+_ARROW_TYPES = {
+    "int": lambda: pyarrow.int64(),
+    "float": lambda: pyarrow.float64(),
+    "str": lambda: pyarrow.string(),
+    "timestamp": lambda: pyarrow.timestamp("us"),
+}
+
+class _ChunkSink(io.RawIOBase):
+    # Arquivo só de escrita que guarda os bytes até o próximo drain()
+    def __init__(self):
+        self._parts: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+def _write_arrow(chunks: Iterable[List[dict]], format: str, fields: Tuple[Tuple[str, str], ...]) -> Iterator[bytes]:
+    schema = pyarrow.schema([(name, _ARROW_TYPES[kind]()) for name, kind in fields])
+    sink = _ChunkSink()
+    if format == "parquet":
+        # Cada bloco vira um row group
+        writer = pyarrow.parquet.ParquetWriter(sink, schema)
+        write = lambda chunk: writer.write_table(pyarrow.Table.from_pylist(chunk, schema=schema))
+    else:
+        writer = pyarrow.ipc.new_stream(sink, schema)
+        write = lambda chunk: writer.write_batch(pyarrow.RecordBatch.from_pylist(chunk, schema=schema))
+    for chunk in chunks:
+        if chunk:
+            write(chunk)
+            yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+async def spool(body: AsyncIterator[bytes], max_memory: int = SPOOL_MAX_MEMORY) -> IO[bytes]:
+    # Parquet precisa de acesso aleatório (o rodapé fica no fim), então o corpo é guardado antes
+    spooled = tempfile.SpooledTemporaryFile(max_size=max_memory)
+    async for data in body:
+        spooled.write(data)
+    spooled.seek(0)
+    return spooled
@@ -1,12 +1,92 @@
+from typing import Optional
+
 from pydantic_settings import BaseSettings
 
-class Settings(BaseSettings):
-    DATABASE_URL: str
+class CommonSettings(BaseSettings):
+    # Lidos pelas duas APIs: a em memória (app.main) e a SQL (app/api). A em memória
+    # não usa JWT, então monta só esta parte e não exige SECRET_KEY e companhia
+
+    # Limites por janela deslizante (0 desliga). Com RATE_LIMIT_DB os contadores ficam
+    # num SQLite local compartilhado pelos workers; sem ele, na memória de cada processo
+    RATE_LIMIT_DB: Optional[str] = None
+    LOGIN_LIMIT_PER_IP: int = 30
+    LOGIN_LIMIT_PER_EMAIL: int = 10
+    LOGIN_LIMIT_WINDOW_SECONDS: float = 60.0
+    TRANSFER_LIMIT_PER_ACCOUNT: int = 30
+    TRANSFER_LIMIT_WINDOW_SECONDS: float = 60.0
+    # Valor total (decimal) que uma conta pode transferir na janela
+    TRANSFER_VOLUME_LIMIT: float = 0
+    TRANSFER_VOLUME_WINDOW_SECONDS: float = 86400.0
+
+    # Importação/exportação em massa: rotas desligadas sem um token de administrador
+    BULK_ADMIN_TOKEN: Optional[str] = None
+    BULK_CHUNK_SIZE: int = 10000
+
+    class Config:
+        env_file = ".env"
+
+class Settings(CommonSettings):
+    DATABASE_URL: str = "sqlite:///./wallet.db"
     SECRET_KEY: str
     ALGORITHM: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int
 
-    class Config:
-        env_file = ".env"
+    # Engine e pool de conexões
+    DATABASE_READ_URL: Optional[str] = None
+    # Padrão: DATABASE_URL com o driver aiosqlite
+    ASYNC_DATABASE_URL: Optional[str] = None
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 3600
+
+    # Pragmas do SQLite: synchronous=FULL prioriza durabilidade, NORMAL/OFF vazão
+    SQLITE_PRAGMAS_ENABLED: bool = True
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_CACHE_SIZE: int = -65536
+    SQLITE_MMAP_SIZE: int = 268435456
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+
+    # Hash de senhas (bcrypt) fora do event loop
+    PASSWORD_HASH_EXECUTOR: str = "thread"
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_PENDING: int = 64
+
+    # Caches de autenticação
+    TOKEN_CACHE_SIZE: int = 10000
+    TOKEN_CACHE_TTL_SECONDS: float = 300.0
+    USER_CACHE_SIZE: int = 10000
+    USER_CACHE_TTL_SECONDS: float = 30.0
+
+    # Cache de saldos por conta (read-through, atualizado a cada commit)
+    BALANCE_CACHE_SIZE: int = 100000
+    BALANCE_CACHE_TTL_SECONDS: float = 30.0
+
+    # Lotes e group commit
+    BATCH_MAX_OPERATIONS: int = 10000
+    GROUP_COMMIT_ENABLED: bool = False
+    GROUP_COMMIT_WINDOW_MS: float = 2.0
+    GROUP_COMMIT_MAX_BATCH: int = 256
+
+    # Outbox: eventos das transações gravados no mesmo commit e entregues em segundo plano.
+    # OUTBOX_SINKS separados por vírgula: file:CAMINHO, webhook:URL, queue
+    OUTBOX_ENABLED: bool = True
+    OUTBOX_SINKS: str = ""
+    OUTBOX_BATCH_SIZE: int = 500
+    OUTBOX_POLL_INTERVAL_SECONDS: float = 1.0
+    OUTBOX_MAX_ATTEMPTS: int = 10
+    OUTBOX_RETRY_BASE_SECONDS: float = 1.0
+    OUTBOX_RETRY_MAX_SECONDS: float = 300.0
+    # Entregues ficam este tempo na tabela (0 mantém para sempre)
+    OUTBOX_RETENTION_HOURS: float = 24.0
+
+common_settings = CommonSettings()
 
-settings = Settings() 
\ No newline at end of file
+def __getattr__(name: str):
+    # Settings só é montado quando alguém importa `settings` (a API SQL e os CLIs dela),
+    # para que a API em memória possa importar common_settings sem os segredos do JWT
+    if name == "settings":
+        globals()["settings"] = Settings()
+        return globals()["settings"]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,13 +1,148 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+import time
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+
+from app.infrastructure.config import settings
+from app.infrastructure.metrics import observe_stage
 
 # Alterando para SQLite
-DATABASE_URL = "sqlite:///./wallet.db"
+DATABASE_URL = settings.DATABASE_URL
+
+SQLITE_JOURNAL_MODES = {"DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"}
+SQLITE_SYNCHRONOUS_LEVELS = {"OFF", "NORMAL", "FULL", "EXTRA"}
+
+def _sqlite_pragmas(read_only: bool) -> list:
+    journal_mode = settings.SQLITE_JOURNAL_MODE.upper()
+    synchronous = settings.SQLITE_SYNCHRONOUS.upper()
+    if journal_mode not in SQLITE_JOURNAL_MODES:
+        raise ValueError(f"Invalid SQLITE_JOURNAL_MODE: {settings.SQLITE_JOURNAL_MODE}")
+    if synchronous not in SQLITE_SYNCHRONOUS_LEVELS:
+        raise ValueError(f"Invalid SQLITE_SYNCHRONOUS: {settings.SQLITE_SYNCHRONOUS}")
+
+    pragmas = [
+        f"PRAGMA busy_timeout = {int(settings.SQLITE_BUSY_TIMEOUT_MS)}",
+        f"PRAGMA cache_size = {int(settings.SQLITE_CACHE_SIZE)}",
+        f"PRAGMA mmap_size = {int(settings.SQLITE_MMAP_SIZE)}",
+        "PRAGMA temp_store = MEMORY",
+    ]
+    if read_only:
+        pragmas.append("PRAGMA query_only = ON")
+    else:
+        # journal_mode é persistido no arquivo; só a conexão de escrita o altera
+        pragmas.append(f"PRAGMA journal_mode = {journal_mode}")
+        pragmas.append(f"PRAGMA synchronous = {synchronous}")
+    return pragmas
+
+def create_wallet_engine(url: str, read_only: bool = False) -> Engine:
+    database_url = make_url(url)
+    if database_url.get_backend_name() != "sqlite":
+        return create_engine(
+            url,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+            pool_pre_ping=True,
+        )
+
+    in_memory = database_url.database in (None, "", ":memory:")
+    pool_options = {}
+    if not in_memory:
+        pool_options = {
+            "pool_size": settings.DB_POOL_SIZE,
+            "max_overflow": settings.DB_MAX_OVERFLOW,
+            "pool_timeout": settings.DB_POOL_TIMEOUT,
+        }
+        if read_only:
+            database_url = database_url.set(
+                database=f"file:{database_url.database}",
+                query={**database_url.query, "mode": "ro", "uri": "true"},
+            )
+
+    # Adicionando check_same_thread=False para permitir múltiplas threads
+    engine = create_engine(
+        database_url,
+        connect_args={"check_same_thread": False},
+        **pool_options,
+    )
+
+    if settings.SQLITE_PRAGMAS_ENABLED:
+        _install_pragmas(engine, _sqlite_pragmas(read_only and not in_memory))
+    _install_query_timing(engine)
+
+    return engine
+
+def _install_pragmas(engine: Engine, pragmas: list) -> None:
+    @event.listens_for(engine, "connect")
+    def _apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+def _install_query_timing(engine: Engine) -> None:
+    @event.listens_for(engine, "before_cursor_execute")
+    def _query_started(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _query_finished(conn, cursor, statement, parameters, context, executemany):
+        observe_stage("db_query", time.perf_counter() - conn.info["query_started"].pop())
 
-# Adicionando check_same_thread=False para permitir múltiplas threads
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+@event.listens_for(Session, "before_commit")
+def _commit_started(session):
+    session.info["commit_started"] = time.perf_counter()
+
+@event.listens_for(Session, "after_commit")
+def _commit_finished(session):
+    # Inclui o flush pendente, que roda dentro do commit
+    started = session.info.pop("commit_started", None)
+    if started is not None:
+        observe_stage("db_commit", time.perf_counter() - started)
+
+def create_async_wallet_engine(url: str) -> AsyncEngine:
+    database_url = make_url(url)
+    if database_url.get_backend_name() != "sqlite":
+        return create_async_engine(
+            url,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+            pool_pre_ping=True,
+        )
+
+    # Localmente o mesmo arquivo SQLite, acessado via aiosqlite
+    database_url = database_url.set(drivername="sqlite+aiosqlite")
+    pool_options = {}
+    if database_url.database not in (None, "", ":memory:"):
+        pool_options = {
+            "pool_size": settings.DB_POOL_SIZE,
+            "max_overflow": settings.DB_MAX_OVERFLOW,
+            "pool_timeout": settings.DB_POOL_TIMEOUT,
+        }
+    engine = create_async_engine(database_url, **pool_options)
+    if settings.SQLITE_PRAGMAS_ENABLED:
+        _install_pragmas(engine.sync_engine, _sqlite_pragmas(read_only=False))
+    _install_query_timing(engine.sync_engine)
+    return engine
+
+engine = create_wallet_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Conexões somente leitura para consultas (histórico, relatórios); no SQLite em WAL
+# os leitores não bloqueiam o escritor
+read_engine = create_wallet_engine(settings.DATABASE_READ_URL or DATABASE_URL, read_only=True)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
+async_engine = create_async_wallet_engine(settings.ASYNC_DATABASE_URL or DATABASE_URL)
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False, autoflush=False)
+
 Base = declarative_base()
 
 def get_db():
@@ -15,4 +150,15 @@ def get_db():
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
+
+def get_read_db():
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
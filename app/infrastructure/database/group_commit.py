@@ -0,0 +1,105 @@
+import queue
+import threading
+import time
+from typing import Any, Callable, Iterable, List, Optional
+
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.infrastructure.config import settings
+from app.infrastructure.database.connection import SessionLocal
+from app.infrastructure.locks import account_locks
+
+# De quanto em quanto tempo quem espera confere se a thread do group commit ainda está viva
+WORKER_CHECK_SECONDS = 1.0
+
+class _PendingWork:
+    def __init__(self, work: Callable[[Session], Any], account_ids: Iterable[int]):
+        self.work = work
+        self.account_ids = tuple(account_ids)
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.done = threading.Event()
+
+class GroupCommitter:
+    # Junta operações concorrentes numa janela curta e faz um único commit para todas
+    def __init__(self, session_factory: sessionmaker, window_ms: float = 2.0, max_batch: int = 256):
+        self.session_factory = session_factory
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self._queue: "queue.Queue[_PendingWork]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def submit(self, work: Callable[[Session], Any], account_ids: Iterable[int]) -> Any:
+        # Cada operação roda num SAVEPOINT: se ela falhar (com qualquer exceção) só
+        # ela é desfeita, o resto da janela segue para o commit
+        pending = _PendingWork(work, account_ids)
+        self._ensure_started()
+        self._queue.put(pending)
+        # Se a thread morrer, outra é criada e pega o que ficou na fila
+        while not pending.done.wait(WORKER_CHECK_SECONDS):
+            self._ensure_started()
+        if pending.error is not None:
+            raise pending.error
+        return pending.result
+
+    def _ensure_started(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name="group-commit", daemon=True)
+                    self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            self._commit(batch)
+
+    def _commit(self, batch: List[_PendingWork]) -> None:
+        account_ids = {account_id for pending in batch for account_id in pending.account_ids}
+        session = None
+        try:
+            session = self.session_factory(expire_on_commit=False)
+            with account_locks.lock(*account_ids):
+                if session.get_bind().dialect.name == "sqlite":
+                    # O pysqlite só abre a transação antes de um INSERT/UPDATE: sem este BEGIN
+                    # cada SAVEPOINT seria a transação mais externa e o RELEASE faria o próprio
+                    # commit. IMMEDIATE pega o lock de escrita já no início da janela
+                    session.connection().exec_driver_sql("BEGIN IMMEDIATE")
+                for pending in batch:
+                    savepoint = session.begin_nested()
+                    try:
+                        pending.result = pending.work(session)
+                        savepoint.commit()
+                    except Exception as e:
+                        savepoint.rollback()
+                        pending.result = None
+                        pending.error = e
+                session.commit()
+        except BaseException as e:
+            if session is not None:
+                session.rollback()
+            for pending in batch:
+                if pending.error is None:
+                    pending.result = None
+                    pending.error = e
+        finally:
+            if session is not None:
+                session.close()
+            for pending in batch:
+                pending.done.set()
+
+group_committer = GroupCommitter(
+    SessionLocal,
+    window_ms=settings.GROUP_COMMIT_WINDOW_MS,
+    max_batch=settings.GROUP_COMMIT_MAX_BATCH
+)
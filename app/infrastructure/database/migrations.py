@@ -0,0 +1,119 @@
+"""Migrações leves do banco SQL: cria as tabelas que faltam e aplica, em ordem,
+os passos que bancos já existentes ainda não receberam.
+
+    python -m app.infrastructure.database.migrations
+"""
+from typing import List, Optional
+
+from sqlalchemy import Integer, inspect, text
+from sqlalchemy.engine import Connection, Engine
+
+from app.domain.entities.outbox_event import OutboxEvent
+from app.domain.entities.transaction import Transaction
+from app.domain.entities.user import User
+from app.infrastructure.database.connection import Base, engine as default_engine
+
+def _add_transfer_parties(connection: Connection) -> None:
+    columns = {column["name"] for column in inspect(connection).get_columns("transactions")}
+    for name in ("sender_id", "receiver_id"):
+        if name not in columns:
+            connection.execute(text(f"ALTER TABLE transactions ADD COLUMN {name} INTEGER REFERENCES users (id)"))
+    # Transferências antigas só guardavam o remetente (em user_id)
+    connection.execute(text(
+        "UPDATE transactions SET sender_id = user_id WHERE type = 'transfer' AND sender_id IS NULL"
+    ))
+
+def _create_indexes(connection: Connection) -> None:
+    # CREATE INDEX só para os que ainda não existem; numa tabela grande é o passo demorado
+    for table in (User.__table__, Transaction.__table__):
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
+
+# Colunas monetárias que eram REAL e passaram a guardar centavos inteiros
+MONEY_COLUMNS = (("users", "balance"), ("transactions", "amount"))
+
+def _money_to_cents(connection: Connection) -> None:
+    inspector = inspect(connection)
+    for table, name in MONEY_COLUMNS:
+        column = next(column for column in inspector.get_columns(table) if column["name"] == name)
+        if isinstance(column["type"], Integer):
+            continue  # já convertida
+        if connection.dialect.name == "sqlite":
+            # SQLite não muda o tipo de uma coluna: cria a nova, copia e troca o nome
+            connection.execute(text(f"ALTER TABLE {table} ADD COLUMN {name}_cents BIGINT"))
+            connection.execute(text(f"UPDATE {table} SET {name}_cents = CAST(ROUND({name} * 100) AS INTEGER)"))
+            connection.execute(text(f"ALTER TABLE {table} DROP COLUMN {name}"))
+            connection.execute(text(f"ALTER TABLE {table} RENAME COLUMN {name}_cents TO {name}"))
+        else:
+            connection.execute(text(
+                f"ALTER TABLE {table} ALTER COLUMN {name} TYPE BIGINT USING ROUND({name} * 100)"
+            ))
+
+def _create_outbox(connection: Connection) -> None:
+    # create_all já cria a tabela; o passo existe para a versão registrar o outbox
+    OutboxEvent.__table__.create(connection, checkfirst=True)
+
+def _create_outbox_indexes(connection: Connection) -> None:
+    for index in OutboxEvent.__table__.indexes:
+        index.create(connection, checkfirst=True)
+
+def _normalize_timestamps(connection: Connection) -> None:
+    # Linhas gravadas pelo DEFAULT CURRENT_TIMESTAMP do SQLite não têm a fração de segundo
+    # que o SQLAlchemy grava e usa nos parâmetros; sem ela a comparação de texto do cursor
+    # do histórico pula as linhas seguintes do mesmo segundo
+    if connection.dialect.name == "sqlite":
+        connection.execute(text(
+            "UPDATE transactions SET timestamp = timestamp || '.000000' WHERE length(timestamp) = 19"
+        ))
+
+# (versão, descrição, passo). Passos novos entram no fim e precisam ser idempotentes:
+# fora do SQLite não há onde guardar a versão e todos rodam a cada migrate()
+MIGRATIONS = [
+    (1, "sender_id/receiver_id nas transações", _add_transfer_parties),
+    (2, "índices por conta e data nas transações", _create_indexes),
+    (3, "valores em centavos inteiros", _money_to_cents),
+    (4, "tabela outbox_events", _create_outbox),
+    (5, "índice dos eventos pendentes por conta", _create_outbox_indexes),
+    (6, "horários das transações com microssegundos", _normalize_timestamps),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+def get_version(connection: Connection) -> Optional[int]:
+    if connection.dialect.name != "sqlite":
+        return None
+    return connection.execute(text("PRAGMA user_version")).scalar()
+
+def _set_version(connection: Connection, version: int) -> None:
+    if connection.dialect.name == "sqlite":
+        connection.execute(text(f"PRAGMA user_version = {int(version)}"))
+
+def migrate(engine: Engine = None) -> List[int]:
+    # Tudo numa transação; retorna as versões aplicadas
+    engine = engine or default_engine
+    with engine.begin() as connection:
+        fresh = not inspect(connection).has_table(Transaction.__tablename__)
+        Base.metadata.create_all(connection)
+        if fresh:
+            # create_all já criou colunas e índices atuais
+            _set_version(connection, SCHEMA_VERSION)
+            return []
+
+        version = get_version(connection)
+        applied = []
+        for number, _, step in MIGRATIONS:
+            if version is None or number > version:
+                step(connection)
+                applied.append(number)
+        if applied:
+            _set_version(connection, SCHEMA_VERSION)
+    return applied
+
+def main():
+    applied = migrate()
+    for number, description, _ in MIGRATIONS:
+        if number in applied:
+            print(f"applied {number}: {description}")
+    print(f"schema at version {SCHEMA_VERSION}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+import asyncio
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+from app.infrastructure.metrics import stage
+
+DEFAULT_TTL_SECONDS = 24 * 60 * 60
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+MAX_KEY_LENGTH = 255
+
+class IdempotencyConflict(Exception):
+    pass
+
+def _estimate_size(value: Any) -> int:
+    if hasattr(value, "model_dump_json"):
+        return len(value.model_dump_json()) + 200
+    return sys.getsizeof(value)
+
+class IdempotencyStore:
+    # Resultados por chave de idempotência, com LRU limitado em bytes e TTL.
+    # Requisições repetidas que chegam enquanto a primeira ainda executa esperam
+    # pelo mesmo resultado em vez de executar de novo.
+    def __init__(self, ttl: float = DEFAULT_TTL_SECONDS, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._entries: "OrderedDict[Hashable, Tuple[float, str, Any, int]]" = OrderedDict()
+        self._in_flight: Dict[Hashable, Tuple[str, Future]] = {}
+        self._lock = threading.Lock()
+        # Repetições respondidas sem executar (guardadas ou em andamento) e execuções
+        self.hits = 0
+        self.misses = 0
+
+    def run(self, key: Hashable, fingerprint: str, fn: Callable[[], Any]) -> Any:
+        leader, value = self._claim(key, fingerprint)
+        if not leader:
+            if not isinstance(value, Future):
+                return value
+            with stage("idempotency_wait"):
+                return value.result()
+        return self._execute(key, fingerprint, fn)
+
+    async def run_async(self, key: Hashable, fingerprint: str, fn: Callable[[], Any]) -> Any:
+        leader, value = self._claim(key, fingerprint)
+        if not leader:
+            if not isinstance(value, Future):
+                return value
+            with stage("idempotency_wait"):
+                return await asyncio.wrap_future(value)
+        return self._execute(key, fingerprint, fn)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "size": len(self._entries),
+        }
+
+    def _claim(self, key: Hashable, fingerprint: str) -> Tuple[bool, Any]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= now:
+                self._remove(key)
+                entry = None
+            if entry is not None:
+                if entry[1] != fingerprint:
+                    raise IdempotencyConflict("Idempotency-Key reused with a different request")
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return False, entry[2]
+
+            in_flight = self._in_flight.get(key)
+            if in_flight is not None:
+                if in_flight[0] != fingerprint:
+                    raise IdempotencyConflict("Idempotency-Key reused with a different request")
+                self.hits += 1
+                return False, in_flight[1]
+
+            self.misses += 1
+            self._in_flight[key] = (fingerprint, Future())
+            return True, None
+
+    def _execute(self, key: Hashable, fingerprint: str, fn: Callable[[], Any]) -> Any:
+        future = self._in_flight[key][1]
+        try:
+            result = fn()
+        except BaseException as e:
+            # Falhas não ficam guardadas: uma nova tentativa executa de novo
+            with self._lock:
+                del self._in_flight[key]
+            future.set_exception(e)
+            raise
+        size = _estimate_size(result)
+        with self._lock:
+            del self._in_flight[key]
+            if size <= self.max_bytes:
+                self._entries[key] = (time.monotonic() + self.ttl, fingerprint, result, size)
+                self.bytes += size
+                while self.bytes > self.max_bytes:
+                    self._remove(next(iter(self._entries)))
+        future.set_result(result)
+        return result
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key)
+        self.bytes -= entry[3]
+
+# Instância global compartilhada pelas rotas que movimentam dinheiro
+idempotency_store = IdempotencyStore()
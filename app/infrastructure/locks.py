@@ -0,0 +1,34 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, List
+
+from app.infrastructure.metrics import observe_stage
+
+DEFAULT_STRIPES = 1024
+
+class AccountLockManager:
+    def __init__(self, stripes: int = DEFAULT_STRIPES):
+        self.locks: List[threading.Lock] = [threading.Lock() for _ in range(stripes)]
+
+    def stripe(self, account_id: int) -> int:
+        return hash(account_id) % len(self.locks)
+
+    @contextmanager
+    def lock(self, *account_ids: int) -> Iterator[None]:
+        # Stripes sempre adquiridos em ordem crescente para evitar deadlock
+        stripes = sorted({self.stripe(account_id) for account_id in account_ids})
+        acquired = []
+        started = time.perf_counter()
+        try:
+            for stripe in stripes:
+                self.locks[stripe].acquire()
+                acquired.append(stripe)
+            observe_stage("account_lock_wait", time.perf_counter() - started)
+            yield
+        finally:
+            for stripe in reversed(acquired):
+                self.locks[stripe].release()
+
+# Instância global compartilhada pelas rotas e casos de uso
+account_locks = AccountLockManager()
@@ -0,0 +1,213 @@
+import hmac
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Limites (em segundos) dos buckets de latência, no formato do Prometheus
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+PROFILE_HEADER = "x-profile"
+PROFILE_ID_HEADER = b"x-profile-id"
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._series: Dict[tuple, object] = {}
+        self._lock = threading.Lock()
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._series[labels] = self._series.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            series = list(self._series.items())
+        return self._header() + [
+            f"{self.name}{_labels(self.labelnames, labels)} {_format(value)}" for labels, value in series
+        ]
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = LATENCY_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = buckets
+
+    def observe(self, value: float, *labels: str) -> None:
+        # Contagem por bucket (não cumulativa); acumula só na exportação
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            series = [(labels, list(counts), total) for labels, (counts, total) in self._series.items()]
+        lines = self._header()
+        for labels, counts, total in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound!r}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {total!r}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+class Registry:
+    def __init__(self):
+        self.metrics: List[_Metric] = []
+        self.collectors: List[Callable[[], Iterable[str]]] = []
+        self.caches: Dict[str, object] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def register_cache(self, name: str, cache) -> None:
+        # Qualquer objeto com stats() no formato de TTLCache
+        self.caches[name] = cache
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        lines.extend(self._render_caches())
+        for collector in self.collectors:
+            lines.extend(collector())
+        return "\n".join(lines) + "\n"
+
+    def _render_caches(self) -> List[str]:
+        if not self.caches:
+            return []
+        stats = {name: cache.stats() for name, cache in self.caches.items()}
+        lines = []
+        for key, kind, documentation in (
+            ("hits", "counter", "Cache lookups that found a live entry."),
+            ("misses", "counter", "Cache lookups that found nothing or an expired entry."),
+            ("hit_rate", "gauge", "Fraction of lookups served from the cache since startup."),
+            ("size", "gauge", "Entries currently held by the cache."),
+        ):
+            name = f"wallet_cache_{key}" + ("_total" if kind == "counter" else "")
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {kind}")
+            for cache_name, values in stats.items():
+                lines.append(f'{name}{{cache="{_escape(cache_name)}"}} {_format(values[key])}')
+        return lines
+
+registry = Registry()
+
+REQUEST_SECONDS = registry.register(Histogram(
+    "wallet_http_request_duration_seconds", "HTTP request latency by route.", ("method", "route")
+))
+REQUESTS = registry.register(Counter(
+    "wallet_http_requests_total", "HTTP responses by route and status.", ("method", "route", "status")
+))
+IN_FLIGHT = registry.register(Gauge(
+    "wallet_http_requests_in_flight", "HTTP requests currently being served.", ("method",)
+))
+STAGE_SECONDS = registry.register(Histogram(
+    "wallet_stage_duration_seconds",
+    "Time spent in hot-path stages (hashing, JWT decode, lookups, lock waits, DB and WAL writes, serialization).",
+    ("stage",)
+))
+
+def observe_stage(name: str, seconds: float) -> None:
+    STAGE_SECONDS.observe(seconds, name)
+
+@contextmanager
+def stage(name: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - started, name)
+
+# Middleware ASGI puro: mede cada requisição pelo template da rota (não pela URL,
+# para não explodir a cardinalidade) e, com o header X-Profile igual ao token
+# configurado, amostra as pilhas durante a requisição
+class MetricsMiddleware:
+    def __init__(self, app, profiler=None, profile_token: Optional[str] = None):
+        self.app = app
+        self.profiler = profiler if profile_token else None
+        self.profile_token = profile_token.encode() if profile_token else None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+        session = None
+        if self.profiler is not None and self._wants_profile(scope):
+            session = self.profiler.start()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if session is not None:
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (PROFILE_ID_HEADER, session.id.encode())
+                    ]
+            await send(message)
+
+        IN_FLIGHT.inc(method)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            IN_FLIGHT.dec(method)
+            if session is not None:
+                self.profiler.stop(session)
+            # O roteador do FastAPI grava a rota casada no próprio scope
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            REQUEST_SECONDS.observe(elapsed, method, route)
+            REQUESTS.inc(method, route, str(status))
+
+    def _wants_profile(self, scope) -> bool:
+        for name, value in scope.get("headers", ()):
+            if name == PROFILE_HEADER.encode():
+                return hmac.compare_digest(value, self.profile_token)
+        return False
@@ -0,0 +1,28 @@
+from decimal import Decimal, InvalidOperation
+from typing import Union
+
+# Valores monetários são inteiros em centavos do armazenamento às somas; só a
+# fronteira da API (app/schemas) converte de/para o valor decimal
+CENTS_PER_UNIT = 100
+# Um int64 em centavos comporta ±92 quatrilhões de unidades
+MAX_CENTS = 2 ** 63 - 1
+
+def to_cents(value: Union[int, float, str, Decimal]) -> int:
+    # Converte pelo texto decimal (repr do float), então 0.1 vira 10 e não 10.000000000000002
+    if isinstance(value, bool):
+        raise ValueError("Invalid amount")
+    try:
+        cents = Decimal(str(value)) * CENTS_PER_UNIT
+    except InvalidOperation:
+        raise ValueError("Invalid amount")
+    if not cents.is_finite():
+        raise ValueError("Invalid amount")
+    if cents != cents.to_integral_value():
+        raise ValueError("Amount cannot have more than 2 decimal places")
+    if abs(cents) > MAX_CENTS:
+        raise ValueError("Amount is too large")
+    return int(cents)
+
+def from_cents(cents: int) -> float:
+    # O double mais próximo do valor decimal: 1234 -> 12.34
+    return cents / CENTS_PER_UNIT
@@ -0,0 +1,108 @@
+"""Outbox transacional: cada transação gravada no banco SQL gera eventos na
+tabela outbox_events, no mesmo commit (listeners em app.domain.entities.outbox_event).
+Um dispatcher asyncio (app.infrastructure.outbox_dispatcher) entrega os eventos
+em lotes aos destinos configurados, com novas tentativas e mantendo a ordem por
+conta. Para rodar o dispatcher num processo à parte:
+
+    python -m app.infrastructure.outbox --sink file:./events.ndjson
+    python -m app.infrastructure.outbox --sink webhook:http://localhost:9000/events --once
+"""
+import argparse
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Callable, Optional
+
+from sqlalchemy import delete, exists, or_, select
+from sqlalchemy.orm import aliased
+
+from app.domain.entities.outbox_event import OutboxEvent, commit_wakers
+from app.infrastructure.config import settings
+from app.infrastructure.database.connection import AsyncSessionLocal
+from app.infrastructure.outbox_dispatcher import OutboxDispatcher, parse_sink, parse_sinks
+
+def ready_events_query(limit: int, now: datetime):
+    # Pendentes prontos em ordem de id, sem os de contas com um evento anterior ainda
+    # aguardando nova tentativa ou descartado: essa conta não passa dele, as outras seguem
+    earlier = aliased(OutboxEvent)
+    blocked = exists().where(
+        earlier.account_id == OutboxEvent.account_id,
+        earlier.id < OutboxEvent.id,
+        earlier.delivered_at.is_(None),
+        or_(earlier.failed_at.is_not(None), earlier.available_at > now),
+    )
+    return (
+        select(OutboxEvent)
+        .where(
+            OutboxEvent.delivered_at.is_(None),
+            OutboxEvent.failed_at.is_(None),
+            or_(OutboxEvent.available_at.is_(None), OutboxEvent.available_at <= now),
+            ~blocked,
+        )
+        .order_by(OutboxEvent.id)
+        .limit(limit)
+    )
+
+class SqlOutboxStore:
+    # Eventos na tabela outbox_events; o que o dispatcher marca nas linhas é gravado no fim do lote
+    def __init__(self, session_factory=AsyncSessionLocal):
+        self.session_factory = session_factory
+
+    @asynccontextmanager
+    async def batch(self, limit: int, now: datetime):
+        async with self.session_factory() as session:
+            rows = (await session.execute(ready_events_query(limit, now))).scalars().all()
+            yield rows
+            await session.commit()
+
+    async def purge(self, before: datetime) -> None:
+        async with self.session_factory() as session:
+            await session.execute(delete(OutboxEvent).where(OutboxEvent.delivered_at < before))
+            await session.commit()
+
+    def add_waker(self, waker: Callable[[], None]) -> None:
+        commit_wakers.add(waker)
+
+    def remove_waker(self, waker: Callable[[], None]) -> None:
+        commit_wakers.discard(waker)
+
+def build_dispatcher(sinks: Optional[list] = None) -> OutboxDispatcher:
+    if sinks is None:
+        sinks = parse_sinks(settings.OUTBOX_SINKS)
+    return OutboxDispatcher(
+        sinks,
+        SqlOutboxStore(),
+        batch_size=settings.OUTBOX_BATCH_SIZE,
+        poll_interval=settings.OUTBOX_POLL_INTERVAL_SECONDS,
+        max_attempts=settings.OUTBOX_MAX_ATTEMPTS,
+        retry_base=settings.OUTBOX_RETRY_BASE_SECONDS,
+        retry_max=settings.OUTBOX_RETRY_MAX_SECONDS,
+        retention_hours=settings.OUTBOX_RETENTION_HOURS
+    )
+
+async def _drain(dispatcher: OutboxDispatcher) -> None:
+    # --once: entrega o que está pronto e sai
+    while await dispatcher.dispatch_once() >= dispatcher.batch_size:
+        pass
+    await dispatcher.stop()
+
+async def _serve(dispatcher: OutboxDispatcher) -> None:
+    dispatcher.start()
+    try:
+        await dispatcher._task
+    finally:
+        await dispatcher.stop()
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sink", action="append", help="file:CAMINHO, webhook:URL ou queue (padrão: OUTBOX_SINKS)")
+    parser.add_argument("--once", action="store_true", help="entrega os pendentes e sai")
+    args = parser.parse_args()
+
+    dispatcher = build_dispatcher([parse_sink(spec) for spec in args.sink] if args.sink else None)
+    if not dispatcher.sinks:
+        parser.error("no sink configured; use --sink or OUTBOX_SINKS")
+    asyncio.run(_drain(dispatcher) if args.once else _serve(dispatcher))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+import asyncio
+import os
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from app.infrastructure.metrics import Counter, registry
+from app.infrastructure.money import from_cents
+from app.infrastructure.serialization import dumps, loads
+
+try:
+    import httpx
+except ImportError:  # httpx é opcional: só o destino webhook depende dele
+    httpx = None
+
+# Entrega dos eventos do outbox, independente de onde ficam guardados: o banco SQL
+# (app.infrastructure.outbox) ou o banco em memória (app.models.outbox). Um store expõe
+# batch(limite, agora), um context manager assíncrono que entrega os pendentes prontos em ordem
+# de id e grava o que o dispatcher marcou neles ao sair, purge(antes) e add_waker/remove_waker
+MAX_ERROR_LENGTH = 500
+# Falhas seguidas, no envio conta a conta, que encerram o ciclo: o destino parece fora do ar
+# e o resto do lote fica para o próximo ciclo, sem contar tentativa
+MAX_GROUP_FAILURES = 3
+
+OUTBOX_EVENTS = registry.register(Counter(
+    "wallet_outbox_events_total", "Outbox deliveries by outcome (delivered, retried, failed; error = dispatcher cycle failed).", ("outcome",)
+))
+
+def transaction_events(transaction, now: datetime) -> List[dict]:
+    # Um evento por conta afetada; a transferência aparece na origem e no destino.
+    # As transações do banco em memória não têm sender_id/receiver_id
+    sender_id = getattr(transaction, "sender_id", None)
+    receiver_id = getattr(transaction, "receiver_id", None)
+    data = dumps({
+        "transaction_id": transaction.id,
+        "type": transaction.type,
+        "amount": from_cents(transaction.amount),
+        "amount_cents": transaction.amount,
+        "user_id": transaction.user_id,
+        "sender_id": sender_id,
+        "receiver_id": receiver_id,
+        "description": transaction.description,
+    }).decode()
+    if transaction.type == "transfer":
+        parties = [("transfer_out", sender_id or transaction.user_id)]
+        if receiver_id is not None:
+            parties.append(("transfer_in", receiver_id))
+    else:
+        parties = [(transaction.type, transaction.user_id)]
+    return [
+        {
+            "account_id": account_id,
+            "event_type": event_type,
+            "transaction_id": transaction.id,
+            "payload": data,
+            "created_at": now,
+            "attempts": 0,
+        }
+        for event_type, account_id in parties
+    ]
+
+class FileSink:
+    # Uma linha JSON por evento, acrescentada ao arquivo
+    def __init__(self, path: str, fsync: bool = False):
+        self.path = path
+        self.fsync = fsync
+
+    async def send(self, events: List[dict]) -> None:
+        data = b"".join(dumps(item) + b"\n" for item in events)
+        await asyncio.to_thread(self._append, data)
+
+    def _append(self, data: bytes) -> None:
+        with open(self.path, "ab") as f:
+            f.write(data)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+
+class WebhookSink:
+    # POST do lote como array JSON; qualquer resposta fora de 2xx devolve o lote para nova tentativa
+    def __init__(self, url: str, timeout: float = 10.0):
+        if httpx is None:
+            raise ValueError("The webhook sink requires httpx (pip install httpx)")
+        self.url = url
+        self.timeout = timeout
+        self._client: Optional["httpx.AsyncClient"] = None
+
+    async def send(self, events: List[dict]) -> None:
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=self.timeout)
+        response = await self._client.post(
+            self.url, content=dumps(events), headers={"Content-Type": "application/json"}
+        )
+        response.raise_for_status()
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+class QueueSink:
+    # Fila asyncio do próprio processo; sem espaço para o lote inteiro, falha e o lote volta depois
+    def __init__(self, maxsize: int = 10_000):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+
+    async def send(self, events: List[dict]) -> None:
+        if self.queue.maxsize and self.queue.qsize() + len(events) > self.queue.maxsize:
+            raise asyncio.QueueFull("Outbox queue is full")
+        for item in events:
+            self.queue.put_nowait(item)
+
+def parse_sink(spec: str):
+    # file:CAMINHO, webhook:URL ou queue
+    kind, _, target = spec.partition(":")
+    if kind == "file" and target:
+        return FileSink(target)
+    if kind == "webhook" and target:
+        return WebhookSink(target)
+    if kind == "queue":
+        return QueueSink(int(target) if target else 10_000)
+    raise ValueError(f"Invalid outbox sink {spec!r}; use file:PATH, webhook:URL or queue")
+
+def parse_sinks(specs: str) -> list:
+    return [parse_sink(spec.strip()) for spec in specs.split(",") if spec.strip()]
+
+def _envelope(row) -> dict:
+    # O id do evento permite ao destino descartar repetições (a entrega é at-least-once)
+    return {
+        "id": row.id,
+        "type": row.event_type,
+        "account_id": row.account_id,
+        "created_at": row.created_at.isoformat(),
+        "data": loads(row.payload),
+    }
+
+class OutboxDispatcher:
+    def __init__(
+        self,
+        sinks: list,
+        store,
+        batch_size: int = 500,
+        poll_interval: float = 1.0,
+        max_attempts: int = 10,
+        retry_base: float = 1.0,
+        retry_max: float = 300.0,
+        retention_hours: float = 24.0
+    ):
+        self.sinks = sinks
+        self.store = store
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.retention = timedelta(hours=retention_hours) if retention_hours > 0 else None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._purged_at: Optional[datetime] = None
+
+    def start(self) -> None:
+        # Chamado no startup da aplicação, dentro do event loop
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._task = self._loop.create_task(self.run())
+        self.store.add_waker(self.wake)
+
+    async def stop(self) -> None:
+        self.store.remove_waker(self.wake)
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for sink in self.sinks:
+            if hasattr(sink, "close"):
+                await sink.close()
+
+    def wake(self) -> None:
+        # Pode ser chamado de qualquer thread (commits das rotas síncronas rodam no threadpool)
+        if self._loop is not None and self._wakeup is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._wakeup.set)
+            except RuntimeError:
+                pass  # laço já encerrado
+
+    async def run(self) -> None:
+        while True:
+            try:
+                full = await self.dispatch_once() >= self.batch_size
+            except Exception:
+                # Banco indisponível, por exemplo: tenta de novo no próximo ciclo
+                OUTBOX_EVENTS.inc("error")
+                full = False
+            if full:
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def dispatch_once(self) -> int:
+        # Entrega um lote; retorna quantos eventos foram entregues
+        now = datetime.utcnow()
+        # O store já deixa de fora as contas bloqueadas por um evento anterior (aguardando
+        # nova tentativa ou descartado), então um lote cheio de uma conta parada não trava as outras
+        async with self.store.batch(self.batch_size, now) as rows:
+            delivered = await self._deliver(rows, now) if rows else 0
+        if self.retention is not None and (self._purged_at is None or now - self._purged_at > timedelta(minutes=10)):
+            await self.store.purge(now - self.retention)
+            self._purged_at = now
+        return delivered
+
+    async def _deliver(self, rows: list, now: datetime) -> int:
+        # O lote vai inteiro, em ordem de id, para cada destino. Se falhar, vai de novo conta
+        # a conta, para que só a conta com problema espere (destinos que já receberam veem os
+        # eventos de novo)
+        try:
+            await self._send(rows)
+        except Exception:
+            pass
+        else:
+            return self._delivered(rows, now)
+
+        groups: Dict[int, list] = {}
+        for row in rows:
+            groups.setdefault(row.account_id, []).append(row)
+        delivered = failures = 0
+        for group in groups.values():
+            try:
+                await self._send(group)
+            except Exception as e:
+                self._retry_later(group[0], e, now)
+                failures += 1
+                if failures >= MAX_GROUP_FAILURES:
+                    break
+                continue
+            delivered += self._delivered(group, now)
+            failures = 0
+        return delivered
+
+    async def _send(self, rows: list) -> None:
+        events = [_envelope(row) for row in rows]
+        for sink in self.sinks:
+            await sink.send(events)
+
+    def _delivered(self, rows: list, now: datetime) -> int:
+        for row in rows:
+            row.delivered_at = now
+        OUTBOX_EVENTS.inc("delivered", amount=len(rows))
+        return len(rows)
+
+    def _retry_later(self, row, error: Exception, now: datetime) -> None:
+        # Só o primeiro evento da conta conta a tentativa; os seguintes esperam atrás dele
+        row.attempts += 1
+        row.last_error = f"{type(error).__name__}: {error}"[:MAX_ERROR_LENGTH]
+        if row.attempts >= self.max_attempts:
+            # Descartado, mas continua bloqueando a conta: os seguintes nunca passam na frente
+            row.failed_at = now
+            OUTBOX_EVENTS.inc("failed")
+        else:
+            delay = min(self.retry_max, self.retry_base * 2 ** (row.attempts - 1))
+            row.available_at = now + timedelta(seconds=delay)
+            OUTBOX_EVENTS.inc("retried")
@@ -0,0 +1,97 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional
+
+from passlib.context import CryptContext
+
+from app.infrastructure.config import settings
+from app.infrastructure.metrics import observe_stage
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+class PasswordHasherBusy(Exception):
+    pass
+
+# Funções no nível do módulo para poderem ser enviadas a um ProcessPoolExecutor
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+def _verify(password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(password, hashed_password)
+
+class PasswordHasher:
+    def __init__(self, executor_type: str = "thread", workers: int = 4, max_pending: int = 64):
+        if executor_type not in ("thread", "process"):
+            raise ValueError("executor_type must be thread or process")
+        self.executor_type = executor_type
+        self.workers = workers
+        self._pending = threading.BoundedSemaphore(max_pending)
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    if self.executor_type == "process":
+                        self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                    else:
+                        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        return self._executor
+
+    async def hash(self, password: str) -> str:
+        return await self._submit("password_hash", _hash, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        return await self._submit("password_verify", _verify, password, hashed_password)
+
+    def hash_blocking(self, password: str) -> str:
+        # Para rotas síncronas (threadpool): mesma fila e mesmo limite das versões async
+        return self._submit_blocking("password_hash", _hash, password)
+
+    def verify_blocking(self, password: str, hashed_password: str) -> bool:
+        return self._submit_blocking("password_verify", _verify, password, hashed_password)
+
+    async def _submit(self, stage: str, fn, *args):
+        started = time.perf_counter()
+        future = self._start(fn, *args)
+        try:
+            return await asyncio.wrap_future(future)
+        finally:
+            # Inclui a espera na fila do pool, que é o que a requisição sente
+            observe_stage(stage, time.perf_counter() - started)
+
+    def _submit_blocking(self, stage: str, fn, *args):
+        started = time.perf_counter()
+        future = self._start(fn, *args)
+        try:
+            return future.result()
+        finally:
+            observe_stage(stage, time.perf_counter() - started)
+
+    def _start(self, fn, *args) -> Future:
+        # Backpressure: com a fila cheia recusa na hora em vez de enfileirar
+        if not self._pending.acquire(blocking=False):
+            raise PasswordHasherBusy("Password hashing queue is full")
+        try:
+            future = self.executor.submit(fn, *args)
+        except BaseException:
+            self._pending.release()
+            raise
+        future.add_done_callback(lambda _: self._pending.release())
+        return future
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+password_hasher = PasswordHasher(
+    executor_type=settings.PASSWORD_HASH_EXECUTOR,
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING
+)
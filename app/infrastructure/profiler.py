@@ -0,0 +1,66 @@
+import os
+import secrets
+import sys
+import threading
+from collections import Counter, OrderedDict
+from typing import Optional
+
+# Folhas de pilha que indicam thread ociosa (worker esperando trabalho, loop no select)
+IDLE_MODULES = ("threading.py", "selectors.py", "queue.py")
+MAX_DEPTH = 64
+
+class ProfileSession:
+    __slots__ = ("id", "samples", "_stop", "_thread")
+
+    def __init__(self):
+        self.id = secrets.token_hex(8)
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+# Enquanto a requisição roda, uma thread lê sys._current_frames() a cada `interval`
+# segundos e conta as pilhas no formato "collapsed" (frames separados por ';'),
+# aceito por flamegraph.pl e speedscope. Entram as pilhas de todas as threads
+# ocupadas, então requisições concorrentes também aparecem na amostra
+class SamplingProfiler:
+    def __init__(self, interval: float = 0.005, keep: int = 32):
+        self.interval = interval
+        self.keep = keep
+        self._profiles: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def start(self) -> ProfileSession:
+        session = ProfileSession()
+        session._thread = threading.Thread(
+            target=self._sample, args=(session,), name=f"profiler-{session.id}", daemon=True
+        )
+        session._thread.start()
+        return session
+
+    def stop(self, session: ProfileSession) -> None:
+        session._stop.set()
+        session._thread.join()
+        text = "".join(f"{stack} {count}\n" for stack, count in session.samples.most_common())
+        with self._lock:
+            self._profiles[session.id] = text
+            while len(self._profiles) > self.keep:
+                self._profiles.popitem(last=False)
+
+    def get(self, profile_id: str) -> Optional[str]:
+        with self._lock:
+            return self._profiles.get(profile_id)
+
+    def _sample(self, session: ProfileSession) -> None:
+        own = threading.get_ident()
+        while not session._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                if os.path.basename(frame.f_code.co_filename) in IDLE_MODULES:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < MAX_DEPTH:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                session.samples[";".join(reversed(stack))] += 1
@@ -0,0 +1,150 @@
+import asyncio
+from collections import deque
+from typing import Dict, Hashable, Optional, Set
+
+from app.infrastructure.metrics import Counter, Gauge, registry
+
+SUBSCRIBERS = registry.register(Gauge(
+    "wallet_stream_subscribers", "Open live event subscriptions."
+))
+DROPPED = registry.register(Counter(
+    "wallet_stream_dropped_total", "Subscriptions closed because the consumer fell behind."
+))
+
+DEFAULT_QUEUE_SIZE = 64
+
+class HubFull(Exception):
+    pass
+
+class Subscription:
+    # Fila limitada de um assinante. Parado, custa o objeto, um deque vazio e um Future
+    # pendente: nenhuma task, timer ou thread próprios
+    __slots__ = ("key", "maxsize", "closed", "dropped", "_items", "_waiter")
+
+    def __init__(self, key: Hashable, maxsize: int):
+        self.key = key
+        self.maxsize = maxsize
+        self.closed = False
+        self.dropped = False
+        self._items = deque()
+        self._waiter: Optional[asyncio.Future] = None
+
+    async def get(self):
+        # Próxima mensagem; None quando a assinatura foi encerrada
+        while not self._items:
+            if self.closed:
+                return None
+            self._waiter = asyncio.get_running_loop().create_future()
+            try:
+                await self._waiter
+            finally:
+                self._waiter = None
+        return self._items.popleft()
+
+    def _push(self, message) -> bool:
+        if len(self._items) >= self.maxsize:
+            return False
+        self._items.append(message)
+        self._wake()
+        return True
+
+    def _close(self, dropped: bool = False) -> None:
+        self.closed = True
+        self.dropped = dropped
+        if dropped:
+            # O cliente reconecta e recupera o que perdeu pelo histórico
+            self._items.clear()
+        self._wake()
+
+    def _wake(self) -> None:
+        waiter = self._waiter
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
+class Hub:
+    # Pub/sub em processo por chave (conta). Assinaturas e entregas acontecem no laço de
+    # eventos; publish pode ser chamado de qualquer thread e só acorda o laço quando a chave
+    # tem assinantes. As mensagens chegam prontas (já serializadas) e são compartilhadas
+    # por todos os assinantes da chave. Quem não esvazia a fila a tempo é desconectado,
+    # em vez de acumular memória ou atrasar os outros
+    def __init__(self, queue_size: int = DEFAULT_QUEUE_SIZE, max_subscribers: int = 0):
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self.count = 0
+        self._subscribers: Dict[Hashable, Set[Subscription]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._heartbeat: Optional[asyncio.Task] = None
+
+    def full(self) -> bool:
+        return bool(self.max_subscribers) and self.count >= self.max_subscribers
+
+    def subscribe(self, key: Hashable) -> Subscription:
+        self._loop = asyncio.get_running_loop()
+        if self.full():
+            raise HubFull("Too many open subscriptions")
+        subscription = Subscription(key, self.queue_size)
+        self._subscribers.setdefault(key, set()).add(subscription)
+        self.count += 1
+        SUBSCRIBERS.inc()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription, dropped: bool = False) -> None:
+        subscriptions = self._subscribers.get(subscription.key)
+        if subscriptions is None or subscription not in subscriptions:
+            return
+        subscriptions.discard(subscription)
+        if not subscriptions:
+            del self._subscribers[subscription.key]
+        self.count -= 1
+        SUBSCRIBERS.dec()
+        subscription._close(dropped)
+
+    def has_subscribers(self, key: Hashable) -> bool:
+        return key in self._subscribers
+
+    def publish(self, key: Hashable, *messages) -> None:
+        # Chamadas da mesma thread chegam na ordem em que foram feitas
+        loop = self._loop
+        if loop is None or key not in self._subscribers:
+            return
+        try:
+            loop.call_soon_threadsafe(self._deliver, key, messages)
+        except RuntimeError:
+            pass  # laço já encerrado
+
+    def broadcast(self, message) -> None:
+        # Para todos os assinantes; só no laço de eventos
+        for subscriptions in list(self._subscribers.values()):
+            for subscription in list(subscriptions):
+                if not subscription._push(message):
+                    self._drop(subscription)
+
+    def _deliver(self, key: Hashable, messages: tuple) -> None:
+        for subscription in list(self._subscribers.get(key, ())):
+            for message in messages:
+                if not subscription._push(message):
+                    self._drop(subscription)
+                    break
+
+    def _drop(self, subscription: Subscription) -> None:
+        DROPPED.inc()
+        self.unsubscribe(subscription, dropped=True)
+
+    def start(self, heartbeat, interval: float) -> None:
+        # Um único timer mantém todas as conexões vivas e detecta as que pararam de ler
+        self._loop = asyncio.get_running_loop()
+        if self._heartbeat is None and interval > 0:
+            self._heartbeat = self._loop.create_task(self._beat(heartbeat, interval))
+
+    async def _beat(self, heartbeat, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            self.broadcast(heartbeat)
+
+    def stop(self) -> None:
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            self._heartbeat = None
+        for subscriptions in list(self._subscribers.values()):
+            for subscription in list(subscriptions):
+                self.unsubscribe(subscription)
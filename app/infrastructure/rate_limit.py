@@ -0,0 +1,192 @@
+import math
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+
+from fastapi import HTTPException
+
+from app.infrastructure.metrics import Counter, registry
+
+RATE_LIMITED = registry.register(Counter(
+    "wallet_rate_limited_total", "Requests rejected by a rate or velocity limit.", ("limit",)
+))
+
+# Estado de uma chave: (bucket atual, total do bucket anterior, total do bucket atual)
+State = Tuple[int, float, float]
+
+class RateLimitExceeded(HTTPException):
+    # Já é a resposta HTTP (429 com Retry-After); casos de uso podem levantá-la direto
+    def __init__(self, limit: str, retry_after: float):
+        super().__init__(
+            status_code=429,
+            detail="Too many requests, try again later",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+        )
+        self.limit = limit
+        self.retry_after = retry_after
+
+class MemoryStorage:
+    # Contadores do processo; o LRU limita a memória (chave esquecida = contagem zerada)
+    def __init__(self, maxsize: int = 100_000):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[str, State]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def update(self, key: str, fn: Callable[[Optional[State]], Tuple[Optional[State], object]], expires_at: float):
+        # fn recebe o estado atual e devolve (novo estado ou None para não gravar, resultado)
+        with self._lock:
+            state, result = fn(self._entries.get(key))
+            if state is not None:
+                self._entries[key] = state
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+            return result
+
+class SQLiteStorage:
+    # Contadores num arquivo SQLite local: todos os workers da máquina veem os mesmos.
+    # Uma transação IMMEDIATE por verificação serializa leitura e escrita entre processos
+    PURGE_EVERY = 10_000
+
+    def __init__(self, path: str, timeout: float = 5.0):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        self._writes = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            # Perder contadores numa queda do sistema é aceitável
+            connection.execute("PRAGMA synchronous=OFF")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limits"
+                " (key TEXT PRIMARY KEY, bucket INTEGER, previous REAL, current REAL, expires_at REAL)"
+            )
+            self._local.connection = connection
+        return connection
+
+    def update(self, key: str, fn: Callable[[Optional[State]], Tuple[Optional[State], object]], expires_at: float):
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = connection.execute(
+                "SELECT bucket, previous, current FROM rate_limits WHERE key = ?", (key,)
+            ).fetchone()
+            state, result = fn(row)
+            if state is not None:
+                connection.execute(
+                    "INSERT OR REPLACE INTO rate_limits VALUES (?, ?, ?, ?, ?)", (key, *state, expires_at)
+                )
+                self._writes += 1
+                if self._writes % self.PURGE_EVERY == 0:
+                    connection.execute("DELETE FROM rate_limits WHERE expires_at < ?", (time.time(),))
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return result
+
+def rate_limit_storage(path: Optional[str] = None, maxsize: int = 100_000):
+    return SQLiteStorage(path) if path else MemoryStorage(maxsize)
+
+class SlidingWindowLimiter:
+    # Janela deslizante aproximada com dois buckets fixos: o total estimado é o bucket
+    # atual mais o anterior pesado pela fração dele ainda dentro da janela. O(1) por
+    # verificação e três números por chave, sem guardar o horário de cada evento.
+    def __init__(self, name: str, limit: float, window_seconds: float, storage, clock: Callable[[], float] = time.time):
+        self.name = name
+        self.limit = limit
+        self.window = window_seconds
+        self.storage = storage
+        # Relógio de parede: com SQLiteStorage os processos precisam concordar nos buckets
+        self.clock = clock
+
+    def hit(self, key, cost: float = 1) -> None:
+        # Conta o evento ou levanta RateLimitExceeded; recusados não entram na contagem
+        if self.limit <= 0:
+            return
+        now = self.clock()
+        position = now / self.window
+        bucket = int(position)
+        elapsed = position - bucket
+
+        def apply(state: Optional[State]):
+            previous, current = _slide(state, bucket)
+            if previous * (1 - elapsed) + current + cost <= self.limit:
+                return (bucket, previous, current + cost), None
+            return None, self._retry_after(previous, current, cost, elapsed)
+
+        retry_after = self.storage.update(f"{self.name}:{key}", apply, (bucket + 2) * self.window)
+        if retry_after is not None:
+            RATE_LIMITED.inc(self.name)
+            raise RateLimitExceeded(self.name, retry_after)
+
+    def refund(self, key, cost: float = 1) -> None:
+        # Desfaz um hit() que passou, quando a operação acaba recusada por outro limite;
+        # o valor sai do bucket em que o hit acabou de cair
+        if self.limit <= 0:
+            return
+
+        def apply(state: Optional[State]):
+            if state is None:
+                return None, None
+            bucket, previous, current = state
+            return (bucket, previous, max(0.0, current - cost)), None
+
+        self.storage.update(f"{self.name}:{key}", apply, (int(self.clock() / self.window) + 2) * self.window)
+
+    def _retry_after(self, previous: float, current: float, cost: float, elapsed: float) -> float:
+        if cost > self.limit:
+            return self.window
+        if current + cost <= self.limit:
+            # Cabe ainda neste bucket, quando o peso do anterior cair o suficiente
+            needed = 1 - (self.limit - cost - current) / previous
+            return (needed - elapsed) * self.window
+        # Só no próximo bucket, quando o atual passa a ser o anterior
+        needed = max(0.0, 1 - (self.limit - cost) / current)
+        return (1 - elapsed + needed) * self.window
+
+def _slide(state: Optional[State], bucket: int) -> Tuple[float, float]:
+    if state is None:
+        return 0, 0
+    last_bucket, previous, current = state
+    if last_bucket == bucket:
+        return previous, current
+    if last_bucket == bucket - 1:
+        return current, 0
+    return 0, 0
+
+class LoginLimits:
+    # Tentativas de login por IP e por email, verificadas antes do hash da senha
+    def __init__(self, storage, per_ip: int, per_email: int, window_seconds: float):
+        self.per_ip = SlidingWindowLimiter("login_ip", per_ip, window_seconds, storage)
+        self.per_email = SlidingWindowLimiter("login_email", per_email, window_seconds, storage)
+
+    def check(self, ip: Optional[str], email: str) -> None:
+        self.per_ip.hit(ip or "unknown")
+        self.per_email.hit(email.strip().lower())
+
+class TransferVelocity:
+    # Por conta de origem: quantidade de transferências por janela e valor total (centavos)
+    # numa janela mais longa. Tentativas contam mesmo que a transferência falhe depois
+    def __init__(self, storage, per_account: int, window_seconds: float, volume_cents: int = 0,
+                 volume_window_seconds: float = 86400.0):
+        self.count = SlidingWindowLimiter("transfer_count", per_account, window_seconds, storage)
+        self.volume = SlidingWindowLimiter("transfer_volume", volume_cents, volume_window_seconds, storage)
+
+    def check(self, account_id: int, amount: int, transfers: int = 1) -> None:
+        # Um lote conta como `transfers` transferências somando `amount`
+        if amount <= 0:
+            return  # inválida; o caso de uso recusa
+        # Recusada por um dos limites, não conta em nenhum: o volume já registrado é devolvido
+        self.volume.hit(account_id, amount)
+        try:
+            self.count.hit(account_id, transfers)
+        except RateLimitExceeded:
+            self.volume.refund(account_id, amount)
+            raise
@@ -0,0 +1,35 @@
+import json
+from datetime import date, datetime
+from typing import Any
+
+from fastapi.responses import Response
+
+from app.infrastructure.metrics import stage
+
+try:
+    import orjson
+except ImportError:  # orjson é opcional: sem ele usa o json da biblioteca padrão
+    orjson = None
+
+def _default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, default=_default, separators=(",", ":")).encode()
+
+def loads(data: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+class FastJSONResponse(Response):
+    # Serializa dicts/listas já prontos, sem construir nem validar modelos Pydantic
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        with stage("serialization"):
+            return dumps(content)
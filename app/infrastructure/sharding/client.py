@@ -0,0 +1,328 @@
+import os
+import queue
+import threading
+import time
+import uuid
+import zlib
+from contextlib import contextmanager
+from multiprocessing.connection import Client
+from typing import Iterator, List, Optional
+
+from app.models.models import Transaction, User
+from .engine import ERRORS, ShardError, UnknownTransaction
+from .journal import DecisionLog
+
+SHARDS_ENV = "WALLET_SHARDS"
+AUTHKEY_ENV = "WALLET_SHARD_AUTHKEY"
+# Log de decisões das transferências entre shards (um arquivo por worker da API)
+COORDINATOR_DIR_ENV = "WALLET_COORDINATOR_DIR"
+DEFAULT_COORDINATOR_DIR = "wallet-coordinator"
+POOL_SIZE = 16
+# Tentativas dentro da requisição; depois disso a transferência fica em dúvida e é
+# terminada por recover()
+COMMIT_RETRIES = 5
+COMMIT_BACKOFF = 0.05
+# Intervalo mínimo entre novas tentativas das transferências em dúvida deste worker
+RECOVERY_INTERVAL = 1.0
+PAGE_SIZE = 500
+
+class ShardUnavailable(ShardError):
+    pass
+
+def parse_addresses(text: str) -> list:
+    # "host:porta" vira endereço TCP; caminhos absolutos, sockets Unix
+    addresses = []
+    for item in filter(None, (part.strip() for part in text.split(","))):
+        if item.startswith("/"):
+            addresses.append(item)
+        else:
+            host, port = item.rsplit(":", 1)
+            addresses.append((host, int(port)))
+    return addresses
+
+def shard_for_account(account_id: int, count: int) -> int:
+    return (account_id - 1) % count
+
+def shard_for_email(email: str, count: int) -> int:
+    # O usuário é criado no shard do hash do email; o id que recebe lá já aponta para o mesmo shard
+    return zlib.crc32(email.encode()) % count
+
+class _ConnectionPool:
+    def __init__(self, address, authkey: bytes, size: int):
+        self.address = address
+        self.authkey = authkey
+        self._idle: "queue.LifoQueue" = queue.LifoQueue(maxsize=size)
+
+    @contextmanager
+    def connection(self):
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            try:
+                conn = Client(self.address, authkey=self.authkey)
+            except OSError as e:
+                raise ShardUnavailable(f"Shard {self.address} is unreachable: {e}")
+        try:
+            yield conn
+        except BaseException:
+            # Resposta pode ter ficado pela metade no socket: a conexão não volta ao pool
+            conn.close()
+            raise
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+# Roda nos workers da API: descobre o shard de cada conta e coordena as
+# transferências entre shards em duas fases (prepare nos dois lados, depois commit).
+# A decisão vai para o DecisionLog antes da fase 2; um shard preparado nunca desiste
+# sozinho, espera o commit ou abort que este coordenador (ou recover()) mandar
+class ShardRouter:
+    def __init__(
+        self,
+        addresses: list,
+        authkey: bytes,
+        pool_size: int = POOL_SIZE,
+        log_dir: Optional[str] = None,
+        fsync: bool = False
+    ):
+        if not addresses:
+            raise ValueError("At least one shard address is required")
+        self.addresses = addresses
+        self.pools = [_ConnectionPool(address, authkey, pool_size) for address in addresses]
+        # Sem log_dir só as operações dentro de um shard ficam disponíveis
+        self.decisions = DecisionLog(log_dir, fsync) if log_dir else None
+        # Transferências que a requisição não conseguiu terminar (ficam para recover())
+        self._stalled = set()
+        self._log_lock = threading.Lock()
+        self._recovery_lock = threading.Lock()
+        self._last_recovery = 0.0
+
+    @property
+    def count(self) -> int:
+        return len(self.pools)
+
+    def call(self, shard: int, op: str, *args):
+        with self.pools[shard].connection() as conn:
+            try:
+                conn.send((op, args))
+                status, *payload = conn.recv()
+            except (EOFError, OSError) as e:
+                raise ShardUnavailable(f"Shard {self.addresses[shard]} failed: {e}")
+        if status == "ok":
+            return payload[0]
+        kind, message = payload
+        raise ERRORS.get(kind, ShardError)(message)
+
+    def shard_for_account(self, account_id: int) -> int:
+        return shard_for_account(account_id, self.count)
+
+    def create_user(self, name: str, email: str, password: str) -> tuple:
+        return self.call(shard_for_email(email, self.count), "create_user", name, email, password)
+
+    def get_user(self, user_id: int) -> Optional[tuple]:
+        return self.call(self.shard_for_account(user_id), "get_user", user_id)
+
+    def get_user_by_email(self, email: str) -> Optional[tuple]:
+        return self.call(shard_for_email(email, self.count), "get_user_by_email", email)
+
+    def get_balance(self, user_id: int) -> int:
+        return self.call(self.shard_for_account(user_id), "get_balance", user_id)
+
+    def apply(self, user_id: int, amount: int, type: str, description: Optional[str] = None) -> tuple:
+        return self.call(self.shard_for_account(user_id), "apply", user_id, amount, type, description)
+
+    def transactions(self, user_id: int, after_id: Optional[int] = None, limit: int = PAGE_SIZE) -> list:
+        return self.call(self.shard_for_account(user_id), "transactions", user_id, after_id, limit)
+
+    def transfer(self, sender_id: int, receiver_id: int, amount: int, description: Optional[str] = None) -> tuple:
+        if amount <= 0:
+            raise ValueError("Amount must be positive")
+        if sender_id == receiver_id:
+            raise ValueError("Cannot transfer to the same account")
+        sender_shard = self.shard_for_account(sender_id)
+        receiver_shard = self.shard_for_account(receiver_id)
+        if sender_shard == receiver_shard:
+            return self.call(sender_shard, "transfer", sender_id, receiver_id, amount, description)
+
+        if self.decisions is None:
+            raise ShardError(f"Cross-shard transfers need a coordinator log ({COORDINATOR_DIR_ENV})")
+        if self._stalled:
+            self._retry_stalled()
+
+        txid = uuid.uuid4().hex
+        with self._log_lock:
+            self.decisions.begin(txid, sender_shard, receiver_shard)
+        try:
+            self.call(sender_shard, "prepare", txid, sender_id, amount, "withdrawal",
+                      description or f"Transfer to user {receiver_id}")
+            self.call(receiver_shard, "prepare", txid, receiver_id, amount, "deposit",
+                      description or f"Transfer from user {sender_id}")
+        except ShardError:
+            try:
+                self._finish(txid, sender_shard, receiver_shard, "abort")
+            except ShardError:
+                self._stalled.add(txid)
+            raise
+        # Decisão no disco antes da fase 2: daqui em diante a transferência só termina em commit
+        with self._log_lock:
+            self.decisions.decide(txid)
+        try:
+            debit = self._commit(sender_shard, txid)
+            credit = self._commit(receiver_shard, txid)
+        except ShardError:
+            self._stalled.add(txid)
+            raise
+        with self._log_lock:
+            self.decisions.done(txid)
+        return debit, credit
+
+    def _commit(self, shard: int, txid: str) -> tuple:
+        # Commit é idempotente no shard: repetir depois de uma resposta perdida é seguro
+        for attempt in range(COMMIT_RETRIES):
+            try:
+                return self.call(shard, "commit", txid)
+            except ShardUnavailable:
+                if attempt == COMMIT_RETRIES - 1:
+                    raise
+                time.sleep(COMMIT_BACKOFF * 2 ** attempt)
+
+    def _finish(self, txid: str, sender_shard: int, receiver_shard: int, op: str) -> None:
+        for shard in (sender_shard, receiver_shard):
+            try:
+                self.call(shard, op, txid)
+            except UnknownTransaction:
+                pass  # commit: já aplicado e esquecido; abort: o prepare nunca chegou
+        with self._log_lock:
+            self.decisions.done(txid)
+
+    def recover(self) -> int:
+        # Termina as transferências em dúvida: as que este worker deixou para trás e as
+        # dos logs de coordenadores que pararam. Com "C" no log refaz o commit; sem, aborta.
+        # Retorna quantas continuam pendentes (shard fora do ar): chamar de novo mais tarde
+        if self.decisions is None:
+            return 0
+        with self._recovery_lock:
+            self._last_recovery = time.monotonic()
+            pending = self._retry_own()
+            for orphan in self.decisions.orphans():
+                for txid, (sender_shard, receiver_shard, decided) in list(orphan.entries.items()):
+                    try:
+                        self._finish(txid, sender_shard, receiver_shard, "commit" if decided else "abort")
+                    except ShardError:
+                        pending += 1
+                        continue
+                    del orphan.entries[txid]
+                orphan.release()
+            return pending
+
+    def _retry_stalled(self) -> None:
+        # Chamado pelas transferências: no máximo uma tentativa por RECOVERY_INTERVAL
+        if time.monotonic() - self._last_recovery < RECOVERY_INTERVAL:
+            return
+        if not self._recovery_lock.acquire(blocking=False):
+            return
+        try:
+            self._last_recovery = time.monotonic()
+            self._retry_own()
+        finally:
+            self._recovery_lock.release()
+
+    def _retry_own(self) -> int:
+        pending = 0
+        for txid in list(self._stalled):
+            entry = self.decisions.open.get(txid)
+            if entry is not None:
+                sender_shard, receiver_shard, decided = entry
+                try:
+                    self._finish(txid, sender_shard, receiver_shard, "commit" if decided else "abort")
+                except ShardError:
+                    pending += 1
+                    continue
+            self._stalled.discard(txid)
+        return pending
+
+    def verify(self) -> int:
+        return sum(self.call(shard, "verify") for shard in range(self.count))
+
+    def close(self) -> None:
+        for pool in self.pools:
+            pool.close()
+        if self.decisions is not None:
+            with self._log_lock:
+                self.decisions.close()
+
+def _user(row: tuple) -> User:
+    id, name, email, password, balance = row
+    user = User(id, name, email, password)
+    user.balance = balance
+    return user
+
+def _transaction(row: tuple) -> Transaction:
+    return Transaction(*row)
+
+# Mesma interface do Database em memória usada pelo router, com os dados nos shards
+class ShardedDatabase:
+    def __init__(self, router: ShardRouter):
+        self.router = router
+
+    @classmethod
+    def from_env(cls) -> Optional["ShardedDatabase"]:
+        addresses = os.environ.get(SHARDS_ENV)
+        if not addresses:
+            return None
+        authkey = os.environ.get(AUTHKEY_ENV)
+        if not authkey:
+            raise RuntimeError(f"{AUTHKEY_ENV} must be set when {SHARDS_ENV} is")
+        return cls(ShardRouter(
+            parse_addresses(addresses),
+            authkey.encode(),
+            log_dir=os.environ.get(COORDINATOR_DIR_ENV, DEFAULT_COORDINATOR_DIR),
+            fsync=os.environ.get("WALLET_FSYNC", "0") == "1"
+        ))
+
+    def create_user(self, name: str, email: str, password: str) -> User:
+        return _user(self.router.create_user(name, email, password))
+
+    def get_user_by_email(self, email: str) -> Optional[User]:
+        row = self.router.get_user_by_email(email)
+        return _user(row) if row else None
+
+    def get_balance(self, user_id: int) -> int:
+        return self.router.get_balance(user_id)
+
+    def create_transaction(self, amount: int, type: str, description: str, user_id: int) -> Transaction:
+        # O saldo é conferido no shard, de forma atômica com a escrita
+        return _transaction(self.router.apply(user_id, amount, type, description))
+
+    def transfer(self, sender_id: int, receiver_id: int, amount: int, description: Optional[str] = None) -> tuple:
+        debit, credit = self.router.transfer(sender_id, receiver_id, amount, description)
+        return _transaction(debit), _transaction(credit)
+
+    def get_user_transactions(self, user_id: int) -> List[Transaction]:
+        return list(self.iter_user_transactions(user_id))
+
+    def iter_user_transactions(self, user_id: int, after_id: Optional[int] = None) -> Iterator[Transaction]:
+        while True:
+            rows = self.router.transactions(user_id, after_id, PAGE_SIZE)
+            for row in rows:
+                yield _transaction(row)
+            if len(rows) < PAGE_SIZE:
+                return
+            after_id = rows[-1][0]
+
+    def recover(self) -> int:
+        return self.router.recover()
+
+    def enable_persistence(self, *args, **kwargs) -> None:
+        raise RuntimeError("With shards, persistence is configured on the shard processes (--data-dir)")
+
+    def close(self) -> None:
+        self.router.close()
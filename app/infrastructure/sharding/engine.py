@@ -0,0 +1,293 @@
+import os
+import threading
+from collections import OrderedDict
+from itertools import islice
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Listener
+from typing import Dict, Optional, Tuple
+
+from app.models.models import Database, Transaction, User
+from .journal import PreparedLog
+
+# Quantos commits e aborts recentes ficam guardados para responder repetições do coordenador
+COMMITTED_MEMORY = 100_000
+PREPARED_LOG_FILE = "prepared.log"
+TRANSACTION_TYPES = ("deposit", "withdrawal")
+
+class ShardError(Exception):
+    pass
+
+class AccountNotFound(ShardError):
+    pass
+
+class AccountExists(ShardError):
+    pass
+
+class InsufficientFunds(ShardError):
+    pass
+
+class UnknownTransaction(ShardError):
+    pass
+
+ERRORS = {cls.__name__: cls for cls in (ShardError, AccountNotFound, AccountExists, InsufficientFunds, UnknownTransaction)}
+
+def user_row(user: User) -> tuple:
+    return (user.id, user.name, user.email, user.password, user.balance)
+
+def transaction_row(transaction: Transaction) -> tuple:
+    return (
+        transaction.id, transaction.amount, transaction.type,
+        transaction.description, transaction.user_id, transaction.ts
+    )
+
+# Um shard: as contas com (id - 1) % count == index, num Database próprio.
+# As mensagens chegam como (operação, argumentos) e só as de OPERATIONS são aceitas.
+class ShardEngine:
+    OPERATIONS = frozenset({
+        "ping", "create_user", "get_user", "get_user_by_email", "get_balance", "apply", "transfer",
+        "prepare", "commit", "abort", "in_doubt", "transactions", "verify",
+    })
+
+    def __init__(self, index: int, count: int, database: Optional[Database] = None):
+        self.index = index
+        self.count = count
+        self.db = database if database is not None else Database(id_start=index + 1, id_step=count)
+        # txid -> (conta, valor, tipo, descrição) das transferências entre shards na fase 1.
+        # Nunca expiram: só o coordenador decide entre commit e abort
+        self.prepared: Dict[str, tuple] = {}
+        # conta -> débitos preparados e ainda não confirmados (não podem ser gastos de novo)
+        self.reserved: Dict[int, int] = {}
+        self.committed: "OrderedDict[str, tuple]" = OrderedDict()
+        # Abortadas recentes: um prepare atrasado do mesmo txid não volta a reservar
+        self.aborted: "OrderedDict[str, None]" = OrderedDict()
+        self.journal: Optional[PreparedLog] = None
+        self._lock = threading.Lock()
+
+    def handle(self, op: str, args: tuple):
+        if op not in self.OPERATIONS:
+            raise ShardError(f"Unknown operation: {op}")
+        return getattr(self, op)(*args)
+
+    def ping(self) -> Tuple[int, int]:
+        return self.index, self.count
+
+    def create_user(self, name: str, email: str, password: str) -> tuple:
+        with self._lock:
+            if self.db.get_user_by_email(email):
+                raise AccountExists("Email already registered")
+            return user_row(self.db.create_user(name, email, password))
+
+    def get_user(self, user_id: int) -> Optional[tuple]:
+        user = self.db.users.get(user_id)
+        return user_row(user) if user else None
+
+    def get_user_by_email(self, email: str) -> Optional[tuple]:
+        user = self.db.get_user_by_email(email)
+        return user_row(user) if user else None
+
+    def get_balance(self, user_id: int) -> int:
+        self._user(user_id)
+        return self.db.get_balance(user_id)
+
+    def apply(self, user_id: int, amount: int, type: str, description: Optional[str]) -> tuple:
+        if type not in TRANSACTION_TYPES:
+            raise ShardError(f"Invalid transaction type: {type}")
+        with self._lock:
+            user = self._user(user_id)
+            if type == "withdrawal" and self._available(user) < amount:
+                raise InsufficientFunds("Insufficient funds")
+            return transaction_row(self.db.create_transaction(amount, type, description, user_id))
+
+    def transfer(self, sender_id: int, receiver_id: int, amount: int, description: Optional[str] = None) -> tuple:
+        # As duas contas estão neste shard: basta o lock local
+        with self._lock:
+            sender = self._user(sender_id)
+            self._user(receiver_id)
+            if self._available(sender) < amount:
+                raise InsufficientFunds("Insufficient funds")
+            debit = self.db.create_transaction(amount, "withdrawal", description or f"Transfer to user {receiver_id}", sender_id)
+            credit = self.db.create_transaction(amount, "deposit", description or f"Transfer from user {sender_id}", receiver_id)
+            return transaction_row(debit), transaction_row(credit)
+
+    def prepare(self, txid: str, user_id: int, amount: int, type: str, description: Optional[str]) -> bool:
+        if type not in TRANSACTION_TYPES:
+            raise ShardError(f"Invalid transaction type: {type}")
+        with self._lock:
+            if txid in self.prepared or txid in self.committed:
+                return True
+            if txid in self.aborted:
+                raise UnknownTransaction(f"Transaction {txid} was aborted")
+            user = self._user(user_id)
+            if type == "withdrawal" and self._available(user) < amount:
+                raise InsufficientFunds("Insufficient funds")
+            entry = (user_id, amount, type, description)
+            # No disco antes de responder: a reserva sobrevive a um restart do shard
+            if self.journal is not None:
+                self.journal.prepare(txid, entry)
+            self._reserve(entry)
+            self.prepared[txid] = entry
+            return True
+
+    def commit(self, txid: str) -> tuple:
+        with self._lock:
+            # Commit repetido (resposta perdida no caminho) devolve o mesmo registro
+            if txid in self.committed:
+                return self.committed[txid]
+            entry = self.prepared.get(txid)
+            if entry is None:
+                raise UnknownTransaction(f"Transaction {txid} is not prepared")
+            if self.journal is not None:
+                # Todas as escritas do shard passam por self._lock: o próximo id é conhecido
+                self.journal.commit(txid, self.db.transaction_id_counter)
+            row = self._apply_prepared(txid, entry)
+            self._maybe_rewrite_journal()
+            return row
+
+    def abort(self, txid: str) -> bool:
+        with self._lock:
+            if txid in self.committed:
+                # O coordenador já decidiu commit: abortar agora criaria ou destruiria dinheiro
+                raise ShardError(f"Transaction {txid} is already committed")
+            entry = self.prepared.get(txid)
+            if self.journal is not None and txid not in self.aborted:
+                self.journal.abort(txid)
+            if entry is not None:
+                del self.prepared[txid]
+                self._release(entry[0], entry[1], entry[2])
+            self._remember(self.aborted, txid, None)
+            self._maybe_rewrite_journal()
+            return entry is not None
+
+    def in_doubt(self) -> list:
+        # Reservas preparadas à espera da decisão do coordenador
+        with self._lock:
+            return list(self.prepared)
+
+    def transactions(self, user_id: int, after_id: Optional[int], limit: int) -> list:
+        return [transaction_row(t) for t in islice(self.db.iter_user_transactions(user_id, after_id), limit)]
+
+    def verify(self) -> int:
+        return len(self.db.verify_balances())
+
+    def enable_persistence(self, data_dir: str, fsync: bool = False, compact_every: int = 1_000_000) -> None:
+        # Dados do Database e, ao lado, o log das reservas da fase 1 e das decisões recebidas
+        self.db.enable_persistence(data_dir, fsync=fsync, compact_every=compact_every)
+        journal = PreparedLog(os.path.join(data_dir, PREPARED_LOG_FILE), fsync=fsync)
+        prepared, committed, aborted = journal.load()
+        with self._lock:
+            for txid, transaction_id in committed.items():
+                transaction = self.db.transactions.get(transaction_id)
+                if transaction is None:
+                    # Caiu entre registrar a decisão e gravar a transação: grava agora
+                    entry = prepared.get(txid)
+                    if entry is not None:
+                        self._reserve(entry)
+                        self._apply_prepared(txid, entry)
+                    continue
+                self._remember(self.committed, txid, transaction_row(transaction))
+            for txid in aborted:
+                self._remember(self.aborted, txid, None)
+            for txid, entry in prepared.items():
+                if txid not in self.committed:
+                    self._reserve(entry)
+                    self.prepared[txid] = entry
+            self.journal = journal
+            self._rewrite_journal()
+
+    def close(self) -> None:
+        with self._lock:
+            if self.journal is not None:
+                self.journal.close()
+                self.journal = None
+        self.db.close()
+
+    def _user(self, user_id: int) -> User:
+        user = self.db.users.get(user_id)
+        if user is None:
+            raise AccountNotFound(f"User {user_id} not found")
+        return user
+
+    def _available(self, user: User) -> int:
+        return user.balance - self.reserved.get(user.id, 0)
+
+    def _reserve(self, entry: tuple) -> None:
+        user_id, amount, type, _ = entry
+        if type == "withdrawal":
+            self.reserved[user_id] = self.reserved.get(user_id, 0) + amount
+
+    def _apply_prepared(self, txid: str, entry: tuple) -> tuple:
+        user_id, amount, type, description = entry
+        self.prepared.pop(txid, None)
+        self._release(user_id, amount, type)
+        row = transaction_row(self.db.create_transaction(amount, type, description, user_id))
+        self._remember(self.committed, txid, row)
+        return row
+
+    def _remember(self, memory: OrderedDict, txid: str, value) -> None:
+        memory[txid] = value
+        while len(memory) > COMMITTED_MEMORY:
+            memory.popitem(last=False)
+
+    def _maybe_rewrite_journal(self) -> None:
+        if self.journal is not None and self.journal.rewrite_due():
+            self._rewrite_journal()
+
+    def _rewrite_journal(self) -> None:
+        # Só o que ainda serve: reservas em aberto e as decisões lembradas em memória
+        self.journal.rewrite(
+            self.prepared,
+            {txid: row[0] for txid, row in self.committed.items()},
+            self.aborted
+        )
+
+    def _release(self, user_id: int, amount: int, type: str) -> None:
+        if type != "withdrawal":
+            return
+        remaining = self.reserved.get(user_id, 0) - amount
+        if remaining > 0:
+            self.reserved[user_id] = remaining
+        else:
+            self.reserved.pop(user_id, None)
+
+def _serve_connection(engine: ShardEngine, conn) -> None:
+    with conn:
+        while True:
+            try:
+                op, args = conn.recv()
+            except (EOFError, OSError):
+                return
+            try:
+                response = ("ok", engine.handle(op, args))
+            except ShardError as e:
+                response = ("error", type(e).__name__, str(e))
+            except Exception as e:
+                response = ("error", "ShardError", repr(e))
+            conn.send(response)
+
+def serve(engine: ShardEngine, address, authkey: bytes) -> None:
+    # Uma thread por conexão; cada worker da API mantém um pool pequeno de conexões
+    with Listener(address, authkey=authkey, backlog=128) as listener:
+        while True:
+            try:
+                conn = listener.accept()
+            except (AuthenticationError, EOFError, OSError):
+                # Cliente sem a authkey certa ou que caiu no handshake
+                continue
+            threading.Thread(target=_serve_connection, args=(engine, conn), daemon=True).start()
+
+def run_shard(
+    index: int,
+    count: int,
+    address,
+    authkey: bytes,
+    data_dir: Optional[str] = None,
+    fsync: bool = False,
+    compact_every: int = 1_000_000
+) -> None:
+    engine = ShardEngine(index, count)
+    if data_dir:
+        engine.enable_persistence(os.path.join(data_dir, f"shard-{index}"), fsync=fsync, compact_every=compact_every)
+    try:
+        serve(engine, address, authkey)
+    finally:
+        engine.close()
@@ -0,0 +1,228 @@
+import json
+import os
+import uuid
+from typing import Dict, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # sem flock (Windows) não dá para saber se o dono de um log ainda está vivo
+    fcntl = None
+
+# Logs das transferências entre shards: uma lista JSON por linha, gravada com flush (e
+# fsync, se pedido) antes de a operação seguir. Uma linha cortada no fim (escrita
+# interrompida) encerra a leitura e é descartada na próxima reescrita
+COORDINATOR_PREFIX = "coordinator-"
+LOG_SUFFIX = ".log"
+# Registros acumulados antes de reescrever o log só com o que ainda está aberto
+REWRITE_RECORDS = 100_000
+
+def read_records(path: str) -> List[list]:
+    records = []
+    if not os.path.exists(path):
+        return records
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                break
+    return records
+
+def _encode(records) -> bytes:
+    return b"".join(json.dumps(record, separators=(",", ":")).encode() + b"\n" for record in records)
+
+class _AppendLog:
+    def __init__(self, path: str, fsync: bool):
+        self.path = path
+        self.fsync = fsync
+        self.records = 0
+        self._file = open(path, "ab")
+
+    def append(self, record: list, durable: bool = True) -> None:
+        self._file.write(_encode((record,)))
+        self._file.flush()
+        if durable and self.fsync:
+            os.fsync(self._file.fileno())
+        self.records += 1
+
+    def rewrite(self, records: List[list]) -> None:
+        # Arquivo novo completo e renomeado por cima: uma queda no meio deixa o antigo intacto
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(_encode(records))
+            f.flush()
+            os.fsync(f.fileno())
+        replacement = open(tmp_path, "ab")
+        _lock(replacement)
+        os.replace(tmp_path, self.path)
+        self._file.close()
+        self._file = replacement
+        self.records = len(records)
+
+    def close(self) -> None:
+        self._file.close()
+
+def _lock(file, blocking: bool = True) -> bool:
+    if fcntl is None:
+        return True
+    try:
+        fcntl.flock(file.fileno(), fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+    except BlockingIOError:
+        return False
+    return True
+
+# Lado do coordenador (ShardRouter). Antes da fase 1 grava ["P", txid, shard do débito,
+# shard do crédito]; a decisão de commit ["C", txid] fica no disco antes de qualquer commit
+# nos shards; ["D", txid] marca os dois lados concluídos. Sem "C" vale presumed abort.
+# Cada coordenador escreve o próprio arquivo e o mantém travado com flock enquanto vive
+class DecisionLog:
+    def __init__(self, directory: str, fsync: bool = False):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        # txid -> [shard do débito, shard do crédito, commit decidido]
+        self.open: Dict[str, list] = {}
+        path = os.path.join(directory, f"{COORDINATOR_PREFIX}{os.getpid()}-{uuid.uuid4().hex[:8]}{LOG_SUFFIX}")
+        self._log = _AppendLog(path, fsync)
+        _lock(self._log._file)
+
+    @property
+    def path(self) -> str:
+        return self._log.path
+
+    def begin(self, txid: str, sender_shard: int, receiver_shard: int) -> None:
+        self._log.append(["P", txid, sender_shard, receiver_shard])
+        self.open[txid] = [sender_shard, receiver_shard, False]
+
+    def decide(self, txid: str) -> None:
+        self._log.append(["C", txid])
+        self.open[txid][2] = True
+
+    def done(self, txid: str) -> None:
+        # Perder este registro só faz a recuperação repetir um commit/abort idempotente
+        self._log.append(["D", txid], durable=False)
+        self.open.pop(txid, None)
+        if self._log.records >= REWRITE_RECORDS:
+            self._log.rewrite(_open_records(self.open))
+
+    def orphans(self) -> Iterator["OrphanLog"]:
+        # Logs de coordenadores que pararam: o flock de um processo vivo impede a posse
+        if fcntl is None:
+            return
+        for name in sorted(os.listdir(self.directory)):
+            path = os.path.join(self.directory, name)
+            if not (name.startswith(COORDINATOR_PREFIX) and name.endswith(LOG_SUFFIX)) or path == self.path:
+                continue
+            orphan = OrphanLog.claim(path)
+            if orphan is not None:
+                yield orphan
+
+    def close(self) -> None:
+        # Sem transferências em aberto o arquivo não tem mais nada a recuperar
+        if not self.open:
+            os.remove(self.path)
+        self._log.close()
+
+class OrphanLog:
+    def __init__(self, path: str, file, entries: Dict[str, list]):
+        self.path = path
+        self.entries = entries
+        self._file = file
+
+    @classmethod
+    def claim(cls, path: str) -> Optional["OrphanLog"]:
+        try:
+            file = open(path, "rb")
+        except FileNotFoundError:
+            return None
+        if not _lock(file, blocking=False):
+            file.close()
+            return None
+        try:
+            # O dono pode ter reescrito ou apagado o arquivo entre o open e o flock
+            if os.fstat(file.fileno()).st_ino != os.stat(path).st_ino:
+                file.close()
+                return None
+        except FileNotFoundError:
+            file.close()
+            return None
+        return cls(path, file, _replay(read_records(path)))
+
+    def release(self) -> None:
+        # Tudo resolvido: o arquivo sai; senão fica para a próxima recuperação
+        if not self.entries:
+            os.remove(self.path)
+        self._file.close()
+
+def _replay(records: List[list]) -> Dict[str, list]:
+    entries: Dict[str, list] = {}
+    for record in records:
+        kind, txid = record[0], record[1]
+        if kind == "P":
+            entries[txid] = [record[2], record[3], False]
+        elif kind == "C" and txid in entries:
+            entries[txid][2] = True
+        elif kind == "D":
+            entries.pop(txid, None)
+    return entries
+
+def _open_records(entries: Dict[str, list]) -> List[list]:
+    records = []
+    for txid, (sender_shard, receiver_shard, decided) in entries.items():
+        records.append(["P", txid, sender_shard, receiver_shard])
+        if decided:
+            records.append(["C", txid])
+    return records
+
+# Lado do participante (ShardEngine com --data-dir). ["P", txid, conta, valor, tipo,
+# descrição] antes de responder ao prepare; ["C", txid, id da transação] antes de gravar
+# a transação; ["A", txid] antes de liberar a reserva. Uma reserva preparada só termina
+# com a decisão do coordenador, inclusive depois de reiniciar o shard
+class PreparedLog:
+    def __init__(self, path: str, fsync: bool = False):
+        self.path = path
+        self.fsync = fsync
+        self._log: Optional[_AppendLog] = None
+
+    def load(self) -> Tuple[Dict[str, tuple], Dict[str, int], List[str]]:
+        # Devolve (preparadas não abortadas, txid -> id da transação confirmada, abortadas).
+        # As confirmadas continuam em preparadas: quem carrega confere se a transação foi gravada
+        prepared: Dict[str, tuple] = {}
+        committed: Dict[str, int] = {}
+        aborted: Dict[str, None] = {}
+        for record in read_records(self.path):
+            kind, txid = record[0], record[1]
+            if kind == "P":
+                prepared[txid] = tuple(record[2:])
+            elif kind == "C":
+                committed[txid] = record[2]
+            elif kind == "A":
+                aborted[txid] = None
+        for txid in aborted:
+            prepared.pop(txid, None)
+        self._log = _AppendLog(self.path, self.fsync)
+        return prepared, committed, list(aborted)
+
+    def prepare(self, txid: str, entry: tuple) -> None:
+        self._log.append(["P", txid, *entry])
+
+    def commit(self, txid: str, transaction_id: int) -> None:
+        self._log.append(["C", txid, transaction_id])
+
+    def abort(self, txid: str) -> None:
+        self._log.append(["A", txid])
+
+    def rewrite_due(self) -> bool:
+        return self._log.records >= REWRITE_RECORDS
+
+    def rewrite(self, prepared: Dict[str, tuple], committed: Dict[str, int], aborted) -> None:
+        records = [["C", txid, transaction_id] for txid, transaction_id in committed.items()]
+        records.extend(["A", txid] for txid in aborted)
+        records.extend(["P", txid, *entry] for txid, entry in prepared.items())
+        self._log.rewrite(records)
+
+    def close(self) -> None:
+        if self._log is not None:
+            self._log.close()
+            self._log = None
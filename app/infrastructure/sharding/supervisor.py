@@ -0,0 +1,97 @@
+"""Sobe N processos de shard e imprime o WALLET_SHARDS para os workers da API:
+
+    export WALLET_SHARD_AUTHKEY=segredo
+    python -m app.infrastructure.sharding.supervisor --shards 4 --port 7001 --data-dir ./data
+    WALLET_SHARDS=127.0.0.1:7001,... uvicorn app.main:app --workers 8
+"""
+import argparse
+import multiprocessing
+import os
+import signal
+import sys
+import time
+from typing import List, Optional
+
+from .client import AUTHKEY_ENV, ShardRouter, ShardUnavailable
+from .engine import run_shard
+
+def format_address(address) -> str:
+    return address if isinstance(address, str) else f"{address[0]}:{address[1]}"
+
+def start_shards(
+    addresses: list,
+    authkey: bytes,
+    data_dir: Optional[str] = None,
+    fsync: bool = False,
+    compact_every: int = 1_000_000
+) -> List[multiprocessing.Process]:
+    processes = []
+    for index, address in enumerate(addresses):
+        process = multiprocessing.Process(
+            target=run_shard,
+            args=(index, len(addresses), address, authkey, data_dir, fsync, compact_every),
+            name=f"wallet-shard-{index}",
+            daemon=True,
+        )
+        process.start()
+        processes.append(process)
+    return processes
+
+def wait_ready(addresses: list, authkey: bytes, timeout: float = 10.0) -> None:
+    router = ShardRouter(addresses, authkey, pool_size=1)
+    deadline = time.monotonic() + timeout
+    try:
+        for shard in range(router.count):
+            while True:
+                try:
+                    router.call(shard, "ping")
+                    break
+                except ShardUnavailable:
+                    if time.monotonic() > deadline:
+                        raise
+                    time.sleep(0.05)
+    finally:
+        router.close()
+
+def stop_shards(processes: List[multiprocessing.Process]) -> None:
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        process.join()
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--shards", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7001, help="porta do shard 0; os demais usam as seguintes")
+    parser.add_argument("--socket-dir", help="usa sockets Unix neste diretório em vez de TCP")
+    parser.add_argument("--data-dir", help="persistência por shard em DATA_DIR/shard-N")
+    parser.add_argument("--fsync", action="store_true")
+    parser.add_argument("--compact-every", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    authkey = os.environ.get(AUTHKEY_ENV)
+    if not authkey:
+        sys.exit(f"{AUTHKEY_ENV} must be set")
+    if args.socket_dir:
+        os.makedirs(args.socket_dir, exist_ok=True)
+        addresses = [os.path.abspath(os.path.join(args.socket_dir, f"shard-{i}.sock")) for i in range(args.shards)]
+    else:
+        addresses = [(args.host, args.port + i) for i in range(args.shards)]
+
+    processes = start_shards(addresses, authkey.encode(), args.data_dir, args.fsync, args.compact_every)
+    # SIGTERM vira SystemExit para passar pelo finally e derrubar os shards
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        wait_ready(addresses, authkey.encode())
+        print("WALLET_SHARDS=" + ",".join(format_address(address) for address in addresses), flush=True)
+        while all(process.is_alive() for process in processes):
+            time.sleep(1)
+        sys.exit("A shard process exited unexpectedly")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop_shards(processes)
+
+if __name__ == "__main__":
+    main()
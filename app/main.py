@@ -1,6 +1,38 @@
-from fastapi import FastAPI
+import os
+
+from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from .router import router
+from fastapi.responses import PlainTextResponse
+from .infrastructure.metrics import CONTENT_TYPE, MetricsMiddleware, registry
+from .infrastructure.outbox_dispatcher import OutboxDispatcher, parse_sinks
+from .infrastructure.profiler import SamplingProfiler
+from .infrastructure.sharding.client import ShardedDatabase
+from .models.models import Database
+from .router import STREAM_HEARTBEAT, STREAM_HEARTBEAT_SECONDS, db, event_hub, router
+
+# Persistência opcional do banco em memória (log + snapshots em WALLET_DATA_DIR)
+DATA_DIR = os.environ.get("WALLET_DATA_DIR")
+
+# Métricas ligadas por padrão; o profiler só existe com WALLET_PROFILE_TOKEN definido
+# e só roda nas requisições que mandam "X-Profile: <token>"
+METRICS_ENABLED = os.environ.get("WALLET_METRICS", "1") == "1"
+PROFILE_TOKEN = os.environ.get("WALLET_PROFILE_TOKEN")
+profiler = SamplingProfiler(
+    interval=int(os.environ.get("WALLET_PROFILE_INTERVAL_MS", "5")) / 1000
+) if PROFILE_TOKEN else None
+
+# Eventos das transações (outbox em memória) entregues aos destinos de WALLET_OUTBOX_SINKS,
+# separados por vírgula (file:CAMINHO, webhook:URL ou queue). Com shards não há outbox.
+# Com mais eventos não entregues que os limites, novas transações recebem 503
+OUTBOX_SINKS = os.environ.get("WALLET_OUTBOX_SINKS", "")
+outbox_dispatcher = OutboxDispatcher(
+    parse_sinks(OUTBOX_SINKS),
+    db.enable_outbox(
+        max_pending=int(os.environ.get("WALLET_OUTBOX_MAX_PENDING", "100000")),
+        max_pending_per_account=int(os.environ.get("WALLET_OUTBOX_MAX_PENDING_PER_ACCOUNT", "1000"))
+    ),
+    max_attempts=int(os.environ.get("WALLET_OUTBOX_MAX_ATTEMPTS", "10"))
+) if OUTBOX_SINKS and isinstance(db, Database) else None
 
 app = FastAPI(
     title="Simple Wallet API",
@@ -17,9 +49,62 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware, profiler=profiler, profile_token=PROFILE_TOKEN)
+
 # Incluindo as rotas
 app.include_router(router, prefix="/api")
 
+@app.on_event("startup")
+def load_database():
+    if DATA_DIR:
+        db.enable_persistence(
+            DATA_DIR,
+            fsync=os.environ.get("WALLET_FSYNC", "0") == "1",
+            compact_every=int(os.environ.get("WALLET_COMPACT_EVERY", "1000000"))
+        )
+
+@app.on_event("startup")
+def recover_transfers():
+    # Com shards: termina as transferências entre shards que um worker deixou em dúvida
+    if isinstance(db, ShardedDatabase):
+        db.recover()
+
+@app.on_event("startup")
+async def start_event_hub():
+    event_hub.start(STREAM_HEARTBEAT, STREAM_HEARTBEAT_SECONDS)
+
+@app.on_event("shutdown")
+async def stop_event_hub():
+    # O uvicorn só chega aqui depois de fechar as conexões: com /api/stream abertas,
+    # rode com --timeout-graceful-shutdown para o desligamento não esperar por elas
+    event_hub.stop()
+
+@app.on_event("startup")
+async def start_outbox():
+    if outbox_dispatcher is not None:
+        outbox_dispatcher.start()
+
+@app.on_event("shutdown")
+async def stop_outbox():
+    if outbox_dispatcher is not None:
+        await outbox_dispatcher.stop()
+
+@app.on_event("shutdown")
+def close_database():
+    db.close()
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return PlainTextResponse(registry.render(), media_type=CONTENT_TYPE)
+
+@app.get("/debug/profiles/{profile_id}", include_in_schema=False)
+def get_profile(profile_id: str):
+    profile = profiler.get(profile_id) if profiler is not None else None
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return PlainTextResponse(profile)
+
 @app.get("/")
 async def root():
     return {"message": "Bem-vindo à API da Carteira Digital"}
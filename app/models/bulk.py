@@ -0,0 +1,161 @@
+"""Importação e exportação em massa do banco em memória (CSV, NDJSON, Parquet, Arrow).
+
+    python -m app.models.bulk ./data import users users.csv
+    python -m app.models.bulk ./data import transactions historico.parquet
+    python -m app.models.bulk ./data export transactions - --format ndjson > historico.ndjson
+"""
+import argparse
+import json
+import sys
+from typing import IO, Iterator, List, Optional
+
+from app.infrastructure.bulk_io import (
+    DEFAULT_CHUNK_SIZE,
+    TRANSACTION_FIELDS,
+    USER_FIELDS,
+    ImportReport,
+    resolve_format,
+    validated_chunks,
+    write_chunks,
+)
+from app.infrastructure.money import from_cents
+from app.schemas.schemas import BulkTransactionRow, BulkUserRow
+from .models import Database
+
+OPENING_BALANCE_DESCRIPTION = "Opening balance"
+
+def import_users(
+    database: Database,
+    source: IO[bytes],
+    format: str,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    with_balances: bool = True
+) -> dict:
+    # O saldo de cada usuário entra como um depósito inicial, para o livro-razão continuar
+    # explicando todos os saldos. Com with_balances=False a coluna é ignorada (ex.: ao
+    # importar um export completo, em que as transações já formam os saldos)
+    report = ImportReport("users")
+    for valid in validated_chunks(BulkUserRow, source, format, report, chunk_size):
+        rows = [(user.id, user.name, user.email, user.password) for _, user in valid]
+        rejected = dict(database.import_users(rows))
+        opening = []
+        for index, (number, user) in enumerate(valid):
+            if index in rejected:
+                report.reject(number, rejected[index])
+                continue
+            report.imported += 1
+            if with_balances and user.balance > 0:
+                account_id = database.get_user_by_email(user.email).id
+                opening.append((user.balance, "deposit", OPENING_BALANCE_DESCRIPTION, account_id, None))
+        if opening:
+            report.accounts_updated += len(database.import_transactions(opening))
+    return report.as_dict()
+
+def import_transactions(
+    database: Database,
+    source: IO[bytes],
+    format: str,
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> dict:
+    # O banco em memória não tem transferência como tipo: vira um saque e um depósito.
+    # O histórico importado não passa pela checagem de saldo, só o saldo final de cada conta muda
+    report = ImportReport("transactions")
+    updated = set()
+    for valid in validated_chunks(BulkTransactionRow, source, format, report, chunk_size):
+        rows = []
+        for number, row in valid:
+            ts = row.timestamp.timestamp() if row.timestamp is not None else None
+            if row.user_id not in database.users:
+                report.reject(number, "User not found")
+            elif row.type != "transfer":
+                rows.append((row.amount, row.type, row.description, row.user_id, ts))
+                report.imported += 1
+            elif row.receiver_id not in database.users:
+                report.reject(number, "Receiver not found")
+            elif row.receiver_id == row.user_id:
+                report.reject(number, "Cannot transfer to the same account")
+            else:
+                rows.append((row.amount, "withdrawal", row.description, row.user_id, ts))
+                rows.append((row.amount, "deposit", row.description, row.receiver_id, ts))
+                report.imported += 1
+        if rows:
+            updated.update(database.import_transactions(rows))
+    report.accounts_updated = len(updated)
+    return report.as_dict()
+
+def _chunked(ids: List[int], chunk_size: int) -> Iterator[List[int]]:
+    for start in range(0, len(ids), chunk_size):
+        yield ids[start:start + chunk_size]
+
+def export_users(database: Database, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[List[dict]]:
+    # Copia só as chaves: o dicionário pode crescer durante a exportação
+    users = database.users
+    for ids in _chunked(list(users), chunk_size):
+        yield [
+            {"id": user.id, "name": user.name, "email": user.email, "balance": from_cents(user.balance)}
+            for user in (users[id] for id in ids)
+        ]
+
+def export_transactions(
+    database: Database,
+    user_id: Optional[int] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Iterator[List[dict]]:
+    ids = list(database.transactions) if user_id is None else list(database.user_transaction_ids.get(user_id, ()))
+    transactions = database.transactions
+    for chunk in _chunked(ids, chunk_size):
+        yield [
+            {
+                "id": t.id,
+                "amount": from_cents(t.amount),
+                "type": t.type,
+                "description": t.description,
+                "user_id": t.user_id,
+                "timestamp": t.timestamp,
+            }
+            for t in (transactions[id] for id in chunk)
+        ]
+
+def export(database: Database, dataset: str, format: str, user_id: Optional[int] = None,
+           chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+    if dataset == "users":
+        return write_chunks(export_users(database, chunk_size), format, USER_FIELDS)
+    return write_chunks(export_transactions(database, user_id, chunk_size), format, TRANSACTION_FIELDS)
+
+def main():
+    parser = argparse.ArgumentParser(description="Importação e exportação em massa do banco em memória")
+    parser.add_argument("data_dir")
+    parser.add_argument("command", choices=["import", "export"])
+    parser.add_argument("dataset", choices=["users", "transactions"])
+    parser.add_argument("file", help="arquivo de entrada/saída ('-' para stdin/stdout)")
+    parser.add_argument("--format", help="csv, ndjson, parquet ou arrow (padrão: pela extensão)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--no-balances", action="store_true", help="ignora a coluna balance dos usuários")
+    parser.add_argument("--user-id", type=int, help="exporta só as transações desta conta")
+    args = parser.parse_args()
+
+    format = resolve_format(args.format, args.file if args.file != "-" else None)
+    database = Database()
+    database.enable_persistence(args.data_dir)
+    try:
+        if args.command == "export":
+            output = sys.stdout.buffer if args.file == "-" else open(args.file, "wb")
+            with output:
+                for data in export(database, args.dataset, format, args.user_id, args.chunk_size):
+                    output.write(data)
+            return
+
+        source = sys.stdin.buffer if args.file == "-" else open(args.file, "rb")
+        with source:
+            if args.dataset == "users":
+                report = import_users(database, source, format, args.chunk_size, not args.no_balances)
+            else:
+                report = import_transactions(database, source, format, args.chunk_size)
+        # Um snapshot no fim deixa a próxima carga rápida em vez de repetir o log inteiro
+        database.compact()
+        print(json.dumps(report, indent=2))
+    finally:
+        database.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+from array import array
+from typing import Dict, Iterable, List, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # numpy é opcional: sem ele o replay é feito em Python puro
+    np = None
+
+DEFAULT_SNAPSHOT_INTERVAL = 100
+
+# Livro-razão append-only: cada lançamento é (conta, valor com sinal em centavos, transação).
+# O saldo de uma conta é o último snapshot mais os lançamentos posteriores a ele.
+# Tudo em int64: somas e comparações são exatas, sem tolerância.
+class Ledger:
+    def __init__(self, snapshot_interval: int = DEFAULT_SNAPSHOT_INTERVAL):
+        self.snapshot_interval = snapshot_interval
+        self.account_ids = array("q")
+        self.amounts = array("q")
+        self.transaction_ids = array("q")
+        # conta -> posições dos seus lançamentos nas colunas acima
+        self.account_entries: Dict[int, array] = {}
+        # conta -> [(quantidade de lançamentos cobertos, saldo)] a cada snapshot_interval lançamentos
+        self.snapshots: Dict[int, List[Tuple[int, int]]] = {}
+
+    def __len__(self) -> int:
+        return len(self.amounts)
+
+    def append(self, account_id: int, amount: int, transaction_id: int) -> int:
+        position = len(self.amounts)
+        self.account_ids.append(account_id)
+        self.amounts.append(amount)
+        self.transaction_ids.append(transaction_id)
+        entries = self.account_entries.get(account_id)
+        if entries is None:
+            entries = self.account_entries[account_id] = array("q")
+        entries.append(position)
+        if len(entries) % self.snapshot_interval == 0:
+            self.snapshots.setdefault(account_id, []).append((len(entries), self.balance(account_id)))
+        return position
+
+    def balance(self, account_id: int) -> int:
+        entries = self.account_entries.get(account_id)
+        if not entries:
+            return 0
+        covered, balance = 0, 0
+        snapshots = self.snapshots.get(account_id)
+        if snapshots:
+            covered, balance = snapshots[-1]
+        amounts = self.amounts
+        for index in range(covered, len(entries)):
+            balance += amounts[entries[index]]
+        return balance
+
+    def replay(self) -> Dict[int, int]:
+        # Recalcula o saldo de todas as contas a partir do histórico completo
+        if not self.amounts:
+            return {}
+        if np is not None:
+            account_ids = np.frombuffer(self.account_ids, dtype=np.int64)
+            amounts = np.frombuffer(self.amounts, dtype=np.int64)
+            accounts, inverse = np.unique(account_ids, return_inverse=True)
+            # bincount com pesos soma em float64; add.at mantém int64
+            totals = np.zeros(len(accounts), dtype=np.int64)
+            np.add.at(totals, inverse, amounts)
+            return dict(zip(accounts.tolist(), totals.tolist()))
+        totals: Dict[int, int] = {}
+        for account_id, amount in zip(self.account_ids, self.amounts):
+            totals[account_id] = totals.get(account_id, 0) + amount
+        return totals
+
+    def verify(self, balances: Dict[int, int]) -> List[Tuple[int, int, int]]:
+        # Retorna (conta, saldo armazenado, saldo pelo histórico) de cada divergência, no
+        # saldo materializado, no saldo lido por balance() e em qualquer snapshot
+        expected = self.replay()
+        mismatches = []
+        for account_id in sorted(set(expected) | set(balances)):
+            stored = balances.get(account_id, 0)
+            replayed = expected.get(account_id, 0)
+            if stored != replayed:
+                mismatches.append((account_id, stored, replayed))
+            read = self.balance(account_id)
+            if read != replayed:
+                mismatches.append((account_id, read, replayed))
+        for account_id, snapshots in self.snapshots.items():
+            running = self._running_balances(self.account_entries[account_id])
+            for covered, balance in snapshots:
+                if running[covered - 1] != balance:
+                    mismatches.append((account_id, balance, running[covered - 1]))
+        return mismatches
+
+    def rebuild_snapshots(self) -> None:
+        self.snapshots = {}
+        interval = self.snapshot_interval
+        for account_id, entries in self.account_entries.items():
+            if len(entries) < interval:
+                continue
+            running = self._running_balances(entries)
+            self.snapshots[account_id] = [
+                (covered, running[covered - 1])
+                for covered in range(interval, len(entries) + 1, interval)
+            ]
+
+    def _running_balances(self, entries: Iterable[int]) -> List[int]:
+        if np is not None:
+            amounts = np.frombuffer(self.amounts, dtype=np.int64)
+            return np.cumsum(amounts[np.frombuffer(entries, dtype=np.int64)]).tolist()
+        running, balance = [], 0
+        for position in entries:
+            balance += self.amounts[position]
+            running.append(balance)
+        return running
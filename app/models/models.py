@@ -1,48 +1,287 @@
+import threading
+import time
+from bisect import bisect_right
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from app.infrastructure.metrics import observe_stage, stage
+from app.repositories.aggregates import DEPOSITS, WITHDRAWALS, TransactionAggregates
+from .ledger import Ledger
+from .outbox import MemoryOutbox
 
 class User:
+    __slots__ = ("id", "name", "email", "password", "balance")
+
     def __init__(self, id: int, name: str, email: str, password: str):
         self.id = id
         self.name = name
         self.email = email
         self.password = password
-        self.balance = 0.0
+        # Centavos
+        self.balance = 0
 
 class Transaction:
-    def __init__(self, id: int, amount: float, type: str, description: str, user_id: int):
+    # Sem __dict__, valor em centavos e horário em segundos desde a época (float) em vez de um datetime
+    __slots__ = ("id", "amount", "type", "description", "user_id", "ts")
+
+    def __init__(self, id: int, amount: int, type: str, description: str, user_id: int, ts: Optional[float] = None):
         self.id = id
         self.amount = amount
         self.type = type
         self.description = description
         self.user_id = user_id
-        self.timestamp = datetime.now()
+        self.ts = time.time() if ts is None else ts
+
+    @property
+    def timestamp(self) -> datetime:
+        return datetime.fromtimestamp(self.ts)
+
+def _observe_write(started: float, acquired: float) -> None:
+    # Espera pelo lock e escrita medidas separadamente, registradas já fora do lock
+    observe_stage("write_lock_wait", acquired - started)
+    observe_stage("memory_write", time.perf_counter() - acquired)
 
 # Banco de dados em memória
 class Database:
-    def __init__(self):
+    def __init__(self, id_start: int = 1, id_step: int = 1):
         self.users: Dict[int, User] = {}
         self.transactions: Dict[int, Transaction] = {}
-        self.user_id_counter = 1
-        self.transaction_id_counter = 1
+        # Com id_step > 1 (um Database por shard) cada instância gera ids de uma classe
+        # de resto própria, então ids de shards diferentes nunca colidem
+        self.id_step = id_step
+        self.user_id_counter = id_start
+        self.transaction_id_counter = id_start
+        # Índices secundários: email -> usuário e usuário -> ids das transações (ordem de inserção)
+        self.users_by_email: Dict[str, User] = {}
+        self.user_transaction_ids: Dict[int, List[int]] = {}
+        # Histórico append-only de onde os saldos podem ser reconstruídos
+        self.ledger = Ledger()
+        # Totais por dia para /transactions/summary e /reports/daily, refeitos no replay do log
+        self.aggregates = TransactionAggregates()
+        # Serializa a atribuição de ids e a escrita no log de persistência
+        self._write_lock = threading.Lock()
+        self.persistence = None
+        # Eventos das transações criadas pela API, ligado pelo app quando há destinos configurados
+        self.outbox: Optional[MemoryOutbox] = None
+        # Com persistência: maior id de transação com os eventos entregues (None se o outbox
+        # nunca foi ligado neste diretório) e blocos importados acima dele, que não geram eventos
+        self.outbox_settled_id: Optional[int] = None
+        self.imported_ranges: List[Tuple[int, int]] = []
 
     def create_user(self, name: str, email: str, password: str) -> User:
-        user = User(self.user_id_counter, name, email, password)
-        self.users[user.id] = user
-        self.user_id_counter += 1
+        started = time.perf_counter()
+        with self._write_lock:
+            acquired = time.perf_counter()
+            user = User(self.user_id_counter, name, email, password)
+            if self.persistence:
+                with stage("wal_append"):
+                    self.persistence.log_user(user)
+            self._add_user(user)
+        _observe_write(started, acquired)
+        self._maybe_compact()
         return user
 
     def get_user_by_email(self, email: str) -> User | None:
-        return next((user for user in self.users.values() if user.email == email), None)
+        return self.users_by_email.get(email)
 
-    def create_transaction(self, amount: float, type: str, description: str, user_id: int) -> Transaction:
-        transaction = Transaction(self.transaction_id_counter, amount, type, description, user_id)
-        self.transactions[transaction.id] = transaction
-        self.transaction_id_counter += 1
+    def create_transaction(self, amount: int, type: str, description: str, user_id: int) -> Transaction:
+        started = time.perf_counter()
+        with self._write_lock:
+            acquired = time.perf_counter()
+            if self.outbox is not None:
+                self.outbox.check(user_id)
+            transaction = Transaction(self.transaction_id_counter, amount, type, description, user_id)
+            if self.persistence:
+                with stage("wal_append"):
+                    self.persistence.log_transaction(transaction)
+            self._add_transaction(transaction)
+            if self.outbox is not None:
+                self.outbox.add(transaction)
+        _observe_write(started, acquired)
+        if self.outbox is not None:
+            self.outbox.notify()
+        self._maybe_compact()
+        return transaction
+
+    def import_users(self, rows: List[Tuple[Optional[int], str, str, str]]) -> List[Tuple[int, str]]:
+        # rows: (id ou None, nome, email, senha); retorna (posição, motivo) das linhas recusadas.
+        # Ids explícitos só acima dos já usados: o replay do log depende de ids crescentes
+        rejected = []
+        with self._write_lock:
+            users = []
+            for index, (id, name, email, password) in enumerate(rows):
+                if email in self.users_by_email:
+                    rejected.append((index, "Email already registered"))
+                    continue
+                if id is not None and id < self.user_id_counter:
+                    rejected.append((index, f"Id {id} is already in use"))
+                    continue
+                user = User(self.user_id_counter if id is None else id, name, email, password)
+                self._add_user(user)
+                users.append(user)
+            if self.persistence:
+                self.persistence.log_many(users=users)
+        self._maybe_compact()
+        return rejected
+
+    def import_transactions(self, rows: List[Tuple[int, str, str, int, Optional[float]]]) -> Dict[int, int]:
+        # rows: (valor, tipo, descrição, user_id, horário ou None), contas já conferidas.
+        # Os saldos são ajustados uma vez por conta no fim do bloco; retorna a variação de cada uma
+        deltas: Dict[int, int] = {}
+        with self._write_lock:
+            transactions = []
+            for amount, type, description, user_id, ts in rows:
+                transaction = Transaction(self.transaction_id_counter, amount, type, description, user_id, ts)
+                self._add_transaction(transaction, apply_balance=False)
+                transactions.append(transaction)
+                deltas[user_id] = deltas.get(user_id, 0) + (amount if type == "deposit" else -amount)
+            if self.persistence:
+                imported = None
+                if transactions and self.outbox_settled_id is not None:
+                    imported = (transactions[0].id, transactions[-1].id)
+                    self.imported_ranges.append(imported)
+                self.persistence.log_many(transactions=transactions, imported=imported)
+            for user_id, delta in deltas.items():
+                self.users[user_id].balance += delta
+        self._maybe_compact()
+        return deltas
+
+    def restore_user(self, id: int, name: str, email: str, password: str, balance: int) -> User:
+        user = User(id, name, email, password)
+        user.balance = balance
+        self._add_user(user)
+        return user
+
+    def restore_transaction(
+        self,
+        id: int,
+        amount: int,
+        type: str,
+        description: str,
+        user_id: int,
+        ts: float,
+        apply_balance: bool = True
+    ) -> Transaction:
+        transaction = Transaction(id, amount, type, description, user_id, ts)
+        self._add_transaction(transaction, apply_balance)
         return transaction
 
+    def restore_outbox(self, settled_id: int) -> None:
+        self.outbox_settled_id = max(settled_id, self.outbox_settled_id or 0)
+
+    def restore_imported(self, first_id: int, last_id: int) -> None:
+        self.imported_ranges.append((first_id, last_id))
+
+    def _add_user(self, user: User) -> None:
+        self.users[user.id] = user
+        self.users_by_email[user.email] = user
+        self.user_transaction_ids.setdefault(user.id, [])
+        self.user_id_counter = max(self.user_id_counter, user.id + self.id_step)
+
+    def _add_transaction(self, transaction: Transaction, apply_balance: bool = True) -> None:
+        self.transactions[transaction.id] = transaction
+        self.user_transaction_ids.setdefault(transaction.user_id, []).append(transaction.id)
+        self.transaction_id_counter = max(self.transaction_id_counter, transaction.id + self.id_step)
+
+        # Saldo materializado e lançamento no livro-razão andam juntos
+        signed_amount = transaction.amount if transaction.type == "deposit" else -transaction.amount
+        self.ledger.append(transaction.user_id, signed_amount, transaction.id)
+        bucket = DEPOSITS if transaction.type == "deposit" else WITHDRAWALS
+        self.aggregates.record(transaction.ts, transaction.amount, ((transaction.user_id, bucket),))
+        if apply_balance:
+            self.users[transaction.user_id].balance += signed_amount
+
+    def enable_persistence(self, data_dir: str, fsync: bool = False, compact_every: int = 1_000_000) -> None:
+        from .persistence import Persistence
+
+        persistence = Persistence(data_dir, fsync=fsync, compact_every=compact_every)
+        with self._write_lock:
+            persistence.load(self)
+            self.persistence = persistence
+            if self.outbox is not None:
+                self._resume_outbox()
+
+    def enable_outbox(self, max_pending: int = 0, max_pending_per_account: int = 0) -> MemoryOutbox:
+        # Só create_transaction gera eventos; importação em lote não. O replay do log só
+        # regera os eventos ainda não entregues
+        with self._write_lock:
+            if self.outbox is None:
+                self.outbox = MemoryOutbox(max_pending, max_pending_per_account)
+                self.outbox.on_settled = self.settle_outbox
+                if self.persistence:
+                    self._resume_outbox()
+        return self.outbox
+
+    def settle_outbox(self, settled_id: int) -> None:
+        with self._write_lock:
+            if not self.persistence or settled_id <= (self.outbox_settled_id or 0):
+                return
+            self.outbox_settled_id = settled_id
+            self.imported_ranges = [r for r in self.imported_ranges if r[1] > settled_id]
+            self.persistence.log_outbox(settled_id)
+        self._maybe_compact()
+
+    def _resume_outbox(self) -> None:
+        if self.outbox_settled_id is None:
+            # Primeira vez com outbox neste diretório: só as transações daqui em diante geram eventos
+            self.outbox_settled_id = self.transaction_id_counter - self.id_step
+            self.persistence.log_outbox(self.outbox_settled_id)
+        imported = self.imported_ranges
+        transactions = (
+            self.transactions[id]
+            for id in range(self.outbox_settled_id + 1, self.transaction_id_counter)
+            if id in self.transactions and not any(first <= id <= last for first, last in imported)
+        )
+        self.outbox.resume(self.outbox_settled_id, transactions)
+
+    def compact(self) -> None:
+        with self._write_lock:
+            if self.persistence:
+                self.persistence.compact(self)
+
+    def close(self) -> None:
+        with self._write_lock:
+            if self.persistence:
+                self.persistence.close()
+                self.persistence = None
+
+    def _maybe_compact(self) -> None:
+        if self.persistence and self.persistence.compaction_due():
+            with self._write_lock:
+                if self.persistence and self.persistence.compaction_due():
+                    self.persistence.compact(self)
+
     def get_user_transactions(self, user_id: int) -> List[Transaction]:
-        return [t for t in self.transactions.values() if t.user_id == user_id]
+        transactions = self.transactions
+        return [transactions[i] for i in self.user_transaction_ids.get(user_id, ())]
+
+    def iter_user_transactions(self, user_id: int, after_id: Optional[int] = None) -> Iterator[Transaction]:
+        ids = self.user_transaction_ids.get(user_id, [])
+        index = bisect_right(ids, after_id) if after_id is not None else 0
+        transactions = self.transactions
+        while index < len(ids):
+            yield transactions[ids[index]]
+            index += 1
+
+    def get_balance(self, user_id: int) -> int:
+        # Lido do livro-razão (último snapshot mais os lançamentos seguintes), a mesma
+        # fonte que verify_balances confere
+        return self.ledger.balance(user_id)
+
+    def verify_balances(self) -> List[Tuple[int, int, int]]:
+        return self.ledger.verify({user.id: user.balance for user in self.users.values()})
+
+    def rebuild_balances(self) -> int:
+        # Regrava saldos e snapshots a partir do histórico; retorna quantos saldos mudaram
+        replayed = self.ledger.replay()
+        changed = 0
+        for user in self.users.values():
+            balance = replayed.get(user.id, 0)
+            if user.balance != balance:
+                user.balance = balance
+                changed += 1
+        self.ledger.rebuild_snapshots()
+        return changed
 
 # Instância global do "banco de dados"
-db = Database() 
\ No newline at end of file
+db = Database()
@@ -0,0 +1,149 @@
+import asyncio
+import heapq
+import threading
+from collections import deque
+from contextlib import asynccontextmanager
+from datetime import datetime
+from itertools import islice
+from typing import Callable, Deque, Dict, Iterable, List, Optional, Set
+
+from app.infrastructure.outbox_dispatcher import transaction_events
+
+class MemoryEvent:
+    # Mesmos campos de OutboxEvent, que é o que o dispatcher lê e marca
+    __slots__ = (
+        "id", "account_id", "event_type", "transaction_id", "payload", "created_at",
+        "attempts", "available_at", "delivered_at", "failed_at", "last_error",
+    )
+
+    def __init__(self, id: int, account_id: int, event_type: str, transaction_id: int, payload: str, created_at: datetime, attempts: int = 0):
+        self.id = id
+        self.account_id = account_id
+        self.event_type = event_type
+        self.transaction_id = transaction_id
+        self.payload = payload
+        self.created_at = created_at
+        self.attempts = attempts
+        self.available_at = None
+        self.delivered_at = None
+        self.failed_at = None
+        self.last_error = None
+
+class OutboxFull(Exception):
+    pass
+
+# Ids dos eventos derivados do id da transação (uma transferência gera até dois): o mesmo
+# evento regerado depois de um reinício sai com o mesmo id
+EVENTS_PER_TRANSACTION = 2
+
+# Outbox do banco em memória: os eventos de cada transação entram sob o _write_lock do
+# Database, junto com a transação, e ficam numa fila por conta até serem entregues. Com
+# persistência, o maior id de transação com todos os eventos entregues vai para o log
+# (on_settled) e os eventos das transações seguintes são regerados ao carregar
+class MemoryOutbox:
+    def __init__(self, max_pending: int = 0, max_pending_per_account: int = 0):
+        # conta -> eventos pendentes em ordem de id; entregues saem da frente da fila
+        self.pending: Dict[int, Deque[MemoryEvent]] = {}
+        # Limites de eventos não entregues (0 desliga); cheio, a transação é recusada
+        self.max_pending = max_pending
+        self.max_pending_per_account = max_pending_per_account
+        self.count = 0
+        # Maior id de transação recebido e o último repassado a on_settled
+        self.last_transaction_id = 0
+        self.settled_id = 0
+        # Chamado numa thread à parte com o novo maior id de transação já entregue
+        self.on_settled: Optional[Callable[[int], None]] = None
+        # Lock próprio: o dispatcher não espera pelo _write_lock (que pode incluir um fsync)
+        self._lock = threading.Lock()
+        self._wakers: Set[Callable[[], None]] = set()
+
+    def check(self, account_id: int) -> None:
+        # Sob o _write_lock, antes de gravar a transação: só add aumenta as filas
+        if self.max_pending and self.count >= self.max_pending:
+            raise OutboxFull("Too many undelivered events")
+        queue = self.pending.get(account_id)
+        if self.max_pending_per_account and queue is not None and len(queue) >= self.max_pending_per_account:
+            raise OutboxFull(f"Too many undelivered events for account {account_id}")
+
+    def add(self, transaction) -> None:
+        with self._lock:
+            events = transaction_events(transaction, datetime.utcnow())
+            for index, fields in enumerate(events):
+                item = MemoryEvent(transaction.id * EVENTS_PER_TRANSACTION + index, **fields)
+                queue = self.pending.get(item.account_id)
+                if queue is None:
+                    queue = self.pending[item.account_id] = deque()
+                queue.append(item)
+            self.count += len(events)
+            self.last_transaction_id = transaction.id
+
+    def resume(self, settled_id: int, transactions: Iterable) -> None:
+        # Depois de carregar o log: eventos das transações posteriores à última entregue
+        self.settled_id = self.last_transaction_id = settled_id
+        for transaction in transactions:
+            self.add(transaction)
+
+    def release(self, account_id: int, discard: bool = False) -> bool:
+        # Libera a conta parada atrás de um evento descartado: reenvia ou abandona o evento
+        with self._lock:
+            queue = self.pending.get(account_id)
+            if not queue or queue[0].failed_at is None:
+                return False
+            if discard:
+                queue.popleft()
+                self.count -= 1
+                if not queue:
+                    del self.pending[account_id]
+            else:
+                head = queue[0]
+                head.failed_at = head.available_at = head.last_error = None
+                head.attempts = 0
+        self.notify()
+        return True
+
+    def failed(self) -> List[MemoryEvent]:
+        with self._lock:
+            return [queue[0] for queue in self.pending.values() if queue[0].failed_at is not None]
+
+    def notify(self) -> None:
+        # Fora do _write_lock, depois que a transação já está visível
+        for waker in list(self._wakers):
+            waker()
+
+    def add_waker(self, waker: Callable[[], None]) -> None:
+        self._wakers.add(waker)
+
+    def remove_waker(self, waker: Callable[[], None]) -> None:
+        self._wakers.discard(waker)
+
+    @asynccontextmanager
+    async def batch(self, limit: int, now: datetime):
+        # Pendentes em ordem de id, pulando as contas cuja cabeça aguarda nova tentativa ou foi
+        # descartada (fica na fila e segura a conta, como na tabela do banco SQL)
+        with self._lock:
+            queues = [
+                queue for queue in self.pending.values()
+                if queue[0].failed_at is None and (queue[0].available_at is None or queue[0].available_at <= now)
+            ]
+            rows = list(islice(heapq.merge(*queues, key=lambda item: item.id), limit))
+        yield rows
+        with self._lock:
+            for account_id in {row.account_id for row in rows}:
+                queue = self.pending[account_id]
+                while queue and queue[0].delivered_at is not None:
+                    queue.popleft()
+                    self.count -= 1
+                if not queue:
+                    del self.pending[account_id]
+            heads = [queue[0].transaction_id for queue in self.pending.values()]
+            settled_id = min(heads) - 1 if heads else self.last_transaction_id
+            advanced = settled_id > self.settled_id
+            if advanced:
+                self.settled_id = settled_id
+        if advanced and self.on_settled is not None:
+            # Grava no log da persistência, que pode fazer fsync: fora do laço de eventos
+            await asyncio.to_thread(self.on_settled, settled_id)
+
+    async def purge(self, before: datetime) -> None:
+        # Entregues já saem da memória no fim de cada lote
+        pass
@@ -0,0 +1,313 @@
+import argparse
+import mmap
+import os
+import struct
+import zlib
+from datetime import datetime
+from typing import Iterator, Tuple
+
+from app.infrastructure.money import CENTS_PER_UNIT
+
+try:
+    import fcntl
+except ImportError:  # sem flock (Windows) o diretório não é travado
+    fcntl = None
+
+# Formato binário (little-endian). Cada registro: cabeçalho (tipo, tamanho, crc32) + payload.
+#   usuário:   id q, saldo em centavos q, nome/email/senha (tamanho I + utf-8)
+#   transação: id q, user_id q, valor em centavos q, timestamp d, tipo B, descrição (tamanho I + utf-8)
+#   outbox:    maior id de transação com todos os eventos entregues q
+#   importação: primeiro e último id q q de um bloco importado em massa (não gera eventos)
+# O snapshot começa com MAGIC, versão e os maiores ids que contém; o log guarda só o que veio depois.
+# Os registros do outbox valem sempre, inclusive no snapshot (versão 3).
+# Arquivos da versão 1 (valores em double, tipos de registro 1 e 2) continuam legíveis.
+MAGIC = b"WALLETDB"
+VERSION = 3
+READABLE_VERSIONS = (1, 2, 3)
+SNAPSHOT_FILE = "snapshot.bin"
+LOG_FILE = "wal.log"
+# Travado com flock por quem carregou o diretório (servidor, shard ou CLI) até o close
+LOCK_FILE = "wallet.lock"
+
+LEGACY_USER_RECORD = 1
+LEGACY_TRANSACTION_RECORD = 2
+USER_RECORD = 3
+TRANSACTION_RECORD = 4
+OUTBOX_RECORD = 5
+IMPORTED_RECORD = 6
+USER_RECORDS = (USER_RECORD, LEGACY_USER_RECORD)
+OUTBOX_RECORDS = (OUTBOX_RECORD, IMPORTED_RECORD)
+TRANSACTION_TYPES = ("deposit", "withdrawal")
+TRANSACTION_TYPE_CODES = {name: code for code, name in enumerate(TRANSACTION_TYPES)}
+NONE_LENGTH = 0xFFFFFFFF
+
+_HEADER = struct.Struct("<BII")
+_SNAPSHOT_HEADER = struct.Struct("<8sIqq")
+_USER = struct.Struct("<qq")
+_TRANSACTION = struct.Struct("<qqqdB")
+_LEGACY_USER = struct.Struct("<qd")
+_LEGACY_TRANSACTION = struct.Struct("<qqddB")
+_OUTBOX = struct.Struct("<q")
+_IMPORTED = struct.Struct("<qq")
+_LENGTH = struct.Struct("<I")
+
+class CorruptSnapshot(Exception):
+    pass
+
+class DataDirLocked(Exception):
+    pass
+
+def _encode_str(value) -> bytes:
+    if value is None:
+        return _LENGTH.pack(NONE_LENGTH)
+    data = value.encode()
+    return _LENGTH.pack(len(data)) + data
+
+def _decode_str(buffer, offset: int) -> Tuple[str, int]:
+    (length,) = _LENGTH.unpack_from(buffer, offset)
+    offset += _LENGTH.size
+    if length == NONE_LENGTH:
+        return None, offset
+    return bytes(buffer[offset:offset + length]).decode(), offset + length
+
+def _record(kind: int, payload: bytes) -> bytes:
+    return _HEADER.pack(kind, len(payload), zlib.crc32(payload)) + payload
+
+def encode_user(user) -> bytes:
+    payload = (
+        _USER.pack(user.id, user.balance)
+        + _encode_str(user.name)
+        + _encode_str(user.email)
+        + _encode_str(user.password)
+    )
+    return _record(USER_RECORD, payload)
+
+def encode_transaction(transaction) -> bytes:
+    payload = _TRANSACTION.pack(
+        transaction.id,
+        transaction.user_id,
+        transaction.amount,
+        transaction.ts,
+        TRANSACTION_TYPE_CODES[transaction.type],
+    ) + _encode_str(transaction.description)
+    return _record(TRANSACTION_RECORD, payload)
+
+def encode_outbox(settled_id: int) -> bytes:
+    return _record(OUTBOX_RECORD, _OUTBOX.pack(settled_id))
+
+def encode_imported(first_id: int, last_id: int) -> bytes:
+    return _record(IMPORTED_RECORD, _IMPORTED.pack(first_id, last_id))
+
+def iter_records(buffer, offset: int, check_crc: bool) -> Iterator[Tuple[int, int, int]]:
+    # Produz (tipo, início do payload, fim do registro); para no primeiro registro
+    # truncado ou com crc inválido (escrita interrompida no fim do log)
+    end = len(buffer)
+    while offset + _HEADER.size <= end:
+        kind, length, crc = _HEADER.unpack_from(buffer, offset)
+        start = offset + _HEADER.size
+        if start + length > end:
+            return
+        if check_crc and zlib.crc32(buffer[start:start + length]) != crc:
+            return
+        yield kind, start, start + length
+        offset = start + length
+
+class Persistence:
+    def __init__(self, data_dir: str, fsync: bool = False, compact_every: int = 1_000_000):
+        self.data_dir = data_dir
+        self.fsync = fsync
+        self.compact_every = compact_every
+        self.snapshot_path = os.path.join(data_dir, SNAPSHOT_FILE)
+        self.log_path = os.path.join(data_dir, LOG_FILE)
+        self.log_records = 0
+        self._log = None
+        self._lock = None
+
+    def load(self, database) -> None:
+        os.makedirs(self.data_dir, exist_ok=True)
+        # Um único escritor por diretório: um import ou compact do CLI com o servidor no ar
+        # escreveria no mesmo wal.log/snapshot.bin
+        self._acquire_lock()
+        last_user_id, last_transaction_id = self._load_snapshot(database)
+        valid_end = self._replay_log(database, last_user_id, last_transaction_id)
+        self._log = open(self.log_path, "ab")
+        if self._log.tell() != valid_end:
+            # Descarta o final corrompido para que novas escritas fiquem legíveis
+            self._log.truncate(valid_end)
+            self._log.seek(valid_end)
+
+    def log_user(self, user) -> None:
+        self._append(encode_user(user))
+
+    def log_transaction(self, transaction) -> None:
+        self._append(encode_transaction(transaction))
+
+    def log_outbox(self, settled_id: int) -> None:
+        self._append(encode_outbox(settled_id))
+
+    def log_many(self, users=(), transactions=(), imported=None) -> None:
+        # Importações em massa: um write/flush (e fsync) por bloco em vez de um por registro.
+        # imported: (primeiro, último) id do bloco, gravado junto para o outbox não regerá-lo
+        records = [encode_user(user) for user in users]
+        records.extend(encode_transaction(transaction) for transaction in transactions)
+        if imported is not None:
+            records.append(encode_imported(*imported))
+        if records:
+            self._append(b"".join(records), len(records))
+
+    def compaction_due(self) -> bool:
+        return self.log_records >= self.compact_every
+
+    def compact(self, database) -> None:
+        tmp_path = self.snapshot_path + ".tmp"
+        with open(tmp_path, "wb") as snapshot:
+            snapshot.write(_SNAPSHOT_HEADER.pack(
+                MAGIC, VERSION, database.user_id_counter - 1, database.transaction_id_counter - 1
+            ))
+            for user in database.users.values():
+                snapshot.write(encode_user(user))
+            for transaction in database.transactions.values():
+                snapshot.write(encode_transaction(transaction))
+            if database.outbox_settled_id is not None:
+                snapshot.write(encode_outbox(database.outbox_settled_id))
+                for first_id, last_id in database.imported_ranges:
+                    snapshot.write(encode_imported(first_id, last_id))
+            snapshot.flush()
+            os.fsync(snapshot.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+        self._fsync_dir()
+
+        # Registros já cobertos pelo snapshot são ignorados no replay, então
+        # uma falha antes de truncar o log não duplica nada
+        self._log.close()
+        self._log = open(self.log_path, "wb")
+        self.log_records = 0
+
+    def close(self) -> None:
+        if self._log is not None:
+            self._log.flush()
+            os.fsync(self._log.fileno())
+            self._log.close()
+            self._log = None
+        if self._lock is not None:
+            self._lock.close()
+            self._lock = None
+
+    def _acquire_lock(self) -> None:
+        lock = open(os.path.join(self.data_dir, LOCK_FILE), "ab")
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                lock.close()
+                raise DataDirLocked(f"{self.data_dir} is in use by another process (server, shard or CLI)")
+        self._lock = lock
+
+    def _append(self, data: bytes, records: int = 1) -> None:
+        self._log.write(data)
+        self._log.flush()
+        if self.fsync:
+            os.fsync(self._log.fileno())
+        self.log_records += records
+
+    def _load_snapshot(self, database) -> Tuple[int, int]:
+        if not os.path.exists(self.snapshot_path) or os.path.getsize(self.snapshot_path) == 0:
+            return 0, 0
+        with open(self.snapshot_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            magic, version, last_user_id, last_transaction_id = _SNAPSHOT_HEADER.unpack_from(buffer, 0)
+            if magic != MAGIC or version not in READABLE_VERSIONS:
+                raise CorruptSnapshot(f"Unsupported snapshot file: {self.snapshot_path}")
+            # O snapshot é gravado inteiro e renomeado atomicamente: dispensa o crc por registro
+            end = _SNAPSHOT_HEADER.size
+            for kind, start, end in iter_records(buffer, _SNAPSHOT_HEADER.size, check_crc=False):
+                # Os saldos vêm gravados nos usuários; as transações só alimentam o histórico
+                self._restore(database, buffer, kind, start, apply_balance=False)
+            if end != len(buffer):
+                raise CorruptSnapshot(f"Truncated snapshot file: {self.snapshot_path}")
+        return last_user_id, last_transaction_id
+
+    def _replay_log(self, database, last_user_id: int, last_transaction_id: int) -> int:
+        if not os.path.exists(self.log_path) or os.path.getsize(self.log_path) == 0:
+            return 0
+        valid_end = 0
+        with open(self.log_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            for kind, start, end in iter_records(buffer, 0, check_crc=True):
+                (record_id,) = struct.unpack_from("<q", buffer, start)
+                last_id = last_user_id if kind in USER_RECORDS else last_transaction_id
+                if kind in OUTBOX_RECORDS or record_id > last_id:
+                    self._restore(database, buffer, kind, start, apply_balance=True)
+                    self.log_records += 1
+                valid_end = end
+        return valid_end
+
+    def _restore(self, database, buffer, kind: int, offset: int, apply_balance: bool) -> None:
+        if kind in USER_RECORDS:
+            if kind == USER_RECORD:
+                id, balance = _USER.unpack_from(buffer, offset)
+                offset += _USER.size
+            else:
+                id, balance = _LEGACY_USER.unpack_from(buffer, offset)
+                balance = round(balance * CENTS_PER_UNIT)
+                offset += _LEGACY_USER.size
+            name, offset = _decode_str(buffer, offset)
+            email, offset = _decode_str(buffer, offset)
+            password, offset = _decode_str(buffer, offset)
+            # No log o usuário é gravado na criação; o saldo vem das transações seguintes
+            database.restore_user(id, name, email, password, balance)
+        elif kind in (TRANSACTION_RECORD, LEGACY_TRANSACTION_RECORD):
+            if kind == TRANSACTION_RECORD:
+                id, user_id, amount, ts, type_code = _TRANSACTION.unpack_from(buffer, offset)
+                offset += _TRANSACTION.size
+            else:
+                id, user_id, amount, ts, type_code = _LEGACY_TRANSACTION.unpack_from(buffer, offset)
+                amount = round(amount * CENTS_PER_UNIT)
+                offset += _LEGACY_TRANSACTION.size
+            description, _ = _decode_str(buffer, offset)
+            database.restore_transaction(
+                id, amount, TRANSACTION_TYPES[type_code], description, user_id, ts, apply_balance
+            )
+        elif kind == OUTBOX_RECORD:
+            (settled_id,) = _OUTBOX.unpack_from(buffer, offset)
+            database.restore_outbox(settled_id)
+        elif kind == IMPORTED_RECORD:
+            database.restore_imported(*_IMPORTED.unpack_from(buffer, offset))
+        else:
+            raise CorruptSnapshot(f"Unknown record type {kind}")
+
+    def _fsync_dir(self) -> None:
+        if hasattr(os, "O_DIRECTORY"):
+            fd = os.open(self.data_dir, os.O_DIRECTORY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+def main():
+    from .models import Database
+
+    parser = argparse.ArgumentParser(description="Manutenção do armazenamento persistente da carteira")
+    parser.add_argument("data_dir")
+    parser.add_argument("command", choices=["verify", "rebuild", "compact"])
+    args = parser.parse_args()
+
+    database = Database()
+    started = datetime.now()
+    database.enable_persistence(args.data_dir)
+    print(f"loaded {len(database.users)} users and {len(database.transactions)} transactions "
+          f"in {(datetime.now() - started).total_seconds():.2f}s")
+
+    if args.command == "verify":
+        mismatches = database.verify_balances()
+        for account_id, stored, expected in mismatches:
+            print(f"account {account_id}: stored {stored} != ledger {expected}")
+        print(f"{len(mismatches)} mismatches")
+        database.close()
+        raise SystemExit(1 if mismatches else 0)
+
+    if args.command == "rebuild":
+        print(f"{database.rebuild_balances()} balances rebuilt")
+    database.compact()
+    database.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+from bisect import bisect_left, bisect_right
+from datetime import date, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from app.entities.transaction import Transaction
+
+# Posições nos buckets por usuário
+DEPOSITS, WITHDRAWALS, TRANSFERS_IN, TRANSFERS_OUT = range(4)
+GRANULARITIES: Dict[str, Callable[[date], date]] = {
+    "day": lambda day: day,
+    "week": lambda day: day - timedelta(days=day.weekday()),
+    "month": lambda day: day.replace(day=1),
+}
+
+class DailyBuckets:
+    # Dia (ordinal) -> vetor de totais em centavos, com os dias mantidos em ordem
+    def __init__(self, width: int):
+        self.width = width
+        self.days: List[int] = []
+        self.totals: Dict[int, List[int]] = {}
+
+    def bucket(self, day: int) -> List[int]:
+        totals = self.totals.get(day)
+        if totals is None:
+            totals = self.totals[day] = [0] * self.width
+            if not self.days or self.days[-1] < day:
+                self.days.append(day)
+            else:
+                self.days.insert(bisect_left(self.days, day), day)
+        return totals
+
+    def between(self, start: Optional[date], end: Optional[date]) -> List[int]:
+        low = bisect_left(self.days, start.toordinal()) if start else 0
+        high = bisect_right(self.days, end.toordinal()) if end else len(self.days)
+        return self.days[low:high]
+
+# Totais mantidos a cada transação: consultas custam O(buckets), não O(transações)
+class TransactionAggregates:
+    def __init__(self):
+        self.users: Dict[int, DailyBuckets] = {}
+        # volume e quantidade de transações do sistema por dia
+        self.system = DailyBuckets(2)
+
+    def add(self, transaction: Transaction) -> None:
+        if transaction.transaction_type == "deposit":
+            entries = ((transaction.receiver_id, DEPOSITS),)
+        elif transaction.transaction_type == "withdrawal":
+            entries = ((transaction.sender_id, WITHDRAWALS),)
+        else:
+            entries = ((transaction.sender_id, TRANSFERS_OUT), (transaction.receiver_id, TRANSFERS_IN))
+        self.record(transaction.created_ts, transaction.amount, entries)
+
+    def record(self, ts: float, amount: int, entries: Iterable[Tuple[int, int]]) -> None:
+        # entries: (usuário, posição no bucket) de cada lado da transação
+        day = date.fromtimestamp(ts).toordinal()
+        for user_id, position in entries:
+            self._user(user_id).bucket(day)[position] += amount
+        totals = self.system.bucket(day)
+        totals[0] += amount
+        totals[1] += 1
+
+    def summary(
+        self,
+        user_id: int,
+        granularity: str = "day",
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None
+    ) -> List[dict]:
+        period_of = GRANULARITIES[granularity]
+        buckets = self.users.get(user_id)
+        if buckets is None:
+            return []
+        periods: Dict[date, List[int]] = {}
+        for day in buckets.between(start_date, end_date):
+            period = period_of(date.fromordinal(day))
+            totals = periods.get(period)
+            if totals is None:
+                totals = periods[period] = [0] * 4
+            for index, value in enumerate(buckets.totals[day]):
+                totals[index] += value
+        return [
+            {
+                "period": period,
+                "deposits": totals[DEPOSITS],
+                "withdrawals": totals[WITHDRAWALS],
+                "transfers_in": totals[TRANSFERS_IN],
+                "transfers_out": totals[TRANSFERS_OUT],
+                "net": totals[DEPOSITS] - totals[WITHDRAWALS] + totals[TRANSFERS_IN] - totals[TRANSFERS_OUT],
+            }
+            for period, totals in periods.items()
+        ]
+
+    def daily_report(self, start_date: Optional[date] = None, end_date: Optional[date] = None) -> List[dict]:
+        return [
+            {
+                "date": date.fromordinal(day),
+                "volume": self.system.totals[day][0],
+                "count": self.system.totals[day][1],
+            }
+            for day in self.system.between(start_date, end_date)
+        ]
+
+    def _user(self, user_id: int) -> DailyBuckets:
+        buckets = self.users.get(user_id)
+        if buckets is None:
+            buckets = self.users[user_id] = DailyBuckets(4)
+        return buckets
@@ -1,36 +1,100 @@
 from app.entities.transaction import Transaction
-from typing import List
+from app.infrastructure.money import to_cents
+from app.models.ledger import Ledger
+from app.repositories.aggregates import TransactionAggregates
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterator, List, Optional, Tuple
 from datetime import datetime
 from sqlalchemy.orm import Session
 from app.schemas.transaction_schema import TransactionCreate
 
+class UserLedger:
+    # Transações de um usuário ordenadas por (created_ts, id)
+    def __init__(self):
+        self.keys: List[Tuple[float, int]] = []
+        self.transactions: List[Transaction] = []
+
+    def add(self, transaction: Transaction) -> None:
+        key = (transaction.created_ts, transaction.id)
+        if not self.keys or self.keys[-1] <= key:
+            self.keys.append(key)
+            self.transactions.append(transaction)
+        else:
+            index = bisect_right(self.keys, key)
+            self.keys.insert(index, key)
+            self.transactions.insert(index, transaction)
+
+    def range(self, start_date: datetime = None, end_date: datetime = None) -> List[Transaction]:
+        start = bisect_left(self.keys, (start_date.timestamp(),)) if start_date else 0
+        end = bisect_right(self.keys, (end_date.timestamp(), float("inf"))) if end_date else len(self.keys)
+        return self.transactions[start:end]
+
+    def iter_range(
+        self,
+        start_date: datetime = None,
+        end_date: datetime = None,
+        after: Optional[Tuple[float, int]] = None
+    ) -> Iterator[Transaction]:
+        start = bisect_left(self.keys, (start_date.timestamp(),)) if start_date else 0
+        if after is not None:
+            start = max(start, bisect_right(self.keys, after))
+        end_key = (end_date.timestamp(), float("inf")) if end_date else None
+        while start < len(self.keys):
+            if end_key is not None and self.keys[start] > end_key:
+                break
+            yield self.transactions[start]
+            start += 1
+
 class TransactionRepository:
     def __init__(self):
         self.transactions = {}
         self.current_id = 1
+        self.ledgers: Dict[int, UserLedger] = {}
+        # Lançamentos com sinal por conta, para auditar os saldos dos usuários
+        self.ledger = Ledger()
+        self.aggregates = TransactionAggregates()
 
     def create(self, transaction: Transaction) -> Transaction:
         transaction.id = self.current_id
         self.transactions[self.current_id] = transaction
         self.current_id += 1
+        self._ledger(transaction.sender_id).add(transaction)
+        if transaction.receiver_id != transaction.sender_id:
+            self._ledger(transaction.receiver_id).add(transaction)
+
+        if transaction.transaction_type != "deposit":
+            self.ledger.append(transaction.sender_id, -transaction.amount, transaction.id)
+        self.ledger.append(transaction.receiver_id, transaction.amount, transaction.id)
+        self.aggregates.add(transaction)
         return transaction
 
     def get_by_user_id(self, user_id: int, start_date: datetime = None, end_date: datetime = None) -> List[Transaction]:
-        transactions = [
-            t for t in self.transactions.values()
-            if t.sender_id == user_id or t.receiver_id == user_id
-        ]
-        
-        if start_date:
-            transactions = [t for t in transactions if t.created_at >= start_date]
-        if end_date:
-            transactions = [t for t in transactions if t.created_at <= end_date]
-            
-        return transactions
+        ledger = self.ledgers.get(user_id)
+        if ledger is None:
+            return []
+        return ledger.range(start_date, end_date)
+
+    def iter_by_user_id(
+        self,
+        user_id: int,
+        start_date: datetime = None,
+        end_date: datetime = None,
+        after: Optional[Tuple[float, int]] = None
+    ) -> Iterator[Transaction]:
+        ledger = self.ledgers.get(user_id)
+        if ledger is None:
+            return iter(())
+        return ledger.iter_range(start_date, end_date, after)
+
+    def _ledger(self, user_id: int) -> UserLedger:
+        ledger = self.ledgers.get(user_id)
+        if ledger is None:
+            ledger = self.ledgers[user_id] = UserLedger()
+        return ledger
 
     def create_transaction(self, db: Session, transaction: TransactionCreate, user_id: int) -> Transaction:
         db_transaction = Transaction(
-            amount=transaction.amount,
+            amount=to_cents(transaction.amount),
             type=transaction.type,
             description=transaction.description,
             user_id=user_id
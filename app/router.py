@@ -1,73 +1,378 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Header, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from fastapi.security import OAuth2PasswordBearer
-from .schemas.schemas import UserCreate, UserResponse, TransactionCreate, TransactionResponse, LoginData
-from .models.models import db
-from typing import List
+from .schemas.schemas import UserCreate, UserResponse, TransactionCreate, TransactionResponse, LoginData, PeriodSummary, DailyVolume
+from .models import bulk
+from .models.models import Database, db as local_db
+from .models.outbox import OutboxFull
+from .infrastructure.config import common_settings
+from .infrastructure.bulk_io import DATASETS, MEDIA_TYPES, BulkFormatError, resolve_format, spool
+from .infrastructure.idempotency import MAX_KEY_LENGTH, IdempotencyConflict, idempotency_store
+from .infrastructure.metrics import registry, stage
+from .infrastructure.locks import account_locks
+from .infrastructure.money import from_cents
+from .infrastructure.serialization import FastJSONResponse, dumps
+from .infrastructure.rate_limit import LoginLimits, rate_limit_storage
+from .infrastructure.pubsub import Hub, HubFull
+from .infrastructure.pagination import MAX_PAGE_SIZE, NEXT_CURSOR_HEADER, STREAM_CHUNK_SIZE, encode_cursor, decode_cursor
+from .infrastructure.sharding.client import ShardedDatabase
+from .infrastructure.sharding.engine import AccountExists, InsufficientFunds
+from datetime import date
+from itertools import islice
+from typing import List, Optional
+import hmac
+import os
 
 router = APIRouter()
+
+# Com WALLET_SHARDS definido os dados ficam nos processos de shard e este worker só roteia
+db = ShardedDatabase.from_env() or local_db
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+# Rotas de administração (importação/exportação em massa, relatórios) só existem com
+# BULK_ADMIN_TOKEN definido, o mesmo token da rota /bulk da API SQL
+ADMIN_TOKEN = common_settings.BULK_ADMIN_TOKEN
+# Tentativas de login por IP e por email (janela deslizante), com os mesmos LOGIN_LIMIT_* e
+# RATE_LIMIT_DB da API SQL; com RATE_LIMIT_DB os contadores ficam num SQLite compartilhado
+# pelos workers da máquina
+login_limits = LoginLimits(
+    rate_limit_storage(common_settings.RATE_LIMIT_DB),
+    per_ip=common_settings.LOGIN_LIMIT_PER_IP,
+    per_email=common_settings.LOGIN_LIMIT_PER_EMAIL,
+    window_seconds=common_settings.LOGIN_LIMIT_WINDOW_SECONDS
+)
+# Eventos ao vivo da conta (GET /api/stream). O hub é do processo: com vários workers cada
+# cliente só recebe o que passou pelo worker em que está conectado
+event_hub = Hub(
+    queue_size=int(os.environ.get("WALLET_STREAM_QUEUE_SIZE", "64")),
+    max_subscribers=int(os.environ.get("WALLET_STREAM_MAX_SUBSCRIBERS", "0"))
+)
+STREAM_HEARTBEAT_SECONDS = float(os.environ.get("WALLET_STREAM_HEARTBEAT_SECONDS", "15"))
+# Mensagens do hub: (id da transação ou None, quadro SSE pronto)
+STREAM_HEARTBEAT = (None, b": ping\n\n")
+STREAM_RETRY_MS = 3000
+
+# Único cache do caminho ao vivo: respostas guardadas por Idempotency-Key. Saldos e
+# usuários já são lidos da memória (ou do shard, a fonte de verdade) sem cache na frente
+registry.register_cache("idempotency", idempotency_store)
 
 def get_current_user(token: str = Depends(oauth2_scheme)):
-    user = db.get_user_by_email(token)
+    with stage("user_lookup"):
+        user = db.get_user_by_email(token)
     if not user:
         raise HTTPException(status_code=401, detail="Invalid token")
     return user
 
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+def get_bulk_format(dataset: str, format: Optional[str] = None, content_type: Optional[str] = None) -> str:
+    if dataset not in DATASETS:
+        raise HTTPException(status_code=404, detail="Unknown dataset")
+    if not isinstance(db, Database):
+        # Com shards os dados não estão neste processo
+        raise HTTPException(status_code=501, detail="Bulk import/export is not available with WALLET_SHARDS")
+    try:
+        return resolve_format(format, content_type=content_type)
+    except BulkFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def get_aggregates():
+    if not isinstance(db, Database):
+        # Os totais ficam em cada shard e não são somados aqui
+        raise HTTPException(status_code=501, detail="Summaries are not available with WALLET_SHARDS")
+    return db.aggregates
+
+def to_transaction_response(t) -> TransactionResponse:
+    return TransactionResponse(
+        id=t.id,
+        amount=t.amount,
+        type=t.type,
+        description=t.description,
+        user_id=t.user_id,
+        timestamp=t.timestamp
+    )
+
+def to_transaction_row(t) -> dict:
+    # Mesmo formato de TransactionResponse, montado direto do registro
+    return {
+        "id": t.id,
+        "amount": from_cents(t.amount),
+        "type": t.type,
+        "description": t.description,
+        "user_id": t.user_id,
+        "timestamp": t.timestamp,
+    }
+
+def sse(event: str, data, id: Optional[int] = None) -> bytes:
+    head = f"id: {id}\nevent: {event}\n" if id is not None else f"event: {event}\n"
+    return head.encode() + b"data: " + dumps(data) + b"\n\n"
+
+def transaction_event(t) -> tuple:
+    return t.id, sse("transaction", to_transaction_row(t), t.id)
+
+def balance_event(balance: int) -> tuple:
+    # Sem id: o Last-Event-ID do cliente continua apontando para a última transação
+    return None, sse("balance", {"balance": from_cents(balance)})
+
+def publish_activity(user, transaction) -> None:
+    # Só monta os eventos se a conta tem alguém ouvindo neste processo
+    if not event_hub.has_subscribers(user.id):
+        return
+    # Com shards current_user é uma cópia: o saldo novo vem do shard
+    event_hub.publish(user.id, transaction_event(transaction), balance_event(db.get_balance(user.id)))
+
+def get_last_event_id(last_event_id: Optional[str] = Header(None, alias="Last-Event-ID")) -> Optional[int]:
+    if last_event_id is None or last_event_id == "":
+        return None
+    try:
+        return int(last_event_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid Last-Event-ID")
+
+def get_after_id(cursor: Optional[str] = None) -> Optional[int]:
+    if cursor is None:
+        return None
+    try:
+        (after_id,) = decode_cursor(cursor)
+        return int(after_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
 @router.post("/users/", response_model=UserResponse)
 def create_user(user_data: UserCreate):
     if db.get_user_by_email(user_data.email):
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    user = db.create_user(user_data.name, user_data.email, user_data.password)
+    try:
+        user = db.create_user(user_data.name, user_data.email, user_data.password)
+    except AccountExists:
+        raise HTTPException(status_code=400, detail="Email already registered")
     return UserResponse(id=user.id, name=user.name, email=user.email, balance=user.balance)
 
 @router.post("/token")
-def login(login_data: LoginData):
-    user = db.get_user_by_email(login_data.email)
-    if not user or user.password != login_data.password:
+def login(login_data: LoginData, request: Request):
+    with stage("login_limit"):
+        login_limits.check(request.client.host if request.client else None, login_data.email)
+    with stage("token_auth"):
+        user = db.get_user_by_email(login_data.email)
+        valid = user is not None and user.password == login_data.password
+    if not valid:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     return {"access_token": user.email, "token_type": "bearer"}
 
 @router.post("/transactions/", response_model=TransactionResponse)
-def create_transaction(transaction: TransactionCreate, current_user = Depends(get_current_user)):
-    if transaction.type == "withdrawal" and current_user.balance < transaction.amount:
-        raise HTTPException(status_code=400, detail="Insufficient funds")
-    
-    new_transaction = db.create_transaction(
-        transaction.amount,
-        transaction.type,
-        transaction.description,
-        current_user.id
-    )
-    
-    if transaction.type == "deposit":
-        current_user.balance += transaction.amount
-    else:
-        current_user.balance -= transaction.amount
-        
-    return TransactionResponse(
-        id=new_transaction.id,
-        amount=new_transaction.amount,
-        type=new_transaction.type,
-        description=new_transaction.description,
-        user_id=new_transaction.user_id,
-        timestamp=new_transaction.timestamp
-    )
+def create_transaction(
+    transaction: TransactionCreate,
+    current_user = Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
+):
+    def apply() -> TransactionResponse:
+        with account_locks.lock(current_user.id):
+            if transaction.type == "withdrawal" and current_user.balance < transaction.amount:
+                raise HTTPException(status_code=400, detail="Insufficient funds")
+            
+            # create_transaction também atualiza o saldo e o livro-razão
+            try:
+                new_transaction = db.create_transaction(
+                    transaction.amount,
+                    transaction.type,
+                    transaction.description,
+                    current_user.id
+                )
+            except InsufficientFunds:
+                # Com shards o saldo é conferido de novo no shard, junto com a escrita
+                raise HTTPException(status_code=400, detail="Insufficient funds")
+            except OutboxFull as e:
+                # Destinos dos eventos fora do ar ou conta parada atrás de um evento descartado
+                raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+            # Ainda com o lock da conta: os eventos saem na ordem das escritas
+            publish_activity(current_user, new_transaction)
+            
+        return to_transaction_response(new_transaction)
+
+    # Com Idempotency-Key, repetições devolvem o resultado guardado sem movimentar o saldo
+    if idempotency_key is None:
+        return apply()
+    if len(idempotency_key) > MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail="Idempotency-Key is too long")
+    try:
+        return idempotency_store.run(
+            (current_user.id, "transaction", idempotency_key),
+            transaction.model_dump_json(),
+            apply
+        )
+    except IdempotencyConflict as e:
+        raise HTTPException(status_code=422, detail=str(e))
 
 @router.get("/transactions/", response_model=List[TransactionResponse])
-def get_transactions(current_user = Depends(get_current_user)):
-    transactions = db.get_user_transactions(current_user.id)
+def get_transactions(
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after_id: Optional[int] = Depends(get_after_id),
+    current_user = Depends(get_current_user)
+):
+    headers = {}
+    with stage("transaction_lookup"):
+        if limit is None and after_id is None:
+            transactions = db.get_user_transactions(current_user.id)
+        else:
+            # Paginação por keyset: o cursor guarda o id da última transação entregue
+            rows = db.iter_user_transactions(current_user.id, after_id)
+            transactions = list(islice(rows, limit + 1 if limit else None))
+            if limit and len(transactions) > limit:
+                transactions = transactions[:limit]
+                headers[NEXT_CURSOR_HEADER] = encode_cursor([transactions[-1].id])
+    # Resposta já serializada: evita criar e revalidar um TransactionResponse por linha
+    return FastJSONResponse([to_transaction_row(t) for t in transactions], headers=headers)
+
+@router.get("/transactions/stream")
+def stream_transactions(
+    after_id: Optional[int] = Depends(get_after_id),
+    current_user = Depends(get_current_user)
+):
+    rows = db.iter_user_transactions(current_user.id, after_id)
+
+    def ndjson():
+        while True:
+            chunk = list(islice(rows, STREAM_CHUNK_SIZE))
+            if not chunk:
+                break
+            yield b"".join(dumps(to_transaction_row(t)) + b"\n" for t in chunk)
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+@router.get("/transactions/summary", response_model=List[PeriodSummary])
+def transactions_summary(
+    granularity: str = Query("day", pattern="^(day|week|month)$"),
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    current_user = Depends(get_current_user)
+):
+    return get_aggregates().summary(current_user.id, granularity, start_date, end_date)
+
+@router.get("/reports/daily", response_model=List[DailyVolume], dependencies=[Depends(require_admin)])
+def daily_report(start_date: Optional[date] = None, end_date: Optional[date] = None):
+    return get_aggregates().daily_report(start_date, end_date)
+
+def get_outbox():
+    outbox = db.outbox if isinstance(db, Database) else None
+    if outbox is None:
+        raise HTTPException(status_code=404, detail="Outbox is not enabled")
+    return outbox
+
+@router.get("/outbox/failed", dependencies=[Depends(require_admin)])
+def list_failed_events(outbox = Depends(get_outbox)):
+    # Contas paradas atrás de um evento que esgotou WALLET_OUTBOX_MAX_ATTEMPTS
     return [
-        TransactionResponse(
-            id=t.id,
-            amount=t.amount,
-            type=t.type,
-            description=t.description,
-            user_id=t.user_id,
-            timestamp=t.timestamp
-        ) for t in transactions
+        {
+            "account_id": event.account_id,
+            "event_id": event.id,
+            "transaction_id": event.transaction_id,
+            "attempts": event.attempts,
+            "last_error": event.last_error,
+        }
+        for event in outbox.failed()
     ]
 
+@router.post("/outbox/accounts/{account_id}/release", dependencies=[Depends(require_admin)])
+def release_outbox_account(account_id: int, discard: bool = False, outbox = Depends(get_outbox)):
+    # Reenvia o evento descartado da conta ou, com discard=true, desiste dele; os seguintes voltam a sair
+    if not outbox.release(account_id, discard):
+        raise HTTPException(status_code=404, detail="No failed event for this account")
+    return {"account_id": account_id, "discarded": discard}
+
+@router.get("/stream")
+async def stream_activity(
+    after_id: Optional[int] = Depends(get_last_event_id),
+    current_user = Depends(get_current_user)
+):
+    # Server-Sent Events com o saldo e as transações novas da conta. Reconectando com
+    # Last-Event-ID, as transações perdidas vêm do histórico antes das novas
+    if event_hub.full():
+        raise HTTPException(status_code=503, detail="Too many open streams", headers={"Retry-After": "5"})
+
+    async def events():
+        # Assinado só quando a resposta começa a ser enviada: se o cliente cair antes, o
+        # gerador nunca roda e não sobra assinatura no hub. Quem passar do limite entre a
+        # checagem acima e aqui recebe só o retry e reconecta
+        try:
+            subscription = event_hub.subscribe(current_user.id)
+        except HubFull:
+            yield f"retry: {STREAM_RETRY_MS}\n\n".encode()
+            return
+        try:
+            # Assinado antes de ler o estado: o que for gravado no meio chega pela fila
+            yield f"retry: {STREAM_RETRY_MS}\n\n".encode()
+            balance = await run_in_threadpool(db.get_balance, current_user.id)
+            yield balance_event(balance)[1]
+            last_id = after_id
+            if after_id is not None:
+                rows = db.iter_user_transactions(current_user.id, after_id)
+                while True:
+                    chunk = await run_in_threadpool(lambda: list(islice(rows, STREAM_CHUNK_SIZE)))
+                    if not chunk:
+                        break
+                    last_id = chunk[-1].id
+                    yield b"".join(transaction_event(t)[1] for t in chunk)
+            while True:
+                message = await subscription.get()
+                if message is None:
+                    # Encerrada pelo servidor ou atrasada demais: o cliente reconecta
+                    break
+                id, frame = message
+                if id is not None and last_id is not None and id <= last_id:
+                    continue  # já enviada pelo histórico
+                yield frame
+        finally:
+            event_hub.unsubscribe(subscription)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("/balance/")
 def get_balance(current_user = Depends(get_current_user)):
-    return {"balance": current_user.balance} 
\ No newline at end of file
+    # Pelo livro-razão: com shards, current_user é uma cópia lida antes
+    with stage("balance_read"):
+        balance = db.get_balance(current_user.id)
+    return {"balance": from_cents(balance)}
+
+@router.post("/bulk/{dataset}/import", dependencies=[Depends(require_admin)])
+async def import_dataset(
+    dataset: str,
+    request: Request,
+    format: Optional[str] = Query(None),
+    with_balances: bool = Query(True)
+):
+    format = get_bulk_format(dataset, format, request.headers.get("content-type"))
+    body = await spool(request.stream())
+
+    def run() -> dict:
+        if dataset == "users":
+            return bulk.import_users(db, body, format, common_settings.BULK_CHUNK_SIZE, with_balances)
+        return bulk.import_transactions(db, body, format, common_settings.BULK_CHUNK_SIZE)
+
+    try:
+        return await run_in_threadpool(run)
+    except BulkFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        body.close()
+
+@router.get("/bulk/{dataset}/export", dependencies=[Depends(require_admin)])
+def export_dataset(
+    dataset: str,
+    format: str = Query("ndjson"),
+    user_id: Optional[int] = Query(None)
+):
+    format = get_bulk_format(dataset, format)
+    return StreamingResponse(
+        bulk.export(db, dataset, format, user_id),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{dataset}.{format}"'}
+    )
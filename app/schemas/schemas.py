@@ -1,6 +1,13 @@
-from pydantic import BaseModel, validator
-from typing import Optional
-from datetime import datetime
+from pydantic import BaseModel, BeforeValidator, PlainSerializer, WithJsonSchema, validator
+from typing import Annotated, List, Optional
+from datetime import date, datetime
+from app.infrastructure.money import from_cents, to_cents
+
+# Dentro da aplicação valores monetários são centavos (int); na API, números decimais.
+# Money converte o decimal recebido; Cents é para respostas montadas a partir de centavos
+_decimal_json = PlainSerializer(from_cents, return_type=float, when_used="json")
+Money = Annotated[int, BeforeValidator(to_cents), _decimal_json, WithJsonSchema({"type": "number"})]
+Cents = Annotated[int, _decimal_json, WithJsonSchema({"type": "number"})]
 
 class UserCreate(BaseModel):
     name: str
@@ -11,10 +18,10 @@ class UserResponse(BaseModel):
     id: int
     name: str
     email: str
-    balance: float
+    balance: Cents
 
 class TransactionCreate(BaseModel):
-    amount: float
+    amount: Money
     type: str
     description: Optional[str] = None
 
@@ -26,7 +33,7 @@ class TransactionCreate(BaseModel):
 
 class TransactionResponse(BaseModel):
     id: int
-    amount: float
+    amount: Cents
     type: str
     description: Optional[str]
     user_id: int
@@ -34,4 +41,91 @@ class TransactionResponse(BaseModel):
 
 class LoginData(BaseModel):
     email: str
-    password: str 
\ No newline at end of file
+    password: str 
+
+class BatchOperation(BaseModel):
+    type: str
+    amount: Money
+    receiver_id: Optional[int] = None
+    description: Optional[str] = None
+
+    @validator('type')
+    def validate_type(cls, v):
+        if v not in ['deposit', 'transfer']:
+            raise ValueError('Operation type must be deposit or transfer')
+        return v
+
+    @validator('amount')
+    def validate_amount(cls, v):
+        if v <= 0:
+            raise ValueError('Amount must be positive')
+        return v
+
+class BatchRequest(BaseModel):
+    operations: List[BatchOperation]
+    atomic: bool = False
+
+class BatchOperationResult(BaseModel):
+    index: int
+    status: str
+    transaction_id: Optional[int] = None
+    detail: Optional[str] = None
+
+class BatchResponse(BaseModel):
+    applied: int
+    failed: int
+    results: List[BatchOperationResult]
+
+class PeriodSummary(BaseModel):
+    period: date
+    deposits: Cents
+    withdrawals: Cents
+    transfers_in: Cents
+    transfers_out: Cents
+    net: Cents
+
+class DailyVolume(BaseModel):
+    date: date
+    volume: Cents
+    count: int
+
+class BulkUserRow(BaseModel):
+    id: Optional[int] = None
+    name: Optional[str] = None
+    email: str
+    # Banco em memória guarda a senha; o banco SQL, só o hash
+    password: Optional[str] = None
+    hashed_password: Optional[str] = None
+    balance: Money = 0
+
+    @validator('balance')
+    def validate_balance(cls, v):
+        if v < 0:
+            raise ValueError('Balance cannot be negative')
+        return v
+
+class BulkTransactionRow(BaseModel):
+    user_id: int
+    amount: Money
+    type: str
+    description: Optional[str] = None
+    receiver_id: Optional[int] = None
+    timestamp: Optional[datetime] = None
+
+    @validator('type')
+    def validate_type(cls, v):
+        if v not in ['deposit', 'withdrawal', 'transfer']:
+            raise ValueError('Transaction type must be deposit, withdrawal or transfer')
+        return v
+
+    @validator('amount')
+    def validate_amount(cls, v):
+        if v <= 0:
+            raise ValueError('Amount must be positive')
+        return v
+
+    @validator('receiver_id', always=True)
+    def validate_receiver(cls, v, values):
+        if values.get('type') == 'transfer' and v is None:
+            raise ValueError('receiver_id is required for transfers')
+        return v
@@ -0,0 +1,38 @@
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel, ConfigDict, validator
+
+# Schemas da API SQL (app/api): valores decimais na entrada, convertidos para
+# centavos pelas rotas com to_cents; a API em memória usa app/schemas/schemas.py
+
+class TransactionCreate(BaseModel):
+    amount: float
+    type: str
+    description: Optional[str] = None
+
+    @validator('type')
+    def validate_type(cls, v):
+        if v not in ['deposit', 'withdrawal']:
+            raise ValueError('Transaction type must be deposit or withdrawal')
+        return v
+
+class TransferCreate(BaseModel):
+    amount: float
+    receiver_id: int
+    description: Optional[str] = None
+
+class DepositCreate(BaseModel):
+    amount: float
+
+class TransactionResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    amount: float
+    type: str
+    description: Optional[str] = None
+    user_id: Optional[int] = None
+    sender_id: Optional[int] = None
+    receiver_id: Optional[int] = None
+    timestamp: Optional[datetime] = None
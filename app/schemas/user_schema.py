@@ -0,0 +1,24 @@
+from typing import Optional
+
+from pydantic import BaseModel, ConfigDict
+
+from app.schemas.schemas import Cents
+
+class UserCreate(BaseModel):
+    email: str
+    password: str
+    full_name: Optional[str] = None
+
+class UserResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    email: str
+    full_name: Optional[str] = None
+    balance: Cents
+
+class Token(BaseModel):
+    access_token: str
+    token_type: str = "bearer"
+
+TokenResponse = Token
@@ -1,15 +1,59 @@
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import jwt
-from passlib.context import CryptContext
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from fastapi import HTTPException
 
 from app.infrastructure.config import settings
+from app.infrastructure.password_hasher import PasswordHasherBusy, password_hasher
 from app.schemas.user_schema import UserCreate
 from app.domain.entities.user import User
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+def create_access_token(data: dict) -> str:
+    to_encode = data.copy()
+    expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    to_encode.update({"exp": expire})
+    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+    return encoded_jwt
+
+async def hash_password(password: str) -> str:
+    try:
+        return await password_hasher.hash(password)
+    except PasswordHasherBusy:
+        raise _busy_exception()
+
+async def verify_password(password: str, hashed_password: str) -> bool:
+    try:
+        return await password_hasher.verify(password, hashed_password)
+    except PasswordHasherBusy:
+        raise _busy_exception()
+
+def hash_password_blocking(password: str) -> str:
+    try:
+        return password_hasher.hash_blocking(password)
+    except PasswordHasherBusy:
+        raise _busy_exception()
+
+def verify_password_blocking(password: str, hashed_password: str) -> bool:
+    try:
+        return password_hasher.verify_blocking(password, hashed_password)
+    except PasswordHasherBusy:
+        raise _busy_exception()
+
+def _busy_exception() -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="Too many authentication requests, try again later",
+        headers={"Retry-After": "1"}
+    )
+
+def _invalid_credentials() -> HTTPException:
+    return HTTPException(
+        status_code=400,
+        detail="Incorrect email or password"
+    )
 
 class AuthUseCase:
     def __init__(self, db: Session):
@@ -18,12 +62,13 @@ class AuthUseCase:
     def get_user_by_email(self, email: str):
         return self.db.query(User).filter(User.email == email).first()
 
+    # Síncrono, para rotas def (threadpool) sobre Session; a rota async usa AsyncAuthUseCase
     def register_user(self, user: UserCreate):
         db_user = User(
             email=user.email,
-            hashed_password=pwd_context.hash(user.password),
+            hashed_password=hash_password_blocking(user.password),
             full_name=user.full_name,
-            balance=0.0
+            balance=0
         )
         self.db.add(db_user)
         self.db.commit()
@@ -32,17 +77,37 @@ class AuthUseCase:
 
     def authenticate_user(self, email: str, password: str):
         user = self.get_user_by_email(email)
-        if not user or not pwd_context.verify(password, user.hashed_password):
-            raise HTTPException(
-                status_code=400,
-                detail="Incorrect email or password"
-            )
+        if not user or not verify_password_blocking(password, user.hashed_password):
+            raise _invalid_credentials()
         access_token = self.create_access_token(data={"sub": user.email})
         return {"access_token": access_token, "token_type": "bearer"}
 
     def create_access_token(self, data: dict):
-        to_encode = data.copy()
-        expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-        to_encode.update({"exp": expire})
-        encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
-        return encoded_jwt 
\ No newline at end of file
+        return create_access_token(data)
+
+class AsyncAuthUseCase:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_user_by_email(self, email: str) -> Optional[User]:
+        result = await self.db.execute(select(User).where(User.email == email))
+        return result.scalars().first()
+
+    async def register_user(self, user: UserCreate):
+        db_user = User(
+            email=user.email,
+            hashed_password=await hash_password(user.password),
+            full_name=user.full_name,
+            balance=0
+        )
+        self.db.add(db_user)
+        await self.db.commit()
+        await self.db.refresh(db_user)
+        return db_user
+
+    async def authenticate_user(self, email: str, password: str):
+        user = await self.get_user_by_email(email)
+        if not user or not await verify_password(password, user.hashed_password):
+            raise _invalid_credentials()
+        access_token = create_access_token(data={"sub": user.email})
+        return {"access_token": access_token, "token_type": "bearer"}
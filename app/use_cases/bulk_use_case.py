@@ -0,0 +1,211 @@
+"""Importação e exportação em massa no banco SQL (CSV, NDJSON, Parquet, Arrow).
+
+    python -m app.use_cases.bulk_use_case import users users.csv
+    python -m app.use_cases.bulk_use_case import transactions historico.parquet
+    python -m app.use_cases.bulk_use_case export transactions historico.ndjson
+"""
+import argparse
+import json
+import sys
+from datetime import datetime, timezone
+from itertools import groupby
+from typing import IO, Dict, Iterator, List, Optional, Set
+
+from sqlalchemy import bindparam, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.domain.entities.transaction import Transaction
+from app.domain.entities.user import User
+from app.infrastructure.bulk_io import (
+    DEFAULT_CHUNK_SIZE,
+    TRANSACTION_FIELDS,
+    USER_FIELDS,
+    ImportReport,
+    resolve_format,
+    validated_chunks,
+    write_chunks,
+)
+from app.infrastructure.cache import BULK_UPDATE_KEY
+from app.infrastructure.money import from_cents
+from app.schemas.schemas import BulkTransactionRow, BulkUserRow
+
+# O banco SQL guarda o destinatário das transferências; o export o inclui para reimportar
+SQL_TRANSACTION_FIELDS = TRANSACTION_FIELDS + (("receiver_id", "int"),)
+
+users_table = User.__table__
+# Soma a variação de cada conta no saldo atual (executemany, uma linha por conta)
+_APPLY_DELTA = (
+    update(users_table)
+    .where(users_table.c.id == bindparam("account_id"))
+    .values(balance=users_table.c.balance + bindparam("delta"))
+)
+
+class BulkUseCase:
+    def __init__(self, db: Session, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self.db = db
+        self.chunk_size = chunk_size
+
+    def import_users(self, source: IO[bytes], format: str, with_balances: bool = True) -> dict:
+        # Tudo numa transação: um erro no arquivo desfaz a importação inteira
+        report = ImportReport("users")
+        seen_emails: Set[str] = set()
+        for valid in validated_chunks(BulkUserRow, source, format, report, self.chunk_size):
+            emails = {user.email for _, user in valid}
+            existing_emails = set(self.db.scalars(select(User.email).where(User.email.in_(emails))))
+            ids = {user.id for _, user in valid if user.id is not None}
+            existing_ids = set(self.db.scalars(select(User.id).where(User.id.in_(ids)))) if ids else set()
+
+            rows = []
+            for number, user in valid:
+                if user.email in existing_emails or user.email in seen_emails:
+                    report.reject(number, "Email already registered")
+                    continue
+                if user.id is not None and user.id in existing_ids:
+                    report.reject(number, f"Id {user.id} is already in use")
+                    continue
+                seen_emails.add(user.email)
+                row = {
+                    "email": user.email,
+                    "hashed_password": user.hashed_password,
+                    "full_name": user.name,
+                    "balance": user.balance if with_balances else 0,
+                }
+                if user.id is not None:
+                    row["id"] = user.id
+                    existing_ids.add(user.id)
+                rows.append(row)
+            # executemany exige as mesmas chaves em todas as linhas; a ordem do arquivo
+            # é mantida para os ids gerados seguirem a ordem das linhas
+            for _, run in groupby(rows, key=lambda row: "id" in row):
+                self.db.execute(insert(User), list(run))
+            report.imported += len(rows)
+        self.db.commit()
+        return report.as_dict()
+
+    def import_transactions(self, source: IO[bytes], format: str) -> dict:
+        # Linhas inseridas em blocos com executemany; os saldos recebem a soma das
+        # variações de cada conta num único UPDATE em lote no fim, na mesma transação
+        report = ImportReport("transactions")
+        known_accounts: Set[int] = set()
+        deltas: Dict[int, int] = {}
+        for valid in validated_chunks(BulkTransactionRow, source, format, report, self.chunk_size):
+            referenced = {row.user_id for _, row in valid} | {row.receiver_id for _, row in valid if row.receiver_id}
+            missing = referenced - known_accounts
+            if missing:
+                known_accounts.update(self.db.scalars(select(User.id).where(User.id.in_(missing))))
+
+            now = datetime.now(timezone.utc)
+            rows = []
+            for number, row in valid:
+                error = self._validate_transaction(row, known_accounts)
+                if error:
+                    report.reject(number, error)
+                    continue
+                rows.append({
+                    "amount": row.amount,
+                    "type": row.type,
+                    "description": row.description,
+                    "user_id": row.user_id,
+                    "sender_id": row.user_id if row.type == "transfer" else None,
+                    "receiver_id": row.receiver_id if row.type == "transfer" else None,
+                    "timestamp": row.timestamp or now,
+                })
+                signed_amount = row.amount if row.type == "deposit" else -row.amount
+                deltas[row.user_id] = deltas.get(row.user_id, 0) + signed_amount
+                if row.type == "transfer":
+                    deltas[row.receiver_id] = deltas.get(row.receiver_id, 0) + row.amount
+            if rows:
+                self.db.execute(insert(Transaction), rows)
+            report.imported += len(rows)
+
+        if deltas:
+            self.db.execute(_APPLY_DELTA, [{"account_id": id, "delta": delta} for id, delta in deltas.items()])
+            # O UPDATE em lote não passa pelos eventos do mapper: os caches de usuário e
+            # de saldo são limpos inteiros no commit
+            self.db.info[BULK_UPDATE_KEY] = True
+        self.db.commit()
+        report.accounts_updated = len(deltas)
+        return report.as_dict()
+
+    def _validate_transaction(self, row: BulkTransactionRow, known_accounts: Set[int]) -> Optional[str]:
+        if row.user_id not in known_accounts:
+            return "User not found"
+        if row.type == "transfer":
+            if row.receiver_id not in known_accounts:
+                return "Receiver not found"
+            if row.receiver_id == row.user_id:
+                return "Cannot transfer to the same account"
+        return None
+
+    def export_users(self) -> Iterator[List[dict]]:
+        columns = (User.id, User.full_name.label("name"), User.email, User.balance)
+        return self._keyset_chunks(select(*columns), User.id, "balance")
+
+    def export_transactions(self, user_id: Optional[int] = None) -> Iterator[List[dict]]:
+        query = select(
+            Transaction.id,
+            Transaction.amount,
+            Transaction.type,
+            Transaction.description,
+            Transaction.user_id,
+            Transaction.timestamp,
+            Transaction.receiver_id,
+        )
+        if user_id is not None:
+            query = query.where(Transaction.user_id == user_id)
+        return self._keyset_chunks(query, Transaction.id, "amount")
+
+    def export(self, dataset: str, format: str, user_id: Optional[int] = None) -> Iterator[bytes]:
+        if dataset == "users":
+            return write_chunks(self.export_users(), format, USER_FIELDS)
+        return write_chunks(self.export_transactions(user_id), format, SQL_TRANSACTION_FIELDS)
+
+    def _keyset_chunks(self, query, id_column, money_column: str) -> Iterator[List[dict]]:
+        # Páginas por id em vez de OFFSET: cada bloco custa o mesmo do início ao fim da tabela
+        last_id = 0
+        while True:
+            chunk = [
+                dict(row) for row in
+                self.db.execute(query.where(id_column > last_id).order_by(id_column).limit(self.chunk_size)).mappings()
+            ]
+            if not chunk:
+                return
+            # Centavos no banco, valor decimal no arquivo (o mesmo que a importação lê)
+            for row in chunk:
+                row[money_column] = from_cents(row[money_column])
+            yield chunk
+            last_id = chunk[-1]["id"]
+
+def main():
+    from app.infrastructure.database.connection import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Importação e exportação em massa no banco SQL")
+    parser.add_argument("command", choices=["import", "export"])
+    parser.add_argument("dataset", choices=["users", "transactions"])
+    parser.add_argument("file", help="arquivo de entrada/saída ('-' para stdin/stdout)")
+    parser.add_argument("--format", help="csv, ndjson, parquet ou arrow (padrão: pela extensão)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--no-balances", action="store_true", help="ignora a coluna balance dos usuários")
+    parser.add_argument("--user-id", type=int, help="exporta só as transações desta conta")
+    args = parser.parse_args()
+
+    format = resolve_format(args.format, args.file if args.file != "-" else None)
+    with SessionLocal() as db:
+        bulk = BulkUseCase(db, args.chunk_size)
+        if args.command == "export":
+            output = sys.stdout.buffer if args.file == "-" else open(args.file, "wb")
+            with output:
+                for data in bulk.export(args.dataset, format, args.user_id):
+                    output.write(data)
+            return
+
+        source = sys.stdin.buffer if args.file == "-" else open(args.file, "rb")
+        with source:
+            if args.dataset == "users":
+                report = bulk.import_users(source, format, not args.no_balances)
+            else:
+                report = bulk.import_transactions(source, format)
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -1,67 +1,122 @@
 from app.repositories.user_repository import UserRepository
 from app.repositories.transaction_repository import TransactionRepository
 from app.entities.transaction import Transaction
-from datetime import datetime
-from typing import List
-from sqlalchemy.orm import Session
+from app.domain.entities.transaction import Transaction as TransactionModel
+from app.domain.entities.user import User
+from app.infrastructure.balance_cache import PENDING_BALANCES_KEY, BalanceCache
+from app.infrastructure.cache import UPDATED_USERS_KEY
+from app.infrastructure.locks import account_locks
+from app.infrastructure.rate_limit import TransferVelocity
+from app.schemas.schemas import BatchOperation
+from datetime import date, datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+from sqlalchemy import and_, select, tuple_, union_all, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, aliased
 from fastapi import HTTPException
 
+def balance_query(user_id: int):
+    return select(User.balance).where(User.id == user_id)
+
+def history_query(
+    user_id: int,
+    start_date: datetime = None,
+    end_date: datetime = None,
+    after: Optional[Tuple[datetime, int]] = None,
+    limit: Optional[int] = None
+):
+    # Transações originadas pela conta ou recebidas por ela, em ordem de (timestamp, id).
+    # Um OR simples leva o SQLite a varrer a tabela; como UNION ALL cada lado lê no máximo
+    # uma página, já em ordem, do seu índice (conta, timestamp), e só as 2 * limit linhas
+    # resultantes são ordenadas
+    def branch(condition):
+        query = select(TransactionModel.__table__).where(condition)
+        if start_date is not None:
+            query = query.where(TransactionModel.timestamp >= start_date)
+        if end_date is not None:
+            query = query.where(TransactionModel.timestamp <= end_date)
+        if after is not None:
+            query = query.where(tuple_(TransactionModel.timestamp, TransactionModel.id) > after)
+        query = query.order_by(TransactionModel.timestamp, TransactionModel.id)
+        return select(query.limit(limit).subquery() if limit else query.subquery())
+
+    rows = union_all(
+        branch(TransactionModel.user_id == user_id),
+        branch(and_(TransactionModel.receiver_id == user_id, TransactionModel.user_id != user_id)),
+    ).subquery()
+    transaction = aliased(TransactionModel, rows)
+    query = select(transaction).order_by(transaction.timestamp, transaction.id)
+    return query.limit(limit) if limit else query
+
 class WalletUseCase:
     def __init__(
         self,
-        user_repository: UserRepository,
-        transaction_repository: TransactionRepository,
-        db: Session
+        user_repository: UserRepository = None,
+        transaction_repository: TransactionRepository = None,
+        db: Session = None,
+        balance_cache: Optional[BalanceCache] = None,
+        velocity: Optional[TransferVelocity] = None
     ):
         self.user_repository = user_repository
         self.transaction_repository = transaction_repository
         self.db = db
+        self.balance_cache = balance_cache
+        self.velocity = velocity
 
-    def get_balance(self, user_id: int) -> float:
+    def get_balance(self, user_id: int) -> int:
+        if self.balance_cache is not None:
+            return self.balance_cache.read_through(user_id, lambda: self._get_user_or_raise(user_id).balance)
         user = self._get_user_or_raise(user_id)
         return user.balance
 
-    def deposit(self, user_id: int, amount: float) -> Transaction:
+    def deposit(self, user_id: int, amount: int) -> Transaction:
         if amount <= 0:
             raise ValueError("Amount must be positive")
             
-        user = self._get_user_or_raise(user_id)
-        user.update_balance(amount)
-        self.user_repository.update(user)
-        
-        transaction = Transaction(
-            id=0,
-            amount=amount,
-            sender_id=user_id,
-            receiver_id=user_id,
-            transaction_type="deposit"
-        )
-        return self.transaction_repository.create(transaction)
+        with account_locks.lock(user_id):
+            user = self._get_user_or_raise(user_id)
+            user.update_balance(amount)
+            self.user_repository.update(user)
+            self._write_balances(user)
+            
+            transaction = Transaction(
+                id=0,
+                amount=amount,
+                sender_id=user_id,
+                receiver_id=user_id,
+                transaction_type="deposit"
+            )
+            return self.transaction_repository.create(transaction)
 
-    def transfer(self, sender_id: int, receiver_id: int, amount: float) -> Transaction:
+    def transfer(self, sender_id: int, receiver_id: int, amount: int) -> Transaction:
         if amount <= 0:
             raise ValueError("Amount must be positive")
+        # Antes do lock: excesso de tentativas não disputa as contas
+        if self.velocity is not None:
+            self.velocity.check(sender_id, amount)
             
-        sender = self._get_user_or_raise(sender_id)
-        receiver = self._get_user_or_raise(receiver_id)
-        
-        if sender.balance < amount:
-            raise ValueError("Insufficient funds")
+        with account_locks.lock(sender_id, receiver_id):
+            sender = self._get_user_or_raise(sender_id)
+            receiver = self._get_user_or_raise(receiver_id)
             
-        sender.update_balance(-amount)
-        receiver.update_balance(amount)
-        
-        self.user_repository.update(sender)
-        self.user_repository.update(receiver)
-        
-        transaction = Transaction(
-            id=0,
-            amount=amount,
-            sender_id=sender_id,
-            receiver_id=receiver_id,
-            transaction_type="transfer"
-        )
-        return self.transaction_repository.create(transaction)
+            if sender.balance < amount:
+                raise ValueError("Insufficient funds")
+                
+            sender.update_balance(-amount)
+            receiver.update_balance(amount)
+            
+            self.user_repository.update(sender)
+            self.user_repository.update(receiver)
+            self._write_balances(sender, receiver)
+            
+            transaction = Transaction(
+                id=0,
+                amount=amount,
+                sender_id=sender_id,
+                receiver_id=receiver_id,
+                transaction_type="transfer"
+            )
+            return self.transaction_repository.create(transaction)
 
     def list_transactions(
         self,
@@ -72,16 +127,66 @@ class WalletUseCase:
         self._get_user_or_raise(user_id)
         return self.transaction_repository.get_by_user_id(user_id, start_date, end_date)
 
+    def iter_transactions(
+        self,
+        user_id: int,
+        start_date: datetime = None,
+        end_date: datetime = None,
+        after: Optional[Tuple[float, int]] = None
+    ) -> Iterator[Transaction]:
+        self._get_user_or_raise(user_id)
+        return self.transaction_repository.iter_by_user_id(user_id, start_date, end_date, after)
+
+    def summarize(
+        self,
+        user_id: int,
+        granularity: str = "day",
+        start_date: date = None,
+        end_date: date = None
+    ) -> List[dict]:
+        self._get_user_or_raise(user_id)
+        return self.transaction_repository.aggregates.summary(user_id, granularity, start_date, end_date)
+
+    def daily_report(self, start_date: date = None, end_date: date = None) -> List[dict]:
+        return self.transaction_repository.aggregates.daily_report(start_date, end_date)
+
+    def verify_balances(self) -> List[Tuple[int, int, int]]:
+        balances = {user.id: user.balance for user in self.user_repository.users.values()}
+        return self.transaction_repository.ledger.verify(balances)
+
+    def _write_balances(self, *users) -> None:
+        # Chamado dentro do lock das contas: o cache recebe os saldos na ordem das escritas
+        if self.balance_cache is not None:
+            for user in users:
+                self.balance_cache.write(user.id, user.balance)
+
     def _get_user_or_raise(self, user_id: int):
         user = self.user_repository.get_by_id(user_id)
         if not user:
             raise ValueError("User not found")
         return user
 
-    def transfer_money(self, sender_id: int, receiver_id: int, amount: float):
-        sender = self.db.query(User).filter(User.id == sender_id).first()
-        receiver = self.db.query(User).filter(User.id == receiver_id).first()
+    def transfer_money(self, sender_id: int, receiver_id: int, amount: int):
+        if self.velocity is not None:
+            self.velocity.check(sender_id, amount)
+        with account_locks.lock(sender_id, receiver_id):
+            transaction = self.apply_transfer(sender_id, receiver_id, amount)
+            self.db.commit()
+        self.db.refresh(transaction)
+        
+        return transaction
+
+    def apply_transfer(self, sender_id: int, receiver_id: int, amount: int) -> TransactionModel:
+        # Não faz commit: quem chama decide (transfer_money, lote ou group commit)
+        if amount <= 0:
+            raise HTTPException(status_code=400, detail="Amount must be positive")
+
+        users = self._load_locked({sender_id, receiver_id})
+        sender = users.get(sender_id)
+        receiver = users.get(receiver_id)
 
+        if not sender:
+            raise HTTPException(status_code=404, detail="User not found")
         if not receiver:
             raise HTTPException(status_code=404, detail="Receiver not found")
 
@@ -91,14 +196,171 @@ class WalletUseCase:
         sender.balance -= amount
         receiver.balance += amount
 
-        transaction = Transaction(
+        transaction = TransactionModel(
             amount=amount,
+            type="transfer",
+            user_id=sender_id,
             sender_id=sender_id,
             receiver_id=receiver_id
         )
+        self.db.add(transaction)
+        return transaction
+
+    def apply_batch(self, user_id: int, operations: List[BatchOperation], atomic: bool = False) -> List[dict]:
+        account_ids = {user_id} | {op.receiver_id for op in operations if op.receiver_id is not None}
+        with account_locks.lock(*account_ids):
+            users = self._load_locked(account_ids)
+            results: List[dict] = []
+            applied: List[Tuple[dict, TransactionModel]] = []
+            for index, op in enumerate(operations):
+                result = {"index": index, "status": "error", "transaction_id": None, "detail": None}
+                results.append(result)
+                error = self._validate_batch_operation(user_id, op, users)
+                if error:
+                    result["detail"] = error
+                    continue
+
+                if op.type == "deposit":
+                    users[user_id].balance += op.amount
+                else:
+                    users[user_id].balance -= op.amount
+                    users[op.receiver_id].balance += op.amount
+                transaction = TransactionModel(
+                    amount=op.amount,
+                    type=op.type,
+                    description=op.description,
+                    user_id=user_id,
+                    sender_id=user_id if op.type == "transfer" else None,
+                    receiver_id=op.receiver_id if op.type == "transfer" else None
+                )
+                result["status"] = "applied"
+                applied.append((result, transaction))
+
+            if atomic and len(applied) != len(operations):
+                self.db.rollback()
+                for result, _ in applied:
+                    result["status"] = "rolled_back"
+                return results
+
+            # Um único flush/commit para todo o lote
+            self.db.add_all(transaction for _, transaction in applied)
+            self.db.flush()
+            for result, transaction in applied:
+                result["transaction_id"] = transaction.id
+            self.db.commit()
+        return results
+
+    def _load_locked(self, account_ids) -> Dict[int, User]:
+        # Chamado com os locks das contas já tomados. O identity map pode ter o usuário
+        # lido antes deles (get_current_user, cache de usuários): populate_existing relê
+        # o saldo do banco e FOR UPDATE trava as linhas nos bancos que suportam. O flush
+        # antes grava o que a sessão ainda tem pendente (itens anteriores do group commit)
+        self.db.flush()
+        query = self.db.query(User).filter(User.id.in_(account_ids)).populate_existing().with_for_update()
+        return {user.id: user for user in query}
+
+    def _validate_batch_operation(self, user_id: int, op: BatchOperation, users: Dict[int, User]) -> Optional[str]:
+        if user_id not in users:
+            return "User not found"
+        if op.type == "transfer":
+            if op.receiver_id is None:
+                return "receiver_id is required for transfers"
+            if op.receiver_id not in users:
+                return "Receiver not found"
+            if op.receiver_id == user_id:
+                return "Cannot transfer to the same account"
+            if users[user_id].balance < op.amount:
+                return "Insufficient funds"
+        return None
+
+class AsyncWalletUseCase:
+    def __init__(
+        self,
+        db: AsyncSession,
+        balance_cache: Optional[BalanceCache] = None,
+        velocity: Optional[TransferVelocity] = None
+    ):
+        self.db = db
+        self.balance_cache = balance_cache
+        self.velocity = velocity
+
+    async def get_balance(self, user_id: int) -> int:
+        if self.balance_cache is not None:
+            balance = self.balance_cache.get(user_id)
+            if balance is not None:
+                return balance
+            token = self.balance_cache.begin_read()
+        result = await self.db.execute(balance_query(user_id))
+        balance = result.scalar_one_or_none()
+        if balance is None:
+            raise HTTPException(status_code=404, detail="User not found")
+        if self.balance_cache is not None:
+            self.balance_cache.fill(user_id, balance, token)
+        return balance
+
+    async def list_transactions(
+        self,
+        user_id: int,
+        start_date: datetime = None,
+        end_date: datetime = None,
+        after: Optional[Tuple[datetime, int]] = None,
+        limit: Optional[int] = None
+    ) -> List[TransactionModel]:
+        result = await self.db.execute(history_query(user_id, start_date, end_date, after, limit))
+        return list(result.scalars())
 
+    async def transfer_money(self, sender_id: int, receiver_id: int, amount: int):
+        if self.velocity is not None:
+            self.velocity.check(sender_id, amount)
+        try:
+            transaction = await self.apply_transfer(sender_id, receiver_id, amount)
+            await self.db.commit()
+        except BaseException:
+            await self.db.rollback()
+            raise
+        await self.db.refresh(transaction)
+        return transaction
+
+    async def apply_transfer(self, sender_id: int, receiver_id: int, amount: int) -> TransactionModel:
+        # Sem lock em memória: o débito é um UPDATE condicional, atômico no banco,
+        # e nenhuma leitura acontece antes da primeira escrita da transação
+        if amount <= 0:
+            raise HTTPException(status_code=400, detail="Amount must be positive")
+
+        debited = await self.db.execute(
+            update(User)
+            .where(User.id == sender_id, User.balance >= amount)
+            .values(balance=User.balance - amount)
+            .returning(User.email)
+        )
+        sender_email = debited.scalar_one_or_none()
+        if sender_email is None:
+            raise HTTPException(status_code=400, detail="Insufficient funds")
+
+        credited = await self.db.execute(
+            update(User)
+            .where(User.id == receiver_id)
+            .values(balance=User.balance + amount)
+            .returning(User.email)
+        )
+        receiver_email = credited.scalar_one_or_none()
+        if receiver_email is None:
+            raise HTTPException(status_code=404, detail="Receiver not found")
+
+        # UPDATEs em massa não disparam os eventos do mapper; marca para invalidar os caches.
+        # Sem lock em memória a ordem dos commits não é garantida aqui, então os
+        # saldos são invalidados em vez de gravados no cache
+        self.db.sync_session.info.setdefault(UPDATED_USERS_KEY, set()).update((sender_email, receiver_email))
+        pending = self.db.sync_session.info.setdefault(PENDING_BALANCES_KEY, {})
+        pending[sender_id] = None
+        pending[receiver_id] = None
+
+        transaction = TransactionModel(
+            amount=amount,
+            type="transfer",
+            user_id=sender_id,
+            sender_id=sender_id,
+            receiver_id=receiver_id
+        )
         self.db.add(transaction)
-        self.db.commit()
-        self.db.refresh(transaction)
-        
-        return transaction 
\ No newline at end of file
+        return transaction
@@ -0,0 +1,84 @@
+"""Stress de transferências concorrentes no WalletUseCase.
+
+Verifica que a soma dos saldos se conserva e mede a vazão conforme o
+número de contas distintas. ``--hold-ms`` simula a latência de escrita
+(ex.: commit) dentro da seção crítica.
+
+    python -m benchmarks.bench_account_locks --threads 16 --ops 2000
+"""
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+
+_tmpdir = tempfile.mkdtemp(prefix="wallet-bench-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_tmpdir}/bench.db")
+os.environ.setdefault("SECRET_KEY", "bench")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+
+from app.entities.user import User
+from app.repositories.transaction_repository import TransactionRepository
+from app.repositories.user_repository import UserRepository
+from app.use_cases.wallet_use_case import WalletUseCase
+
+INITIAL_BALANCE = 100_000  # centavos
+
+class SlowUserRepository(UserRepository):
+    def __init__(self, hold: float):
+        super().__init__()
+        self.hold = hold
+
+    def update(self, user: User) -> User:
+        if self.hold:
+            time.sleep(self.hold)
+        return super().update(user)
+
+def run(accounts: int, threads: int, ops: int, hold: float) -> dict:
+    users = SlowUserRepository(hold)
+    use_case = WalletUseCase(users, TransactionRepository(), None)
+    ids = [users.create(User(0, f"u{i}", f"u{i}@x", "", INITIAL_BALANCE)).id for i in range(accounts)]
+    failures = []
+
+    def worker(seed: int):
+        rng = random.Random(seed)
+        for _ in range(ops):
+            sender, receiver = rng.sample(ids, 2)
+            try:
+                use_case.transfer(sender, receiver, rng.choice((100, 500, 5000)))
+            except ValueError as e:
+                failures.append(str(e))
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    started = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    balances = [users.get_by_id(i).balance for i in ids]
+    assert sum(balances) == accounts * INITIAL_BALANCE, "balance not conserved"
+    assert min(balances) >= 0, "negative balance"
+    assert all(f == "Insufficient funds" for f in failures)
+    return {
+        "accounts": accounts,
+        "ops": threads * ops,
+        "rejected": len(failures),
+        "ops_per_sec": round(threads * ops / elapsed),
+    }
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--ops", type=int, default=500)
+    parser.add_argument("--hold-ms", type=float, default=0.5)
+    parser.add_argument("--accounts", type=int, nargs="+", default=[2, 8, 64, 512])
+    args = parser.parse_args()
+    for accounts in args.accounts:
+        print(run(accounts, args.threads, args.ops, args.hold_ms / 1000))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Compara o caminho síncrono (Session + threadpool) com o assíncrono
+(AsyncSession + aiosqlite) em transferências e leituras de saldo.
+
+    python -m benchmarks.bench_async_db --ops 5000 --concurrency 1000
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+_tmpdir = tempfile.mkdtemp(prefix="wallet-bench-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_tmpdir}/bench.db")
+os.environ.setdefault("SECRET_KEY", "bench")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+
+from fastapi import HTTPException
+
+from app.domain.entities.transaction import Transaction  # registra a tabela no metadata
+from app.domain.entities.user import User
+from app.infrastructure.database.connection import AsyncSessionLocal, Base, SessionLocal, engine
+from app.use_cases.wallet_use_case import AsyncWalletUseCase, WalletUseCase
+
+# Mesmo tamanho do threadpool padrão do Starlette/anyio
+THREADPOOL_SIZE = 40
+
+def setup(accounts: int) -> list:
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    with SessionLocal() as db:
+        db.add_all(
+            User(email=f"user{i}@bench", hashed_password="", full_name=f"user{i}", balance=100_000_000)
+            for i in range(accounts)
+        )
+        db.commit()
+        return [user_id for (user_id,) in db.query(User.id)]
+
+def plan(ids: list, ops: int, read_ratio: float) -> list:
+    rng = random.Random(42)
+    return [
+        ("balance", rng.choice(ids), None, None) if rng.random() < read_ratio
+        else ("transfer", *rng.sample(ids, 2), 100)
+        for _ in range(ops)
+    ]
+
+def report(name: str, latencies: list, elapsed: float) -> dict:
+    latencies.sort()
+    return {
+        "path": name,
+        "ops": len(latencies),
+        "ops_per_sec": round(len(latencies) / elapsed),
+        "p50_ms": round(statistics.median(latencies) * 1000, 3),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 3),
+    }
+
+def run_sync(operations: list) -> dict:
+    def call(op):
+        kind, a, b, amount = op
+        started = time.perf_counter()
+        with SessionLocal() as db:
+            try:
+                if kind == "balance":
+                    db.query(User.balance).filter(User.id == a).scalar()
+                else:
+                    WalletUseCase(db=db).transfer_money(a, b, amount)
+            except HTTPException:
+                pass
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(THREADPOOL_SIZE) as pool:
+        latencies = list(pool.map(call, operations))
+    return report("sync", latencies, time.perf_counter() - started)
+
+async def run_async(operations: list, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def call(op):
+        kind, a, b, amount = op
+        async with semaphore:
+            started = time.perf_counter()
+            async with AsyncSessionLocal() as db:
+                use_case = AsyncWalletUseCase(db)
+                try:
+                    if kind == "balance":
+                        await use_case.get_balance(a)
+                    else:
+                        await use_case.transfer_money(a, b, amount)
+                except HTTPException:
+                    pass
+            return time.perf_counter() - started
+
+    started = time.perf_counter()
+    latencies = await asyncio.gather(*(call(op) for op in operations))
+    return report("async", list(latencies), time.perf_counter() - started)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--accounts", type=int, default=1000)
+    parser.add_argument("--ops", type=int, default=5000)
+    parser.add_argument("--read-ratio", type=float, default=0.8)
+    parser.add_argument("--concurrency", type=int, default=1000)
+    args = parser.parse_args()
+
+    ids = setup(args.accounts)
+    operations = plan(ids, args.ops, args.read_ratio)
+    print(run_sync(operations))
+    ids = setup(args.accounts)
+    print(asyncio.run(run_async(operations, args.concurrency)))
+
+if __name__ == "__main__":
+    main()
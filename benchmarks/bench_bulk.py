@@ -0,0 +1,70 @@
+"""Vazão da importação em massa no banco em memória, por formato.
+
+Gera N transações para um conjunto de contas, grava em cada formato e mede
+o tempo de importar o arquivo (leitura em blocos, validação e inserção) e
+de exportar de volta:
+
+    python -m benchmarks.bench_bulk --rows 1000000 --formats csv,ndjson,parquet
+"""
+import argparse
+import io
+import json
+import random
+import time
+
+from app.infrastructure.bulk_io import TRANSACTION_FIELDS, write_chunks
+from app.models import bulk
+from app.models.models import Database
+
+def generate(rows: int, accounts: int, chunk_size: int, seed: int = 0):
+    rng = random.Random(seed)
+    for start in range(0, rows, chunk_size):
+        yield [
+            {
+                "id": None,
+                "amount": rng.randint(100, 50_000) / 100,
+                "type": "deposit" if rng.random() < 0.7 else "withdrawal",
+                "description": None,
+                "user_id": rng.randint(1, accounts),
+                "timestamp": None,
+            }
+            for _ in range(start, min(rows, start + chunk_size))
+        ]
+
+def run(format: str, args) -> dict:
+    data = b"".join(write_chunks(generate(args.rows, args.accounts, args.chunk_size), format, TRANSACTION_FIELDS))
+    database = Database()
+    for i in range(args.accounts):
+        database.create_user(f"user{i}", f"user{i}@bench", "")
+
+    started = time.perf_counter()
+    report = bulk.import_transactions(database, io.BytesIO(data), format, args.chunk_size)
+    imported = time.perf_counter() - started
+
+    started = time.perf_counter()
+    exported = sum(len(chunk) for chunk in bulk.export(database, "transactions", format, chunk_size=args.chunk_size))
+    export_seconds = time.perf_counter() - started
+    return {
+        "format": format,
+        "rows": args.rows,
+        "file_bytes": len(data),
+        "imported": report["imported"],
+        "import_rows_per_sec": round(report["imported"] / imported),
+        "export_bytes": exported,
+        "export_rows_per_sec": round(args.rows / export_seconds),
+        "balance_mismatches": len(database.verify_balances()),
+    }
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--accounts", type=int, default=1000)
+    parser.add_argument("--chunk-size", type=int, default=10_000)
+    parser.add_argument("--formats", default="csv,ndjson,parquet,arrow")
+    args = parser.parse_args()
+
+    for format in args.formats.split(","):
+        print(json.dumps(run(format, args)))
+
+if __name__ == "__main__":
+    main()
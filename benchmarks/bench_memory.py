@@ -0,0 +1,52 @@
+"""Bytes por transação em memória: registro antigo (__dict__ + datetime)
+contra os registros com __slots__ e horário em float.
+
+    python -m benchmarks.bench_memory --rows 200000
+"""
+import argparse
+import gc
+import tracemalloc
+from datetime import datetime
+
+from app.entities.transaction import Transaction as EntityTransaction
+from app.models.models import Transaction
+
+class LegacyTransaction:
+    # Cópia do formato anterior de app/models/models.py
+    def __init__(self, id: int, amount: int, type: str, description: str, user_id: int):
+        self.id = id
+        self.amount = amount
+        self.type = type
+        self.description = description
+        self.user_id = user_id
+        self.timestamp = datetime.now()
+
+def measure(factory, rows: int) -> float:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    # amount (centavos) e user_id variam como numa carga real (sem reaproveitar ints pequenos)
+    items = [factory(i, 1_000 + i * 150, "deposit", None, 1_000_000 + i % 5000) for i in range(rows)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del items
+    return (after - before) / rows
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200_000)
+    args = parser.parse_args()
+
+    results = {
+        "models.Transaction (legacy)": measure(LegacyTransaction, args.rows),
+        "models.Transaction": measure(Transaction, args.rows),
+        "entities.Transaction": measure(
+            lambda id, amount, type, description, user_id: EntityTransaction(id, amount, user_id, user_id, type),
+            args.rows,
+        ),
+    }
+    for name, size in results.items():
+        print(f"{name:32s} {size:8.1f} bytes/transaction")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""Micro-benchmarks das camadas em memória (Database, UserRepository,
+TransactionRepository e WalletUseCase) com 10³ a 10⁷ linhas.
+
+Cada tamanho monta estruturas novas com N transações distribuídas entre
+N/100 usuários e mede as operações quentes. O resultado sai em JSON para
+comparar entre versões:
+
+    python -m benchmarks.bench_micro --sizes 1000,10000,100000 > micro.json
+    python -m benchmarks.bench_micro --sizes 10000000 --budget 2
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+from itertools import islice
+
+_tmpdir = tempfile.mkdtemp(prefix="wallet-bench-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_tmpdir}/bench.db")
+os.environ.setdefault("SECRET_KEY", "bench")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+
+from app.entities.transaction import Transaction
+from app.entities.user import User
+from app.models.models import Database
+from app.repositories.transaction_repository import TransactionRepository
+from app.repositories.user_repository import UserRepository
+from app.use_cases.wallet_use_case import WalletUseCase
+
+TRANSACTIONS_PER_USER = 100
+PAGE_SIZE = 100
+
+def measure(fn, ops: int, budget: float) -> dict:
+    # Roda até `ops` chamadas ou até estourar o orçamento de tempo
+    # (buscas O(n) em 10⁷ linhas não terminariam de outra forma)
+    done = 0
+    started = time.perf_counter()
+    deadline = started + budget
+    while done < ops:
+        fn(done)
+        done += 1
+        if not done % 64 and time.perf_counter() > deadline:
+            break
+    elapsed = time.perf_counter() - started
+    return {
+        "ops": done,
+        "ops_per_sec": round(done / elapsed),
+        "mean_us": round(elapsed / done * 1e6, 3),
+    }
+
+def timed_load(fn, rows: int) -> dict:
+    started = time.perf_counter()
+    for i in range(rows):
+        fn(i)
+    elapsed = time.perf_counter() - started
+    return {"ops": rows, "ops_per_sec": round(rows / elapsed), "mean_us": round(elapsed / rows * 1e6, 3)}
+
+def bench_database(rows: int, users: int, ops: int, budget: float, rng: random.Random) -> dict:
+    db = Database()
+    for i in range(users):
+        db.create_user(f"user{i}", f"user{i}@bench", "secret")
+    results = {
+        "create_transaction": timed_load(
+            lambda i: db.create_transaction(100, "deposit", None, 1 + i % users), rows
+        ),
+    }
+    results["get_user_by_email"] = measure(
+        lambda i: db.get_user_by_email(f"user{rng.randrange(users)}@bench"), ops, budget
+    )
+    results["get_balance"] = measure(lambda i: db.get_balance(1 + rng.randrange(users)), ops, budget)
+    results["get_user_transactions"] = measure(
+        lambda i: db.get_user_transactions(1 + rng.randrange(users)), ops, budget
+    )
+    results["iter_user_transactions_page"] = measure(
+        lambda i: list(islice(db.iter_user_transactions(1 + rng.randrange(users)), PAGE_SIZE)), ops, budget
+    )
+    results["verify_balances"] = measure(lambda i: db.verify_balances(), 3, budget)
+    return results
+
+def bench_user_repository(users: int, ops: int, budget: float, rng: random.Random) -> dict:
+    repository = UserRepository()
+    results = {
+        "create": timed_load(
+            lambda i: repository.create(User(0, f"user{i}", f"user{i}@bench", "")), users
+        ),
+    }
+    results["get_by_id"] = measure(lambda i: repository.get_by_id(1 + rng.randrange(users)), ops, budget)
+    results["get_by_email"] = measure(
+        lambda i: repository.get_by_email(f"user{rng.randrange(users)}@bench"), ops, budget
+    )
+    return results
+
+def bench_transaction_repository(rows: int, users: int, ops: int, budget: float, rng: random.Random) -> dict:
+    repository = TransactionRepository()
+    results = {
+        "create": timed_load(
+            lambda i: repository.create(Transaction(0, 100, 1 + i % users, 1 + (i + 1) % users, "transfer")),
+            rows,
+        ),
+    }
+    middle = datetime.fromtimestamp(time.time() - 1)
+    results["get_by_user_id"] = measure(
+        lambda i: repository.get_by_user_id(1 + rng.randrange(users)), ops, budget
+    )
+    results["get_by_user_id_range"] = measure(
+        lambda i: repository.get_by_user_id(1 + rng.randrange(users), start_date=middle), ops, budget
+    )
+    results["iter_by_user_id_page"] = measure(
+        lambda i: list(islice(repository.iter_by_user_id(1 + rng.randrange(users)), PAGE_SIZE)), ops, budget
+    )
+    return results
+
+def bench_wallet_use_case(rows: int, users: int, ops: int, budget: float, rng: random.Random) -> dict:
+    user_repository = UserRepository()
+    for i in range(users):
+        user_repository.create(User(0, f"user{i}", f"user{i}@bench", "", balance=100 * rows))
+    use_case = WalletUseCase(user_repository, TransactionRepository())
+    results = {
+        "deposit": timed_load(lambda i: use_case.deposit(1 + i % users, 100), rows // 2),
+        "transfer": timed_load(
+            lambda i: use_case.transfer(1 + i % users, 1 + (i + 1) % users, 100), rows - rows // 2
+        ),
+    }
+    results["get_balance"] = measure(lambda i: use_case.get_balance(1 + rng.randrange(users)), ops, budget)
+    results["list_transactions"] = measure(
+        lambda i: use_case.list_transactions(1 + rng.randrange(users)), ops, budget
+    )
+    results["summarize"] = measure(lambda i: use_case.summarize(1 + rng.randrange(users)), ops, budget)
+    results["verify_balances"] = measure(lambda i: use_case.verify_balances(), 3, budget)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="1000,10000,100000,1000000")
+    parser.add_argument("--ops", type=int, default=10_000, help="chamadas por operação de leitura")
+    parser.add_argument("--budget", type=float, default=1.0, help="segundos máximos por operação de leitura")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "runs": [],
+    }
+    for rows in (int(size) for size in args.sizes.split(",")):
+        users = max(2, rows // TRANSACTIONS_PER_USER)
+        rng = random.Random(args.seed)
+        run = {"rows": rows, "users": users}
+        for name, bench in (
+            ("Database", lambda: bench_database(rows, users, args.ops, args.budget, rng)),
+            ("UserRepository", lambda: bench_user_repository(users, args.ops, args.budget, rng)),
+            ("TransactionRepository", lambda: bench_transaction_repository(rows, users, args.ops, args.budget, rng)),
+            ("WalletUseCase", lambda: bench_wallet_use_case(rows, users, args.ops, args.budget, rng)),
+        ):
+            run[name] = bench()
+            gc.collect()
+            print(f"{rows:>10} {name} ok", file=sys.stderr)
+        report["runs"].append(run)
+    json.dump(report, sys.stdout, indent=2)
+    print()
+
+if __name__ == "__main__":
+    main()
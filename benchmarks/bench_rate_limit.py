@@ -0,0 +1,75 @@
+"""Custo por verificação do limitador e precisão com vários processos.
+
+Mede quantas verificações por segundo cada armazenamento aguenta e depois
+põe N processos batendo na mesma chave: com o SQLite compartilhado o total
+aceito não passa do limite; com a memória de cada processo, vira N vezes o
+limite (por isso o RATE_LIMIT_DB com vários workers):
+
+    python -m benchmarks.bench_rate_limit --processes 4 --limit 1000
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+from app.infrastructure.rate_limit import RateLimitExceeded, SlidingWindowLimiter, rate_limit_storage
+
+# Janela longa: a corrida termina dentro de um bucket e o limite vale exatamente
+WINDOW_SECONDS = 3600.0
+
+def throughput(path, ops: int, keys: int) -> dict:
+    limiter = SlidingWindowLimiter("bench", ops, WINDOW_SECONDS, rate_limit_storage(path))
+    started = time.perf_counter()
+    for i in range(ops):
+        limiter.hit(i % keys)
+    elapsed = time.perf_counter() - started
+    return {"storage": "sqlite" if path else "memory", "checks_per_sec": round(ops / elapsed),
+            "mean_us": round(elapsed / ops * 1e6, 2)}
+
+def hammer(path, limit: int, attempts: int, results) -> None:
+    limiter = SlidingWindowLimiter("shared", limit, WINDOW_SECONDS, rate_limit_storage(path))
+    allowed = 0
+    for _ in range(attempts):
+        try:
+            limiter.hit("same-key")
+            allowed += 1
+        except RateLimitExceeded:
+            pass
+    results.put(allowed)
+
+def contention(path, processes: int, limit: int) -> dict:
+    results = multiprocessing.Queue()
+    workers = [
+        multiprocessing.Process(target=hammer, args=(path, limit, limit, results)) for _ in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+    allowed = sum(results.get() for _ in workers)
+    for worker in workers:
+        worker.join()
+    return {"storage": "sqlite" if path else "memory", "processes": processes, "limit": limit,
+            "attempts": processes * limit, "allowed": allowed}
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ops", type=int, default=50_000)
+    parser.add_argument("--keys", type=int, default=1000)
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--limit", type=int, default=1000)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="wallet-ratelimit-")
+    for path in (None, os.path.join(directory, "throughput.db")):
+        print(json.dumps(throughput(path, args.ops, args.keys)))
+
+    shared = contention(os.path.join(directory, "shared.db"), args.processes, args.limit)
+    print(json.dumps(shared))
+    print(json.dumps(contention(None, args.processes, args.limit)))
+    if shared["allowed"] != args.limit:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Linhas/s ao serializar o histórico de transações: caminho antigo
+(TransactionResponse por linha + validação do response_model) contra o
+caminho direto (dicts + orjson/json).
+
+    python -m benchmarks.bench_serialization --rows 100000
+"""
+import argparse
+import json
+import time
+from typing import List
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from app.infrastructure import serialization
+from app.models.models import Transaction
+from app.router import to_transaction_response, to_transaction_row
+from app.schemas.schemas import TransactionResponse
+
+def pydantic_path(rows) -> bytes:
+    # O que o FastAPI fazia: modelo por linha, revalidação pelo response_model e json.dumps
+    adapter = TypeAdapter(List[TransactionResponse])
+    models = adapter.validate_python([to_transaction_response(t) for t in rows], from_attributes=True)
+    return json.dumps(jsonable_encoder(models)).encode()
+
+def direct_path(rows) -> bytes:
+    return serialization.dumps([to_transaction_row(t) for t in rows])
+
+def measure(fn, rows, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(rows)
+        best = min(best, time.perf_counter() - start)
+    return len(rows) / best
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rows = [Transaction(i, 1_000 + i * 150, "deposit", "Depósito", 1 + i % 5000) for i in range(args.rows)]
+    encoder = "orjson" if serialization.orjson is not None else "json"
+    results = {
+        "pydantic (response_model)": measure(pydantic_path, rows, args.repeat),
+        f"direto ({encoder})": measure(direct_path, rows, args.repeat),
+    }
+    for name, rate in results.items():
+        print(f"{name:28s} {rate:12,.0f} linhas/s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Vazão do motor particionado com 1, 2, 4... shards numa mesma máquina.
+
+Cada shard é um processo com seu próprio Database; os clientes são processos
+com um ShardRouter cada, fazendo depósitos e transferências (uma fração
+entre shards, em duas fases). Com núcleos livres suficientes a vazão cresce
+quase linearmente com o número de shards:
+
+    python -m benchmarks.bench_sharding --shards 1,2,4,8 --duration 5 --cross 0.1
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import secrets
+import tempfile
+import time
+
+from app.infrastructure.sharding.client import ShardRouter, shard_for_account
+from app.infrastructure.sharding.engine import InsufficientFunds
+from app.infrastructure.sharding.supervisor import start_shards, stop_shards, wait_ready
+
+INITIAL_BALANCE = 100_000_000  # centavos
+
+def setup(addresses: list, authkey: bytes, accounts: int) -> list:
+    router = ShardRouter(addresses, authkey)
+    by_shard = [[] for _ in addresses]
+    try:
+        for i in range(accounts):
+            user_id = router.create_user(f"user{i}", f"user{i}@bench", "")[0]
+            router.apply(user_id, INITIAL_BALANCE, "deposit", "seed")
+            by_shard[shard_for_account(user_id, len(addresses))].append(user_id)
+    finally:
+        router.close()
+    return by_shard
+
+def client(addresses: list, authkey: bytes, log_dir: str, by_shard: list, duration: float,
+           cross: float, deposits: float, seed: int, results) -> None:
+    router = ShardRouter(addresses, authkey, pool_size=1, log_dir=log_dir)
+    rng = random.Random(seed)
+    shards = [accounts for accounts in by_shard if len(accounts) >= 2]
+    ops = cross_ops = 0
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        accounts = rng.choice(shards)
+        sender = rng.choice(accounts)
+        if rng.random() < deposits:
+            router.apply(sender, 100, "deposit", None)
+        else:
+            if len(shards) > 1 and rng.random() < cross:
+                receiver = rng.choice(rng.choice([other for other in shards if other is not accounts]))
+                cross_ops += 1
+            else:
+                receiver = rng.choice([account for account in accounts if account != sender])
+            try:
+                router.transfer(sender, receiver, 100)
+            except InsufficientFunds:
+                pass
+        ops += 1
+    router.close()
+    results.put((ops, cross_ops))
+
+def run(count: int, args, authkey: bytes) -> dict:
+    socket_dir = tempfile.mkdtemp(prefix="wallet-shards-")
+    addresses = [os.path.join(socket_dir, f"shard-{i}.sock") for i in range(count)]
+    processes = start_shards(addresses, authkey)
+    try:
+        wait_ready(addresses, authkey)
+        by_shard = setup(addresses, authkey, args.accounts_per_shard * count)
+        results = multiprocessing.Queue()
+        clients = [
+            multiprocessing.Process(
+                target=client,
+                args=(addresses, authkey, socket_dir, by_shard, args.duration, args.cross, args.deposits, seed, results),
+            )
+            for seed in range(args.clients_per_shard * count)
+        ]
+        for process in clients:
+            process.start()
+        totals = [results.get() for _ in clients]
+        for process in clients:
+            process.join()
+
+        router = ShardRouter(addresses, authkey)
+        mismatches = router.verify()
+        in_doubt = sum(len(router.call(shard, "in_doubt")) for shard in range(count))
+        router.close()
+    finally:
+        stop_shards(processes)
+    ops = sum(total for total, _ in totals)
+    return {
+        "shards": count,
+        "clients": len(clients),
+        "ops": ops,
+        "cross_shard_transfers": sum(cross for _, cross in totals),
+        "ops_per_sec": round(ops / args.duration),
+        "balance_mismatches": mismatches,
+        "in_doubt": in_doubt,
+    }
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--shards", default="1,2,4")
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--accounts-per-shard", type=int, default=200)
+    parser.add_argument("--clients-per-shard", type=int, default=2)
+    parser.add_argument("--cross", type=float, default=0.1, help="fração das transferências entre shards")
+    parser.add_argument("--deposits", type=float, default=0.2, help="fração de depósitos")
+    args = parser.parse_args()
+
+    authkey = secrets.token_bytes(16)
+    baseline = None
+    for count in (int(value) for value in args.shards.split(",")):
+        result = run(count, args, authkey)
+        baseline = baseline or result["ops_per_sec"] / count
+        result["speedup_vs_linear"] = round(result["ops_per_sec"] / (baseline * count), 3)
+        print(json.dumps(result))
+
+if __name__ == "__main__":
+    main()
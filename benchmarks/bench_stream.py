@@ -0,0 +1,94 @@
+"""Custo das assinaturas paradas do hub de eventos e da entrega.
+
+Abre N assinaturas, cada uma com a task de um consumidor esperando como a
+rota /api/stream, e mede a memória por assinatura (tracemalloc), o tempo de
+um heartbeat para todas, a latência de publish vindo de outra thread e o
+descarte de um consumidor que parou de ler:
+
+    python -m benchmarks.bench_stream --subscribers 10000
+"""
+import argparse
+import asyncio
+import json
+import sys
+import threading
+import time
+import tracemalloc
+
+from app.infrastructure.pubsub import Hub
+
+HEARTBEAT = (None, b": ping\n\n")
+
+async def consume(subscription, received: list) -> None:
+    while True:
+        message = await subscription.get()
+        if message is None:
+            return
+        received.append(message)
+
+async def run(subscribers: int, queue_size: int, publishes: int) -> dict:
+    hub = Hub(queue_size=queue_size)
+    received = []
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    subscriptions = [hub.subscribe(account) for account in range(subscribers)]
+    tasks = [asyncio.ensure_future(consume(subscription, received)) for subscription in subscriptions]
+    await asyncio.sleep(0)
+    idle_bytes = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    started = time.perf_counter()
+    hub.broadcast(HEARTBEAT)
+    await asyncio.sleep(0)
+    heartbeat_ms = (time.perf_counter() - started) * 1000
+    received.clear()
+
+    # Publicações vindas de uma thread, como as rotas síncronas do threadpool
+    done = asyncio.Event()
+    loop = asyncio.get_running_loop()
+
+    def publisher():
+        for i in range(publishes):
+            hub.publish(i % subscribers, (i, b"data: {}\n\n"))
+            hub.publish(subscribers + i, (i, b"data: {}\n\n"))  # sem assinante: não acorda o laço
+        loop.call_soon_threadsafe(done.set)
+
+    started = time.perf_counter()
+    threading.Thread(target=publisher).start()
+    await done.wait()
+    while len(received) < publishes:
+        await asyncio.sleep(0)
+    publish_us = (time.perf_counter() - started) / publishes * 1e6
+
+    # Consumidor parado: a fila enche e ele é desconectado sem afetar os outros
+    stalled = hub.subscribe(-1)
+    for i in range(queue_size + 1):
+        hub._deliver(-1, ((i, b"data: {}\n\n"),))
+    dropped = stalled.closed and stalled.dropped and not hub.has_subscribers(-1)
+
+    hub.stop()
+    await asyncio.gather(*tasks)
+    return {
+        "subscribers": subscribers,
+        "idle_bytes_per_subscriber": round(idle_bytes / subscribers),
+        "heartbeat_all_ms": round(heartbeat_ms, 2),
+        "publish_to_delivery_us": round(publish_us, 2),
+        "stalled_consumer_dropped": dropped,
+        "open_after_stop": hub.count,
+    }
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--subscribers", type=int, default=10_000)
+    parser.add_argument("--queue-size", type=int, default=64)
+    parser.add_argument("--publishes", type=int, default=100_000)
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args.subscribers, args.queue_size, args.publishes))
+    print(json.dumps(result))
+    if not result["stalled_consumer_dropped"] or result["open_after_stop"]:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
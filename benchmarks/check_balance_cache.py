@@ -0,0 +1,207 @@
+"""Confere o cache de saldos sob escritas e leituras concorrentes.
+
+Contas do grupo A só recebem depósitos, então o saldo delas só cresce: um
+leitor que vê um valor menor do que já viu antes leu o cache "voltando no
+tempo". Contas do grupo B trocam transferências para gerar escrita e
+invalidação. No fim, todo valor em cache tem de bater com a fonte.
+
+O cache fica na frente do WalletUseCase em memória e do banco SQL. A API ao
+vivo (app/router.py) não usa cache: o saldo vem do livro-razão do processo, e
+com shards vem do shard, que outros workers alteram sem invalidar nada aqui.
+
+    python -m benchmarks.check_balance_cache --seconds 5
+    python -m benchmarks.check_balance_cache --backend sql --seconds 5
+    python -m benchmarks.check_balance_cache --cache-size 8   # força evicções
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+_tmpdir = tempfile.mkdtemp(prefix="wallet-cache-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_tmpdir}/check.db")
+os.environ.setdefault("SECRET_KEY", "check")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+
+from app.entities.user import User as EntityUser
+from app.infrastructure.balance_cache import BalanceCache
+from app.repositories.transaction_repository import TransactionRepository
+from app.repositories.user_repository import UserRepository
+from app.use_cases.wallet_use_case import WalletUseCase
+
+INITIAL_BALANCE = 100_000_000  # centavos
+
+class SlowUserRepository(UserRepository):
+    # Alarga a janela entre ler a fonte e preencher o cache
+    def __init__(self, delay: float):
+        super().__init__()
+        self.delay = delay
+
+    def get_by_id(self, user_id: int):
+        user = super().get_by_id(user_id)
+        if self.delay:
+            time.sleep(self.delay)
+        return user
+
+class Readers:
+    def __init__(self):
+        self.reads = 0
+        self.violations = []
+        self._lock = threading.Lock()
+
+    def check(self, seen: dict, account_id: int, balance: int) -> None:
+        previous = seen.get(account_id)
+        if previous is not None and balance < previous:
+            with self._lock:
+                self.violations.append({"account": account_id, "seen": previous, "then": balance})
+        seen[account_id] = balance
+        self.reads += 1
+
+def run_memory(args) -> dict:
+    users = SlowUserRepository(args.load_delay_us / 1e6)
+    cache = BalanceCache(maxsize=args.cache_size, ttl=args.ttl)
+    use_case = WalletUseCase(users, TransactionRepository(), balance_cache=cache)
+    group_a = [users.create(EntityUser(0, f"a{i}", f"a{i}@x", "", 0)).id for i in range(args.accounts)]
+    group_b = [users.create(EntityUser(0, f"b{i}", f"b{i}@x", "", INITIAL_BALANCE)).id for i in range(args.accounts)]
+    readers = Readers()
+    writes = [0]
+    stop = time.monotonic() + args.seconds
+
+    def depositor(seed: int):
+        rng = random.Random(seed)
+        while time.monotonic() < stop:
+            use_case.deposit(rng.choice(group_a), 100)
+            writes[0] += 1
+
+    def transferrer(seed: int):
+        rng = random.Random(seed)
+        while time.monotonic() < stop:
+            sender, receiver = rng.sample(group_b, 2)
+            try:
+                use_case.transfer(sender, receiver, 100)
+            except ValueError:
+                pass
+            writes[0] += 1
+
+    def reader(seed: int):
+        rng = random.Random(seed)
+        seen = {}
+        while time.monotonic() < stop:
+            account_id = rng.choice(group_a)
+            readers.check(seen, account_id, use_case.get_balance(account_id))
+
+    threads = (
+        [threading.Thread(target=depositor, args=(i,)) for i in range(args.writers)]
+        + [threading.Thread(target=transferrer, args=(100 + i,)) for i in range(args.writers)]
+        + [threading.Thread(target=reader, args=(200 + i,)) for i in range(args.readers)]
+    )
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stale = [
+        account_id for account_id in group_a + group_b
+        if cache.get(account_id) not in (None, users.get_by_id(account_id).balance)
+    ]
+    return {"backend": "memory", "writes": writes[0], "reads": readers.reads,
+            "violations": readers.violations[:10], "stale_entries": stale[:10], "cache": cache.stats()}
+
+def run_sql(args) -> dict:
+    from fastapi import HTTPException
+
+    from app.api.dependencies import balance_cache  # registra os listeners de write-through
+    from app.domain.entities.transaction import Transaction  # registra a tabela no metadata
+    from app.domain.entities.user import User
+    from app.infrastructure.database.connection import AsyncSessionLocal, Base, SessionLocal, engine
+    from app.schemas.schemas import BatchOperation
+    from app.use_cases.wallet_use_case import AsyncWalletUseCase
+
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    with SessionLocal() as db:
+        db.add_all(User(email=f"a{i}@x", hashed_password="", full_name=f"a{i}", balance=0) for i in range(args.accounts))
+        db.add_all(User(email=f"b{i}@x", hashed_password="", full_name=f"b{i}", balance=INITIAL_BALANCE) for i in range(args.accounts))
+        db.commit()
+        group_a = [id for (id,) in db.query(User.id).filter(User.email.like("a%"))]
+        group_b = [id for (id,) in db.query(User.id).filter(User.email.like("b%"))]
+
+    readers = Readers()
+    writes = [0]
+    stop = time.monotonic() + args.seconds
+
+    def depositor(seed: int):
+        rng = random.Random(seed)
+        deposit = [BatchOperation(type="deposit", amount=1.0)]
+        while time.monotonic() < stop:
+            with SessionLocal() as db:
+                WalletUseCase(db=db).apply_batch(rng.choice(group_a), deposit)
+            writes[0] += 1
+
+    def transferrer(seed: int):
+        rng = random.Random(seed)
+        while time.monotonic() < stop:
+            sender, receiver = rng.sample(group_b, 2)
+            with SessionLocal() as db:
+                try:
+                    WalletUseCase(db=db).transfer_money(sender, receiver, 100)
+                except HTTPException:
+                    db.rollback()
+            writes[0] += 1
+
+    async def reader(seed: int):
+        rng = random.Random(seed)
+        seen = {}
+        while time.monotonic() < stop:
+            account_id = rng.choice(group_a)
+            async with AsyncSessionLocal() as db:
+                balance = await AsyncWalletUseCase(db, balance_cache).get_balance(account_id)
+            readers.check(seen, account_id, balance)
+
+    async def read_all():
+        await asyncio.gather(*(reader(200 + i) for i in range(args.readers)))
+
+    threads = (
+        [threading.Thread(target=depositor, args=(i,)) for i in range(args.writers)]
+        + [threading.Thread(target=transferrer, args=(100 + i,)) for i in range(args.writers)]
+    )
+    for thread in threads:
+        thread.start()
+    asyncio.run(read_all())
+    for thread in threads:
+        thread.join()
+
+    with SessionLocal() as db:
+        current = dict(db.query(User.id, User.balance))
+    stale = [
+        account_id for account_id in group_a + group_b
+        if balance_cache.get(account_id) not in (None, current[account_id])
+    ]
+    return {"backend": "sql", "writes": writes[0], "reads": readers.reads,
+            "violations": readers.violations[:10], "stale_entries": stale[:10], "cache": balance_cache.stats()}
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backend", choices=("memory", "sql"), default="memory")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--accounts", type=int, default=16)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--cache-size", type=int, default=100_000)
+    parser.add_argument("--ttl", type=float, default=30.0)
+    parser.add_argument("--load-delay-us", type=float, default=50.0, help="só no backend memory")
+    args = parser.parse_args()
+
+    result = run_sql(args) if args.backend == "sql" else run_memory(args)
+    print(json.dumps(result, indent=2))
+    if result["violations"] or result["stale_entries"]:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Confere que o group commit faz um único commit por janela no SQLite.
+
+Dispara N operações ao mesmo tempo, uma delas falhando de propósito, e
+conta os commits que chegam ao SQLite (trace do sqlite3): um COMMIT ou o
+RELEASE de um SAVEPOINT aberto fora de transação, que no SQLite também
+encerra a transação. Cada janela tem de gerar exatamente um commit, a
+operação que falhou não pode deixar rastro e as outras têm de estar gravadas:
+
+    python -m benchmarks.check_group_commit --items 200
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+
+_tmpdir = tempfile.mkdtemp(prefix="wallet-group-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_tmpdir}/check.db")
+os.environ.setdefault("SECRET_KEY", "check")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+
+from sqlalchemy import event, func, select, update
+from sqlalchemy.orm import sessionmaker
+
+from app.domain.entities.user import User
+from app.infrastructure.database.connection import Base, create_wallet_engine
+from app.infrastructure.database.group_commit import GroupCommitter
+
+class Failed(Exception):
+    pass
+
+def count_commits(statements: list) -> int:
+    commits = 0
+    in_transaction = False
+    outermost = None  # SAVEPOINT que abriu a transação, se foi assim que ela começou
+    for statement in statements:
+        words = statement.upper().split()
+        if not words:
+            continue
+        if words[0] == "BEGIN":
+            in_transaction = True
+        elif words[0] in ("COMMIT", "END"):
+            commits += 1
+            in_transaction, outermost = False, None
+        elif words[0] == "ROLLBACK" and "TO" not in words:
+            in_transaction, outermost = False, None
+        elif words[0] == "SAVEPOINT" and not in_transaction:
+            in_transaction, outermost = True, words[-1]
+        elif words[0] == "RELEASE" and words[-1] == outermost:
+            commits += 1
+            in_transaction, outermost = False, None
+    return commits
+
+def run(items: int, window_ms: float) -> dict:
+    engine = create_wallet_engine(f"sqlite:///{_tmpdir}/group.db")
+    statements = []
+
+    @event.listens_for(engine, "connect")
+    def _trace(dbapi_connection, connection_record):
+        # Vê também o BEGIN/COMMIT que o próprio pysqlite emite
+        dbapi_connection.set_trace_callback(statements.append)
+
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    with Session() as session:
+        session.add_all([User(email=f"{i}@check", hashed_password="", full_name="", balance=0) for i in range(items)])
+        session.commit()
+
+    committer = GroupCommitter(Session, window_ms=window_ms, max_batch=items)
+    batches = []
+    commit = committer._commit
+    committer._commit = lambda batch: (batches.append(len(batch)), commit(batch))
+    failing = items // 2
+
+    def deposit(user_id: int):
+        def work(session):
+            session.execute(update(User).where(User.id == user_id).values(balance=User.balance + 100))
+            if user_id == failing:
+                raise Failed()
+        return work
+
+    errors = []
+    barrier = threading.Barrier(items)
+
+    def client(user_id: int):
+        barrier.wait()
+        try:
+            committer.submit(deposit(user_id), (user_id,))
+        except Failed:
+            errors.append(user_id)
+
+    statements.clear()
+    threads = [threading.Thread(target=client, args=(user_id,)) for user_id in range(1, items + 1)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    commits = count_commits(statements)
+    with Session() as session:
+        credited = session.scalar(select(func.count()).select_from(User).where(User.balance == 100))
+        failed_balance = session.scalar(select(User.balance).where(User.id == failing))
+    return {
+        "items": items,
+        "batches": len(batches),
+        "commits": commits,
+        "credited": credited,
+        "failed_item_rolled_back": errors == [failing] and failed_balance == 0,
+    }
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=200)
+    parser.add_argument("--window-ms", type=float, default=50.0)
+    args = parser.parse_args()
+
+    result = run(args.items, args.window_ms)
+    print(json.dumps(result))
+    if result["commits"] != result["batches"] or result["credited"] != args.items - 1 or not result["failed_item_rolled_back"]:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Confere que as buscas do Database não crescem com o tamanho do banco.
+
+Para cada tamanho monta um Database com N transações, 10 por usuário, e mede
+get_user_by_email e get_user_transactions em usuários sorteados. Como cada
+usuário tem sempre 10 transações, o custo não deve acompanhar N. Com dados
+maiores que o cache da CPU cada busca fica algumas vezes mais lenta, então o
+critério é o expoente de crescimento entre o menor e o maior tamanho
+(log da razão dos tempos / log da razão dos tamanhos): uma varredura daria 1,
+e o limite padrão é --max-exponent 0.5:
+
+    python -m benchmarks.check_lookup_scaling --sizes 1000,100000,1000000
+"""
+import argparse
+import gc
+import json
+import math
+import random
+import sys
+import time
+
+from app.models.models import Database
+
+TRANSACTIONS_PER_USER = 10
+PROBES = 20_000
+
+def build(rows: int) -> Database:
+    db = Database()
+    users = max(1, rows // TRANSACTIONS_PER_USER)
+    for i in range(users):
+        db.create_user(f"user{i}", f"user{i}@check", "secret")
+    for i in range(rows):
+        db.create_transaction(100, "deposit", None, 1 + i % users)
+    return db
+
+def mean_us(fn, keys: list) -> float:
+    started = time.perf_counter()
+    for key in keys:
+        fn(key)
+    return round((time.perf_counter() - started) / len(keys) * 1e6, 3)
+
+def run(sizes: list, seed: int) -> list:
+    results = []
+    for rows in sizes:
+        db = build(rows)
+        users = len(db.users)
+        rng = random.Random(seed)
+        emails = [f"user{rng.randrange(users)}@check" for _ in range(PROBES)]
+        user_ids = [1 + rng.randrange(users) for _ in range(PROBES)]
+        gc.collect()
+        results.append({
+            "rows": rows,
+            "users": users,
+            "get_user_by_email_us": mean_us(db.get_user_by_email, emails),
+            "get_user_transactions_us": mean_us(db.get_user_transactions, user_ids),
+        })
+        print(f"{rows:>10} ok", file=sys.stderr)
+        del db
+        gc.collect()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="1000,100000,1000000")
+    parser.add_argument("--max-exponent", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    results = run([int(size) for size in args.sizes.split(",")], args.seed)
+    first, last = results[0], results[-1]
+    growth = math.log(last["rows"] / first["rows"])
+    exponents = {
+        name: round(math.log(last[name] / first[name]) / growth, 3)
+        for name in ("get_user_by_email_us", "get_user_transactions_us")
+    }
+    print(json.dumps({"runs": results, "growth_exponent": exponents}, indent=2))
+    if any(exponent > args.max_exponent for exponent in exponents.values()):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Confere que o outbox em memória sobrevive a um reinício com WALLET_DATA_DIR.
+
+Grava depósitos em duas contas com um destino que recusa os eventos da conta B,
+que fica parada atrás de um evento descartado. Depois importa um bloco (que não
+gera eventos), enche a fila de B até o limite e recarrega o diretório duas
+vezes: pelo log e depois de compactar. Os eventos pendentes de B têm de voltar
+com os mesmos ids, sem os importados; de A só voltam os entregues depois do
+primeiro pendente de B (o log guarda um único id até onde tudo foi entregue).
+Por fim B é recusada de novo, liberada pela mesma chamada da rota de
+administração e, entregues, os eventos não voltam no próximo reinício:
+
+    python -m benchmarks.check_outbox_recovery
+"""
+import asyncio
+import json
+import sys
+import tempfile
+
+from app.infrastructure.outbox_dispatcher import OutboxDispatcher
+from app.models.models import Database
+from app.models.outbox import OutboxFull
+
+PER_ACCOUNT = 3
+
+class Sink:
+    def __init__(self, refused: set):
+        self.refused = refused
+        self.events = []
+
+    async def send(self, events: list) -> None:
+        if any(event["account_id"] in self.refused for event in events):
+            raise ConnectionError("refused")
+        self.events.extend(events)
+
+def open_database(data_dir: str) -> Database:
+    # Mesma ordem do app.main: outbox no import, persistência no startup
+    db = Database()
+    db.enable_outbox(max_pending_per_account=PER_ACCOUNT)
+    db.enable_persistence(data_dir)
+    return db
+
+def pending(db: Database) -> dict:
+    return {account_id: [event.id for event in queue] for account_id, queue in db.outbox.pending.items()}
+
+async def dispatch(db: Database, sink: Sink) -> int:
+    dispatcher = OutboxDispatcher([sink], db.outbox, max_attempts=1, retention_hours=0)
+    return await dispatcher.dispatch_once()
+
+async def run(data_dir: str) -> dict:
+    db = open_database(data_dir)
+    a = db.create_user("a", "a@check", "secret").id
+    b = db.create_user("b", "b@check", "secret").id
+    for account_id in (a, b, a, b):
+        db.create_transaction(100, "deposit", None, account_id)
+    first = Sink({b})
+    await dispatch(db, first)
+    db.import_transactions([(100, "deposit", None, a, None), (100, "deposit", None, a, None)])
+    db.create_transaction(100, "deposit", None, b)
+    try:
+        db.create_transaction(100, "deposit", None, b)
+        capped = False
+    except OutboxFull:
+        capped = True
+    before = pending(db)
+    redelivered = [event["id"] for event in first.events if event["data"]["transaction_id"] > db.outbox_settled_id]
+    expected = dict(before)
+    if redelivered:
+        expected[a] = redelivered
+    db.close()
+
+    db = open_database(data_dir)
+    after_log = pending(db)
+    db.compact()
+    db.close()
+
+    db = open_database(data_dir)
+    after_snapshot = pending(db)
+    # As tentativas não são gravadas: depois do reinício B é recusada e descartada de novo
+    await dispatch(db, Sink({b}))
+    released = db.outbox.release(b)
+    sink = Sink(set())
+    delivered = await dispatch(db, sink)
+    db.close()
+
+    db = open_database(data_dir)
+    after_delivery = pending(db)
+    db.close()
+    return {
+        "capped": capped,
+        "pending_before_restart": before,
+        "expected_after_restart": expected,
+        "pending_after_log_replay": after_log,
+        "pending_after_snapshot": after_snapshot,
+        "released": released,
+        "delivered_after_release": delivered,
+        "pending_after_delivery": after_delivery,
+    }
+
+def main():
+    result = asyncio.run(run(tempfile.mkdtemp(prefix="wallet-outbox-")))
+    print(json.dumps(result, indent=2))
+    before, expected = result["pending_before_restart"], result["expected_after_restart"]
+    ok = (
+        result["capped"]
+        and list(before) == [2] and len(before[2]) == PER_ACCOUNT
+        and result["pending_after_log_replay"] == expected
+        and result["pending_after_snapshot"] == expected
+        and result["released"]
+        and result["delivered_after_release"] == PER_ACCOUNT
+        and result["pending_after_delivery"] == {}
+    )
+    if not ok:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
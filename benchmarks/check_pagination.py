@@ -0,0 +1,81 @@
+"""Confere que a paginação do histórico SQL não pula linhas do mesmo segundo.
+
+Grava transações de uma conta no mesmo segundo, metade como o DEFAULT
+CURRENT_TIMESTAMP antigo do SQLite gravava (sem fração, depois levadas ao
+formato atual pela migração) e metade pelo ORM, e percorre o histórico com o
+cursor da rota GET /wallet/transactions, página a página. Todas as linhas têm
+de aparecer uma vez, em ordem:
+
+    python -m benchmarks.check_pagination --rows 9 --page-size 2
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+_tmpdir = tempfile.mkdtemp(prefix="wallet-pages-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_tmpdir}/check.db")
+os.environ.setdefault("SECRET_KEY", "check")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+
+from app.api.routes.wallet import get_after_key
+from app.domain.entities.transaction import Transaction
+from app.domain.entities.user import User
+from app.infrastructure.database.connection import Base, engine
+from app.infrastructure.database.migrations import migrate
+from app.infrastructure.pagination import encode_cursor
+from app.use_cases.wallet_use_case import history_query
+
+def seed(rows: int) -> list:
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        # Banco na versão anterior à que normaliza os horários
+        connection.execute(text("PRAGMA user_version = 5"))
+        connection.execute(text(
+            "INSERT INTO users (id, email, hashed_password, full_name, balance) VALUES (1, 'a@check', '', 'a', 0)"
+        ))
+        for _ in range(rows // 2):
+            connection.execute(text(
+                "INSERT INTO transactions (amount, type, user_id, timestamp)"
+                " VALUES (100, 'deposit', 1, strftime('%Y-%m-%d %H:%M:%S', 'now'))"
+            ))
+    applied = migrate()
+    Session = sessionmaker(bind=engine)
+    with Session() as session:
+        session.add_all([Transaction(amount=100, type="deposit", user_id=1) for _ in range(rows - rows // 2)])
+        session.commit()
+    return applied
+
+def pages(page_size: int) -> list:
+    # Mesmo caminho da rota: cursor com isoformat() do último da página, lido por get_after_key
+    seen, cursor = [], None
+    with engine.connect() as connection:
+        while True:
+            after = get_after_key(cursor)
+            rows = connection.execute(history_query(1, after=after, limit=page_size + 1)).all()
+            seen.append([row.id for row in rows[:page_size]])
+            if len(rows) <= page_size:
+                return seen
+            last = rows[page_size - 1]
+            cursor = encode_cursor([last.timestamp.isoformat(), last.id])
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=9)
+    parser.add_argument("--page-size", type=int, default=2)
+    args = parser.parse_args()
+
+    applied = seed(args.rows)
+    result = pages(args.page_size)
+    ids = [transaction_id for page in result for transaction_id in page]
+    print(json.dumps({"migrations_applied": applied, "pages": result}))
+    if ids != list(range(1, args.rows + 1)) or 6 not in applied:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
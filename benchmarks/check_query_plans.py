@@ -0,0 +1,123 @@
+"""Confere com EXPLAIN QUERY PLAN que histórico, saldo e login não varrem tabelas.
+
+Cria um banco SQLite com o esquema antigo (sem os índices por conta e data,
+sem as colunas sender_id/receiver_id e com valores REAL), roda as migrações
+e falha se algum plano tiver SCAN em users ou transactions:
+
+    python -m benchmarks.check_query_plans
+    python -m benchmarks.check_query_plans --rows 200000   # com volume, depois do ANALYZE
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+_tmpdir = tempfile.mkdtemp(prefix="wallet-plans-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_tmpdir}/plans.db")
+os.environ.setdefault("SECRET_KEY", "check")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+
+from sqlalchemy import select, text
+
+from app.domain.entities.transaction import Transaction
+from app.domain.entities.user import User
+from app.infrastructure.database.connection import engine
+from app.infrastructure.database.migrations import SCHEMA_VERSION, get_version, migrate
+from app.infrastructure.outbox import ready_events_query
+from app.use_cases.wallet_use_case import balance_query, history_query
+
+# Esquema de antes das migrações
+LEGACY_SCHEMA = (
+    "CREATE TABLE users (id INTEGER PRIMARY KEY, email VARCHAR, hashed_password VARCHAR,"
+    " full_name VARCHAR, balance FLOAT)",
+    "CREATE UNIQUE INDEX ix_users_email ON users (email)",
+    "CREATE INDEX ix_users_id ON users (id)",
+    "CREATE TABLE transactions (id INTEGER PRIMARY KEY, amount FLOAT NOT NULL, type VARCHAR NOT NULL,"
+    " description VARCHAR, user_id INTEGER REFERENCES users (id), timestamp DATETIME DEFAULT (CURRENT_TIMESTAMP))",
+    "CREATE INDEX ix_transactions_id ON transactions (id)",
+)
+# Aliases (outbox_events_1 na subconsulta do outbox) contam como a própria tabela
+SCAN = re.compile(r"\bSCAN (TABLE )?(users|transactions|outbox_events)(_\d+)?\b")
+
+def seed(connection, accounts: int, rows: int) -> None:
+    rng = random.Random(0)
+    connection.execute(
+        text("INSERT INTO users (email, hashed_password, full_name, balance) VALUES (:email, '', :email, 0)"),
+        [{"email": f"user{i}@check"} for i in range(accounts)],
+    )
+    start = datetime(2024, 1, 1)
+    connection.execute(
+        text("INSERT INTO transactions (amount, type, user_id, timestamp) VALUES (:amount, :type, :user_id, :ts)"),
+        [
+            {
+                "amount": 1.0,
+                "type": rng.choice(("deposit", "transfer")),
+                "user_id": rng.randint(1, accounts),
+                "ts": start + timedelta(seconds=i),
+            }
+            for i in range(rows)
+        ],
+    )
+
+def plan(connection, query) -> list:
+    compiled = query.compile(compile_kwargs={"render_postcompile": True})
+    rows = connection.execute(text(f"EXPLAIN QUERY PLAN {compiled}"), compiled.params)
+    return [row[-1] for row in rows]
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--accounts", type=int, default=100)
+    parser.add_argument("--rows", type=int, default=10_000)
+    args = parser.parse_args()
+
+    with engine.begin() as connection:
+        for statement in LEGACY_SCHEMA:
+            connection.execute(text(statement))
+        seed(connection, args.accounts, args.rows)
+
+    applied = migrate()
+    again = migrate()
+    with engine.begin() as connection:
+        version = get_version(connection)
+        # A migração 3 troca os valores REAL por centavos inteiros (1.0 -> 100)
+        amounts = sorted(connection.execute(text("SELECT DISTINCT typeof(amount) || ':' || amount FROM transactions")).scalars())
+        connection.execute(text("ANALYZE"))
+
+    since = datetime(2024, 1, 1, 1)
+    queries = {
+        "history": history_query(7, limit=101),
+        "history_range": history_query(7, since, since + timedelta(days=1), limit=101),
+        "history_next_page": history_query(7, after=(since, 500), limit=101),
+        "transfers_sent": select(Transaction).where(Transaction.sender_id == 7).order_by(Transaction.timestamp),
+        "transfers_received": select(Transaction).where(Transaction.receiver_id == 7).order_by(Transaction.timestamp),
+        "balance": balance_query(7),
+        "login": select(User).where(User.email == "user7@check"),
+        "outbox_pending": ready_events_query(500, datetime(2024, 1, 1)),
+    }
+    failures = []
+    plans = {}
+    with engine.connect() as connection:
+        for name, query in queries.items():
+            plans[name] = plan(connection, query)
+            if any(SCAN.search(step) for step in plans[name]):
+                failures.append(name)
+
+    result = {
+        "migrations_applied": applied,
+        "migrations_applied_on_rerun": again,
+        "schema_version": version,
+        "amounts": amounts,
+        "plans": plans,
+        "scans": failures,
+    }
+    print(json.dumps(result, indent=2))
+    if failures or again or version != SCHEMA_VERSION or amounts != ["integer:100"]:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""Gerador de carga em processo contra app.main:app via ASGI (httpx), sem
+subir servidor. Mistura login, saldo, depósito, transferência e histórico
+e devolve p50/p95/p99 e vazão por operação em JSON:
+
+    python -m benchmarks.load_test --requests 20000 --concurrency 64 > load.json
+    python -m benchmarks.load_test --mix login=5,balance=60,deposit=10,transfer=10,history=15
+
+A API em /api não tem endpoint de transferência entre contas; "transfer"
+é exercitado como saque (POST /api/transactions/ com type=withdrawal), que
+é o caminho que debita saldo.
+"""
+import argparse
+import asyncio
+import json
+import platform
+import random
+import time
+
+import httpx
+
+from app.main import app
+
+DEFAULT_MIX = "login=10,balance=40,deposit=20,transfer=15,history=15"
+HISTORY_PAGE = 50
+
+def parse_mix(text: str) -> dict:
+    mix = {}
+    for item in text.split(","):
+        name, weight = item.split("=")
+        if name not in OPERATIONS:
+            raise SystemExit(f"Unknown operation in mix: {name}")
+        mix[name] = float(weight)
+    return mix
+
+def percentile(latencies: list, p: float) -> float:
+    # Rank mais próximo sobre a lista já ordenada
+    index = max(0, min(len(latencies) - 1, int(round(p / 100 * len(latencies))) - 1))
+    return latencies[index]
+
+def summarize(latencies: list, errors: int, elapsed: float) -> dict:
+    latencies.sort()
+    if not latencies:
+        return {"count": 0, "errors": errors}
+    return {
+        "count": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "max_ms": round(latencies[-1] * 1000, 3),
+    }
+
+async def op_login(client: httpx.AsyncClient, user: dict, rng: random.Random) -> httpx.Response:
+    return await client.post("/api/token", json={"email": user["email"], "password": user["password"]})
+
+async def op_balance(client: httpx.AsyncClient, user: dict, rng: random.Random) -> httpx.Response:
+    return await client.get("/api/balance/", headers=user["headers"])
+
+async def op_deposit(client: httpx.AsyncClient, user: dict, rng: random.Random) -> httpx.Response:
+    return await client.post(
+        "/api/transactions/",
+        json={"amount": round(rng.uniform(1, 100), 2), "type": "deposit", "description": "load test"},
+        headers=user["headers"],
+    )
+
+async def op_transfer(client: httpx.AsyncClient, user: dict, rng: random.Random) -> httpx.Response:
+    return await client.post(
+        "/api/transactions/",
+        json={"amount": round(rng.uniform(1, 50), 2), "type": "withdrawal", "description": "load test"},
+        headers=user["headers"],
+    )
+
+async def op_history(client: httpx.AsyncClient, user: dict, rng: random.Random) -> httpx.Response:
+    return await client.get("/api/transactions/", params={"limit": HISTORY_PAGE}, headers=user["headers"])
+
+OPERATIONS = {
+    "login": op_login,
+    "balance": op_balance,
+    "deposit": op_deposit,
+    "transfer": op_transfer,
+    "history": op_history,
+}
+
+async def setup(client: httpx.AsyncClient, users: int, run_id: str) -> list:
+    accounts = []
+    for i in range(users):
+        user = {"name": f"load{i}", "email": f"load{i}.{run_id}@bench", "password": "secret"}
+        response = await client.post("/api/users/", json=user)
+        response.raise_for_status()
+        response = await client.post("/api/token", json={"email": user["email"], "password": user["password"]})
+        response.raise_for_status()
+        user["headers"] = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        # Saldo inicial para os saques não falharem por falta de fundos
+        await client.post(
+            "/api/transactions/",
+            json={"amount": 1_000_000, "type": "deposit", "description": "seed"},
+            headers=user["headers"],
+        )
+        accounts.append(user)
+    return accounts
+
+async def run(args) -> dict:
+    mix = parse_mix(args.mix)
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    rng = random.Random(args.seed)
+    plan = [(rng.randrange(args.users), name) for name in rng.choices(names, weights, k=args.requests)]
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        accounts = await setup(client, args.users, str(int(time.time() * 1000)))
+        latencies = {name: [] for name in names}
+        errors = {name: 0 for name in names}
+        queue = iter(plan)
+
+        async def worker(seed: int):
+            worker_rng = random.Random(seed)
+            for account, name in queue:
+                started = time.perf_counter()
+                response = await OPERATIONS[name](client, accounts[account], worker_rng)
+                latencies[name].append(time.perf_counter() - started)
+                if response.status_code >= 400:
+                    errors[name] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(args.seed + i) for i in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+
+    everything = [latency for values in latencies.values() for latency in values]
+    return {
+        "python": platform.python_version(),
+        "config": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "users": args.users,
+            "mix": mix,
+            "seed": args.seed,
+        },
+        "elapsed_s": round(elapsed, 3),
+        "total": summarize(everything, sum(errors.values()), elapsed),
+        "operations": {name: summarize(latencies[name], errors[name], elapsed) for name in names},
+    }
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=10_000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--mix", default=DEFAULT_MIX)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="grava o JSON em arquivo além de imprimir")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+
+if __name__ == "__main__":
+    main()